@@ -0,0 +1,197 @@
+"""
+Admission control for LLM work.
+- AdmissionController: at most `max_concurrent` requests generate at once; up to
+  `max_queue` more wait in FIFO order, each for at most its queue deadline.
+  Anything beyond that is shed immediately with a Retry-After estimate (-> 503).
+  A wait cut short by the request deadline raises DeadlineExceeded instead (-> 504)
+- ClientRateLimiter: optional per-client token bucket (-> 429)
+Both live on the event loop thread; stats() may be read from any thread.
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from deadlines import DeadlineExceeded, remaining
+
+# -----------------------------
+# Config
+# -----------------------------
+RETRY_AFTER_MAX = 30    # seconds; cap on the Retry-After estimate
+HOLD_EWMA_ALPHA = 0.2   # smoothing of the mean slot hold time used for Retry-After
+MAX_TRACKED_CLIENTS = 10000
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing when the LLM is saturated."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"LLM capacity exhausted ({reason}), retry after {retry_after}s")
+        self.reason = reason  # "queue_full" or "queue_timeout"
+        self.retry_after = retry_after
+
+
+# -----------------------------
+# Concurrency limit + bounded queue
+# -----------------------------
+class AdmissionController:
+    """Semaphore with a bounded FIFO wait queue; max_concurrent <= 0 disables it."""
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._lock = threading.Lock()  # guards counters read by stats()
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._mean_hold = 1.0  # seconds, EWMA
+        self.admitted = 0
+        self.shed: Dict[str, int] = {"queue_full": 0, "queue_timeout": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    def check(self):
+        """Raise Overloaded now if a request arriving at this moment could not even be queued."""
+        if self.enabled and self._in_flight >= self.max_concurrent and len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog has likely drained."""
+        if not self.enabled:
+            return 1
+        backlog = (len(self._waiters) + 1) * self._mean_hold / self.max_concurrent
+        return max(1, min(RETRY_AFTER_MAX, math.ceil(backlog)))
+
+    def record_shed(self, reason: str):
+        with self._lock:
+            self.shed[reason] = self.shed.get(reason, 0) + 1
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.record_shed(reason)
+        return Overloaded(reason, self.retry_after())
+
+    async def acquire(self, timeout: Optional[float] = None):
+        """
+        Take a slot, waiting at most `timeout` (default: queue_timeout) seconds in the queue,
+        and never past the request deadline.
+        """
+        if not self.enabled:
+            return
+        if self._in_flight < self.max_concurrent and not self._waiters:
+            with self._lock:
+                self._in_flight += 1
+                self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+
+        wait = self.queue_timeout if timeout is None else max(timeout, 0.0)
+        left = remaining()
+        deadline_bound = left is not None and left < wait
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=max(left, 0.0) if deadline_bound else wait)
+        except asyncio.CancelledError:
+            # Client went away while queued; hand back a slot we may just have been given
+            if waiter.done():
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        if not waiter.done():
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            if deadline_bound:
+                raise DeadlineExceeded("request deadline passed while queued for an LLM slot")
+            raise self._reject("queue_timeout")
+        with self._lock:
+            self.admitted += 1
+
+    def release(self):
+        """Free a slot, handing it straight to the oldest waiter if there is one."""
+        if not self.enabled:
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # slot changes hands; in-flight count unchanged
+                return
+        with self._lock:
+            self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        await self.acquire(timeout)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - start
+            self._mean_hold += HOLD_EWMA_ALPHA * (held - self._mean_hold)
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+                "mean_hold_seconds": round(self._mean_hold, 3),
+            }
+
+
+# -----------------------------
+# Per-client token bucket
+# -----------------------------
+class ClientRateLimiter:
+    """`rate` requests/second per client with bursts of up to `burst`; rate <= 0 disables it."""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()  # client -> (tokens, last refill)
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def take(self, client: str) -> float:
+        """Spend one token; returns 0 if allowed, else seconds until the next token."""
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(client, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            wait = 0.0
+            if tokens >= 1.0:
+                tokens -= 1.0
+            else:
+                wait = (1.0 - tokens) / self.rate
+                self.rejected += 1
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)  # least recently seen client
+            return wait
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"rate": self.rate, "burst": self.burst, "clients": len(self._buckets), "rejected": self.rejected}
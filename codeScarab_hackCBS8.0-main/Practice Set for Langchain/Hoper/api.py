@@ -3,7 +3,14 @@ FastAPI RAG API: PDFs -> PineconeVectorStore -> Retriever -> LLM
 Behavior:
 - Try RAG first
 - If retrieval yields 0 docs, answer is empty/unsure, or an error occurs -> fall back to plain OpenAI.
+- HOPER_SPECULATIVE_FALLBACK=1 generates the plain answer alongside borderline RAG answers.
 - Avoid artificial token limits on output; let the model use its full window.
+- Vector store is Pinecone by default; HOPER_VECTOR_BACKEND=local uses the in-process index in local_store.py.
+- HOPER_SEARCH_TYPE=hybrid fuses dense search with a BM25 index (lexical_index.py) built during ingest.
+- LLM work is admission-controlled (admission.py): past HOPER_LLM_MAX_CONCURRENCY + a bounded queue -> 503 + Retry-After.
+- Every answer has an end-to-end deadline (deadlines.py) -> 504; slow LLM calls are hedged and retried within a budget.
+  Streams are held to it until their first token, then to a per-chunk inactivity timeout.
+- A circuit breaker (circuit_breaker.py) skips retrieval while the vector store is failing or slow; state is on /health.
 Run:
     uvicorn api:app --reload
 """
@@ -11,9 +18,24 @@ Run:
 # -----------------------------
 # Imports
 # -----------------------------
+import asyncio
+import contextvars
+import hashlib
+from array import array
+import json
+import math
+import multiprocessing
 import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 from dotenv import load_dotenv
 
@@ -21,23 +43,43 @@ from dotenv import load_dotenv
 # .env file is in the parent directory - load it with override=True to ensure it takes precedence
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(dotenv_path=env_path, override=True)
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 
 # LangChain split packages
-from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader
+from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
 
 # Pinecone
 from pinecone.grpc import PineconeGRPC as Pinecone
 from pinecone import ServerlessSpec
 from langchain_pinecone import Pinecone as PineconeVectorStore
 
+# Local (in-process) vector store
+from local_store import LocalVectorStore
+from admission import AdmissionController, ClientRateLimiter, Overloaded
+from circuit_breaker import CircuitBreaker
+from deadlines import DeadlineExceeded, HedgedCaller, RetryBudget, deadline_scope, remaining, with_deadline
+from embed_cache import CachedEmbeddings
+from embed_engine import build_embedding_engine, engine_id
+from context_packer import join_passages, load_encoding, pack_context
+from prompts import fallback_messages, rag_messages
+from rerank import CrossEncoderReranker
+from faq import FAQIndex, FAQMatch
+from ingest_workers import count_pages, parse_and_split_pages
+from lexical_index import BM25Index, HybridRetriever
+from llm_costs import LLMCostMeter
+from metrics import (
+    CONTENT_TYPE_LATEST, STATS, RequestTrace, count_answer, observe, render_latest, request_trace, span, stage_summary,
+)
+from response_cache import SemanticResponseCache
+from ttl_cache import TTLCache
+
 # LLM + chains
+import openai
 from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.runnables import Runnable, RunnableLambda
 
@@ -46,11 +88,23 @@ from langchain_core.runnables import Runnable, RunnableLambda
 # -----------------------------
 INDEX_NAME = "hoperbot"
 
+# Vector store backend: "pinecone" (remote) or "local" (in-process NumPy/HNSW index on disk)
+VECTOR_BACKEND = os.getenv("HOPER_VECTOR_BACKEND", "pinecone").strip().lower()
+LOCAL_INDEX_DIR = os.getenv("HOPER_LOCAL_INDEX_DIR", str(Path(__file__).parent / "index"))
+LOCAL_INDEX_TYPE = os.getenv("HOPER_LOCAL_INDEX_TYPE", "flat")  # "flat" (brute force) or "hnsw"
+
 # Embeddings
 EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 EMBED_DIM = 384
 CHUNK_SIZE = 1000     # bigger chunks reduce fragmentation; tune if needed
 CHUNK_OVERLAP = 120
+# Embedding engine: "torch" | "onnx" | "onnx-int8" (ONNX Runtime on CPU, needs optimum[onnxruntime])
+EMBED_BACKEND = os.getenv("HOPER_EMBED_BACKEND", "torch")
+EMBED_DEVICE = os.getenv("HOPER_EMBED_DEVICE", "cpu")
+EMBED_BATCH_SIZE = int(os.getenv("HOPER_EMBED_BATCH_SIZE", "32"))
+EMBED_THREADS = int(os.getenv("HOPER_EMBED_THREADS", "0"))  # intra-op threads, 0 = library default
+# On-disk cache of chunk embeddings keyed by (model, content hash); set to "" to disable
+EMBED_CACHE_PATH = os.getenv("HOPER_EMBED_CACHE", str(Path(__file__).parent / "cache" / "embeddings.sqlite3"))
 
 # LLM
 OPENAI_MODEL = "gpt-5"
@@ -59,25 +113,134 @@ MAX_TOKENS = None      # ← leave None to avoid output token caps
 
 # Retrieval
 K_TOP = 2
+# "similarity" (dense only) or "hybrid" (dense + BM25 fused with reciprocal rank fusion)
+SEARCH_TYPE = os.getenv("HOPER_SEARCH_TYPE", "similarity").strip().lower()
+# Optional rerank: fetch RERANK_CANDIDATES, keep the k_top best by a CPU cross-encoder
+RERANK_ENABLED = os.getenv("HOPER_RERANK", "0") == "1"
+RERANK_MODEL = os.getenv("HOPER_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("HOPER_RERANK_CANDIDATES", "30"))
+RERANK_BATCH_SIZE = 32
+K_TOP_MAX = 20  # upper bound for the per-request k_top override
 FALLBACK_IF_CONTEXT_LT = 1
+# Cosine similarity a chunk needs to count as context. If too few chunks pass,
+# answer in plain mode straight away instead of generating a RAG answer first.
+RAG_MIN_SCORE = float(os.getenv("HOPER_RAG_MIN_SCORE", "0.3"))
+# Best score below this -> scores can't tell whether the RAG answer will hold up.
+# With speculative fallback on, the plain answer is then generated alongside it.
+RAG_CONFIDENT_SCORE = float(os.getenv("HOPER_RAG_CONFIDENT_SCORE", "0.5"))
+SPECULATIVE_FALLBACK = os.getenv("HOPER_SPECULATIVE_FALLBACK", "0") == "1"  # opt-in: lower latency, more tokens
+# Token budget for retrieved context in the RAG prompt (0 = unlimited). Overlapping
+# neighbour chunks are merged first, so a bigger k_top no longer grows the prompt unbounded.
+CONTEXT_MAX_TOKENS = int(os.getenv("HOPER_CONTEXT_MAX_TOKENS", "1500"))
 FALLBACK_IF_CONTAINS = [
     "don't know", "do not know", "not sure", "cannot find", "no information",
     "i am not certain", "i'm not certain", "unknown"
 ]
 UPSERT_BATCH_SIZE = 32
 
+# Semantic response cache (near-duplicate prompt + same k_top -> cached ChatResponse)
+RESPONSE_CACHE_ENABLED = os.getenv("HOPER_RESPONSE_CACHE", "1") == "1"
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("HOPER_RESPONSE_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+RESPONSE_CACHE_TTL = float(os.getenv("HOPER_RESPONSE_CACHE_TTL", "3600"))  # seconds
+
+# Hot-path caches: normalized prompt -> embedding, (embedding, k) -> retrieved docs
+# Curated Q/A pairs ("Ques N: ...") answered directly, without retrieval or an LLM call
+FAQ_ENABLED = os.getenv("HOPER_FAQ", "1") == "1"
+FAQ_PATH = os.getenv("HOPER_FAQ_PATH", str(Path(__file__).parent.parent / "hoperkb.txt"))
+
+QUERY_CACHE_MAX_ENTRIES = 2048
+QUERY_CACHE_TTL = float(os.getenv("HOPER_QUERY_CACHE_TTL", "600"))  # seconds
+DELETE_BATCH_SIZE = 1000  # Pinecone caps ids per delete request
+REINDEX_JOBS_KEPT = 20    # finished jobs remembered for /reindex/{job_id}
+# PDF parsing + splitting fan out over this many processes (1 = serial, in-process)
+INGEST_WORKERS = int(os.getenv("HOPER_INGEST_WORKERS", str(os.cpu_count() or 1)))
+PAGES_PER_TASK = 8        # pages parsed per worker task
+# Ingest pipeline: parse -> embed -> upsert run concurrently, joined by bounded queues
+INGEST_QUEUE_DEPTH = 4    # batches buffered between stages (backpressure)
+UPSERT_CONCURRENCY = int(os.getenv("HOPER_UPSERT_CONCURRENCY", "2"))  # upsert batches in flight
+
+# Return each /chat request's stage breakdown in a Server-Timing header
+# (/chat/stream: as a final `timing` event, since its stages run after the headers are sent)
+DEBUG_TIMING_HEADER = os.getenv("HOPER_DEBUG_TIMINGS", "0") == "1"
+
+# Concurrency
+# Query embedding + vector search are blocking (CPU / gRPC); they run on this
+# bounded pool so the event loop stays free for in-flight LLM calls.
+BLOCKING_WORKERS = int(os.getenv("HOPER_BLOCKING_WORKERS", "4"))
+# Request-path retrieval (vector store round trips) gets its own pool, so a slow store
+# cannot hold the threads query embedding needs
+RETRIEVAL_WORKERS = int(os.getenv("HOPER_RETRIEVAL_WORKERS", "4"))
+# Admission control: requests generating with the LLM at once (RAG and fallback alike, 0 = unlimited),
+# how many more may wait, and for how long, before they get a 503 with Retry-After
+LLM_MAX_CONCURRENCY = int(os.getenv("HOPER_LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_QUEUE = int(os.getenv("HOPER_LLM_MAX_QUEUE", "32"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("HOPER_LLM_QUEUE_TIMEOUT", "10"))  # seconds
+# Optional per-client token bucket on /chat and /chat/stream (requests/second, 0 = off) -> 429
+CLIENT_RATE_LIMIT = float(os.getenv("HOPER_CLIENT_RATE", "0"))
+CLIENT_BURST = int(os.getenv("HOPER_CLIENT_BURST", "10"))
+
+# Deadlines: end-to-end budget of a /chat or /chat/stream request (0 = none) -> 504 once spent.
+# Retrieval may use at most RETRIEVAL_TIMEOUT of it before the request falls back to a plain answer.
+REQUEST_DEADLINE = float(os.getenv("HOPER_REQUEST_DEADLINE", "60"))  # seconds
+RETRIEVAL_TIMEOUT = float(os.getenv("HOPER_RETRIEVAL_TIMEOUT", "5"))  # seconds
+# A stream only has to start within REQUEST_DEADLINE: once tokens flow, a long answer may take
+# as long as it needs, as long as no gap between chunks exceeds STREAM_IDLE_TIMEOUT
+STREAM_IDLE_TIMEOUT = float(os.getenv("HOPER_STREAM_IDLE_TIMEOUT", "20"))  # seconds
+# Each OpenAI HTTP attempt times out after LLM_TIMEOUT; retries are ours (not the SDK's), under the budget
+LLM_TIMEOUT = float(os.getenv("HOPER_LLM_TIMEOUT", "45"))  # seconds
+LLM_MAX_ATTEMPTS = int(os.getenv("HOPER_LLM_MAX_ATTEMPTS", "3"))  # first try + hedges + retries
+# Hedging (non-streaming calls): a duplicate request once the first runs past the recent p95 latency
+LLM_HEDGE = os.getenv("HOPER_LLM_HEDGE", "1") == "1"
+LLM_HEDGE_QUANTILE = float(os.getenv("HOPER_LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("HOPER_LLM_HEDGE_MIN_DELAY", "1"))   # seconds
+LLM_HEDGE_MAX_DELAY = float(os.getenv("HOPER_LLM_HEDGE_MAX_DELAY", "20"))  # also used until p95 is known
+# Hedges + retries may add at most this fraction of extra LLM calls, plus a small per-second reserve
+RETRY_BUDGET_RATIO = float(os.getenv("HOPER_RETRY_BUDGET", "0.1"))
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("HOPER_RETRY_BUDGET_MIN_PER_SECOND", "0.2"))
+
+# Circuit breaker around vector store queries (retrieval-cache misses; not embedding or reranking): once,
+# over the last BREAKER_WINDOW seconds (and at least BREAKER_MIN_CALLS queries), the error/timeout rate or
+# the share of queries slower than BREAKER_SLOW_CALL
+# reaches its threshold, answers skip the vector store for BREAKER_OPEN_SECONDS; then BREAKER_PROBES trial
+# requests decide whether to close it again
+RETRIEVAL_BREAKER = os.getenv("HOPER_RETRIEVAL_BREAKER", "1") == "1"
+BREAKER_WINDOW = float(os.getenv("HOPER_BREAKER_WINDOW", "30"))  # seconds
+BREAKER_MIN_CALLS = int(os.getenv("HOPER_BREAKER_MIN_CALLS", "10"))
+BREAKER_ERROR_RATE = float(os.getenv("HOPER_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_SLOW_CALL = float(os.getenv("HOPER_BREAKER_SLOW_CALL", "2"))  # seconds
+BREAKER_SLOW_RATE = float(os.getenv("HOPER_BREAKER_SLOW_RATE", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("HOPER_BREAKER_OPEN_SECONDS", "15"))
+BREAKER_PROBES = int(os.getenv("HOPER_BREAKER_PROBES", "3"))
+
 # -----------------------------
 # Pydantic Models
 # -----------------------------
 class ChatRequest(BaseModel):
     prompt: str
-    k_top: Optional[int] = None  # Optional override for top-k documents
+    k_top: Optional[int] = Field(default=None, ge=1, le=K_TOP_MAX)  # Optional override for top-k documents
 
 
 class ChatResponse(BaseModel):
     answer: str
     used_rag: bool
     sources: Optional[List[Dict[str, str]]] = None
+    faq: bool = False  # curated answer from hoperkb.txt
+
+
+class ReindexJobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | succeeded | failed
+    full: bool
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    chunks_embedded: int = 0
+    chunks_expected: Optional[int] = None
+    chunks_per_sec: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    summary: Optional[Dict[str, Any]] = None
+    errors: List[str] = []
+    cleanup: Optional[str] = None  # what happened to a failed full build's namespace
 
 
 # -----------------------------
@@ -97,12 +260,6 @@ def find_data_dir() -> str:
     )
 
 
-def iter_pdf_documents(data_dir: str) -> Iterator:
-    """Yield PDF Documents lazily so we don't reload everything repeatedly."""
-    loader = DirectoryLoader(data_dir, glob="*.pdf", loader_cls=PyPDFLoader)
-    yield from loader.lazy_load()
-
-
 def build_splitter() -> RecursiveCharacterTextSplitter:
     return RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
@@ -130,8 +287,124 @@ def iter_chunk_batches(
         yield buffer
 
 
+_ingest_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_ingest_pool() -> ProcessPoolExecutor:
+    global _ingest_pool
+    if _ingest_pool is None:
+        # spawn: never fork a process that already runs uvicorn/executor threads
+        _ingest_pool = ProcessPoolExecutor(
+            max_workers=INGEST_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _ingest_pool
+
+
+def reset_ingest_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool (worker OOM/crash, spawn failure); the next get_ingest_pool() starts a fresh one."""
+    global _ingest_pool
+    pool.shutdown(wait=False, cancel_futures=True)
+    if _ingest_pool is pool:
+        _ingest_pool = None
+
+
+def iter_pdf_chunk_batches(paths: Iterable[Path], batch_size: int = 32) -> Iterator[List]:
+    """
+    Parse + split PDFs and yield batches of chunks, in page order.
+    With INGEST_WORKERS > 1 page ranges are processed on a process pool; at most
+    2 tasks per worker are in flight so memory stays bounded while streaming.
+    A pool that breaks is replaced; the run is retried once if nothing was yielded yet.
+    """
+    if INGEST_WORKERS <= 1:
+        docs = (doc for path in paths for doc in PyPDFLoader(str(path)).lazy_load())
+        yield from iter_chunk_batches(docs, batch_size=batch_size)
+        return
+
+    paths = list(paths)
+    yielded = False
+    for attempt in (1, 2):
+        pool = get_ingest_pool()
+        try:
+            for batch in iter_pool_chunk_batches(pool, paths, batch_size):
+                yielded = True
+                yield batch
+            return
+        except BrokenProcessPool:
+            reset_ingest_pool(pool)
+            # Batches already yielded are downstream: a rerun from the start would process them twice
+            if yielded or attempt == 2:
+                raise
+            print("❌ Ingest worker pool broke; retrying with a fresh pool")
+
+
+def iter_pool_chunk_batches(pool: ProcessPoolExecutor, paths: List[Path], batch_size: int) -> Iterator[List]:
+    tasks = (
+        (str(path), start, start + PAGES_PER_TASK)
+        for path in paths
+        for start in range(0, count_pages(str(path)), PAGES_PER_TASK)
+    )
+    pending: deque = deque()
+    buffer: List = []
+
+    def drain_one():
+        buffer.extend(pending.popleft().result())
+
+    for path, start, stop in tasks:
+        pending.append(pool.submit(parse_and_split_pages, path, start, stop, CHUNK_SIZE, CHUNK_OVERLAP))
+        if len(pending) >= INGEST_WORKERS * 2:
+            drain_one()
+        while len(buffer) >= batch_size:
+            yield buffer[:batch_size]
+            buffer = buffer[batch_size:]
+
+    while pending:
+        drain_one()
+        while len(buffer) >= batch_size:
+            yield buffer[:batch_size]
+            buffer = buffer[batch_size:]
+
+    if buffer:
+        yield buffer
+
+
 def get_embeddings():
-    return HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+    embeddings = build_embedding_engine(
+        EMBED_MODEL,
+        backend=EMBED_BACKEND,
+        device=EMBED_DEVICE,
+        batch_size=EMBED_BATCH_SIZE,
+        threads=EMBED_THREADS,
+    )
+    if EMBED_CACHE_PATH:
+        # Keyed per backend: int8 vectors are close to, not equal to, the fp32 ones
+        return CachedEmbeddings(embeddings, model_name=engine_id(EMBED_MODEL, EMBED_BACKEND), path=EMBED_CACHE_PATH)
+    return embeddings
+
+
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_WORKERS,
+    thread_name_prefix="hoper-blocking",
+)
+
+
+_retrieval_executor = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_WORKERS,
+    thread_name_prefix="hoper-retrieval",
+)
+
+
+async def run_on(executor: ThreadPoolExecutor, fn: Callable, *args, **kwargs):
+    """Run a blocking call on `executor` without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    # Carry contextvars (the request's timing trace and deadline) into the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, partial(context.run, fn, *args, **kwargs))
+
+
+async def run_blocking(fn: Callable, *args, **kwargs):
+    """Run a blocking call on the bounded executor without stalling the event loop."""
+    return await run_on(_blocking_executor, fn, *args, **kwargs)
 
 
 def get_pinecone_client() -> Pinecone:
@@ -156,72 +429,652 @@ def ensure_index(pc: Pinecone, index_name: str):
         )
 
 
+def ensure_vector_backend():
+    """Make sure the configured vector store backend is reachable/created."""
+    if VECTOR_BACKEND == "local":
+        Path(LOCAL_INDEX_DIR).mkdir(parents=True, exist_ok=True)
+        return
+    if VECTOR_BACKEND != "pinecone":
+        raise RuntimeError(f"Unknown HOPER_VECTOR_BACKEND={VECTOR_BACKEND!r} (use 'pinecone' or 'local').")
+    pc = get_pinecone_client()
+    ensure_index(pc, INDEX_NAME)
+
+
+# -----------------------------
+# Index manifest (per-file fingerprints + deterministic chunk ids)
+# -----------------------------
+def manifest_path(index_name: str) -> str:
+    # Keep the manifest next to the vectors it describes so they can't drift apart
+    if VECTOR_BACKEND == "local":
+        return os.path.join(LOCAL_INDEX_DIR, "manifest.json")
+    return str(Path(__file__).parent / "cache" / f"{VECTOR_BACKEND}-{index_name}.manifest.json")
+
+
+def read_manifest(index_name: str) -> Dict[str, Any]:
+    path = manifest_path(index_name)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_manifest(index_name: str) -> Dict[str, Dict[str, Any]]:
+    return read_manifest(index_name).get("files", {})
+
+
+def active_namespace(index_name: str) -> Optional[str]:
+    """Pinecone namespace currently serving traffic (None = default namespace)."""
+    return read_manifest(index_name).get("namespace")
+
+
+def save_manifest(
+    index_name: str,
+    files: Dict[str, Dict[str, Any]],
+    namespace: Optional[str] = None,
+    pending: Optional[Dict[str, List[str]]] = None,
+):
+    """
+    `files` is the last state fully written to the store. `pending` journals a sync in
+    progress: ids it may have upserted and ids it meant to delete. A manifest without
+    it describes a complete run; with it, the next sync cleans up what was left behind.
+    """
+    path = manifest_path(index_name)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "embed_model": EMBED_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "namespace": namespace,
+        "files": files,
+    }
+    if pending:
+        payload["pending"] = pending
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+def lexical_index_path(index_name: str) -> str:
+    # BM25 inverted index, written together with the manifest
+    return str(Path(manifest_path(index_name)).with_name(
+        "lexical.json" if VECTOR_BACKEND == "local" else f"{VECTOR_BACKEND}-{index_name}.lexical.json"
+    ))
+
+
+def load_lexical_index(index_name: str) -> BM25Index:
+    return BM25Index.load(lexical_index_path(index_name))
+
+
+def manifest_is_compatible(index_name: str) -> bool:
+    """A manifest built with other chunking/model settings can't be diffed against."""
+    payload = read_manifest(index_name)
+    return bool(payload) and (
+        payload.get("embed_model") == EMBED_MODEL
+        and payload.get("chunk_size") == CHUNK_SIZE
+        and payload.get("chunk_overlap") == CHUNK_OVERLAP
+    )
+
+
+def list_pdf_files(data_dir: str) -> List[Path]:
+    return sorted(Path(data_dir).glob("*.pdf"))
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: Path) -> Dict[str, Any]:
+    stat = path.stat()
+    return {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": file_sha256(path)}
+
+
+def source_key(doc, data_dir: str) -> str:
+    meta = getattr(doc, "metadata", {}) or {}
+    src = meta.get("source") or meta.get("file_path") or ""
+    return os.path.relpath(src, data_dir) if src else ""
+
+
+def assign_chunk_ids(chunks: List, data_dir: str, seen: Dict[tuple, int]) -> List[str]:
+    """
+    Deterministic ids from (file, page, content hash, occurrence): an unchanged
+    chunk keeps its id across reindexes, an edited one gets a new id.
+    `seen` tracks repeats of identical text on the same page across batches.
+    """
+    ids = []
+    for chunk in chunks:
+        rel = source_key(chunk, data_dir)
+        page = (chunk.metadata or {}).get("page", "")
+        text_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+        key = (rel, page, text_hash)
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        raw = f"{rel}\x00{page}\x00{text_hash}\x00{occurrence}"
+        ids.append(hashlib.sha1(raw.encode("utf-8")).hexdigest())
+    return ids
+
+
+def delete_ids(vectorstore, ids: List[str]):
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        vectorstore.delete(ids=ids[start:start + DELETE_BATCH_SIZE])
+
+
+# -----------------------------
+# Ingest
+# -----------------------------
+_STOP = object()
+
+
+def upsert_vectors(vectorstore, chunks: List, ids: List[str], vectors: List[List[float]]):
+    """Write precomputed embeddings (the embed stage already ran the model)."""
+    if isinstance(vectorstore, LocalVectorStore):
+        vectorstore.add_vectors(
+            vectors,
+            [c.page_content for c in chunks],
+            metadatas=[c.metadata for c in chunks],
+            ids=ids,
+        )
+        return
+    # Same record layout PineconeVectorStore.add_texts writes: text under the text key
+    records = [
+        {
+            "id": chunk_id,
+            "values": vector,
+            "metadata": {**(chunk.metadata or {}), vectorstore._text_key: chunk.page_content},
+        }
+        for chunk, chunk_id, vector in zip(chunks, ids, vectors)
+    ]
+    vectorstore.index.upsert(vectors=records, namespace=vectorstore._namespace)
+
+
+def run_ingest_pipeline(
+    batches: Iterable,
+    vectorstore,
+    embeddings,
+    progress_callback: Optional[Callable[[int], None]] = None,
+    lexical: Optional[BM25Index] = None,
+) -> int:
+    """
+    Run parse -> embed -> upsert as concurrent stages.
+    `batches` yields (chunks, ids); iterating it is the parse stage. One thread
+    embeds, UPSERT_CONCURRENCY threads upsert (and add chunks to `lexical`). Queues hold at most
+    INGEST_QUEUE_DEPTH batches, so a slow stage throttles the ones before it.
+    The first error stops every stage and is re-raised. Returns chunks upserted.
+    """
+    embed_q: queue.Queue = queue.Queue(maxsize=INGEST_QUEUE_DEPTH)
+    upsert_q: queue.Queue = queue.Queue(maxsize=INGEST_QUEUE_DEPTH)
+    failed = threading.Event()
+    errors: List[BaseException] = []
+    count_lock = threading.Lock()
+    upserted = [0]
+
+    def fail(e: BaseException):
+        errors.append(e)
+        failed.set()
+
+    def put(q: queue.Queue, item) -> bool:
+        # Never block forever on a queue whose consumer died
+        while not failed.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q: queue.Queue):
+        while not failed.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _STOP
+
+    def parse_stage():
+        try:
+            batch_iter = iter(batches)
+            while True:
+                with span("ingest_parse"):
+                    item = next(batch_iter, None)
+                if item is None:
+                    break
+                if not put(embed_q, item):
+                    return
+        except BaseException as e:
+            fail(e)
+        finally:
+            put(embed_q, _STOP)
+
+    def embed_stage():
+        try:
+            while True:
+                item = get(embed_q)
+                if item is _STOP:
+                    break
+                chunks, ids = item
+                with span("ingest_embed"):
+                    vectors = embeddings.embed_documents([c.page_content for c in chunks])
+                if not put(upsert_q, (chunks, ids, vectors)):
+                    break
+        except BaseException as e:
+            fail(e)
+        finally:
+            for _ in range(UPSERT_CONCURRENCY):
+                put(upsert_q, _STOP)
+
+    def upsert_stage():
+        try:
+            while True:
+                item = get(upsert_q)
+                if item is _STOP:
+                    break
+                chunks, ids, vectors = item
+                with span("ingest_upsert"):
+                    upsert_vectors(vectorstore, chunks, ids, vectors)
+                if lexical is not None:
+                    lexical.add(ids, [c.page_content for c in chunks], [c.metadata for c in chunks])
+                with count_lock:
+                    upserted[0] += len(chunks)
+                    if progress_callback:
+                        progress_callback(upserted[0])
+        except BaseException as e:
+            fail(e)
+
+    threads = [
+        threading.Thread(target=parse_stage, name="hoper-ingest-parse"),
+        threading.Thread(target=embed_stage, name="hoper-ingest-embed"),
+    ] + [
+        threading.Thread(target=upsert_stage, name=f"hoper-ingest-upsert-{i}")
+        for i in range(max(UPSERT_CONCURRENCY, 1))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise errors[0]
+    return upserted[0]
+
+
 def rebuild_index_from_pdfs(
     index_name: str,
     data_dir: str,
     embeddings,
     batch_size: int = 32,
     progress_callback: Optional[Callable[[int], None]] = None,
+    expected_callback: Optional[Callable[[int], None]] = None,
+    cleanup_callback: Optional[Callable[[str], None]] = None,
 ):
-    """Clear the index and repopulate it in batches to avoid long blocking operations."""
-    vectorstore = PineconeVectorStore.from_existing_index(
-        index_name=index_name,
-        embedding=embeddings,
-    )
-    vectorstore.delete(delete_all=True)
+    """
+    Clear the index and repopulate it in batches to avoid long blocking operations.
+    The store serving traffic is untouched until the caller swaps in the result:
+    local builds a fresh in-memory copy, Pinecone builds into a new namespace.
+    If the build fails before the manifest switches to that namespace, the namespace is
+    deleted again (reported through cleanup_callback) so retries don't leak index copies.
+    """
+    if expected_callback and manifest_is_compatible(index_name):
+        # Best estimate of the work ahead: what the last build produced
+        expected_callback(sum(len(f.get("chunk_ids", [])) for f in load_manifest(index_name).values()))
+
+    namespace = None
+    if VECTOR_BACKEND == "pinecone":
+        namespace = f"build-{int(time.time())}"
+        vectorstore = load_existing_index(index_name, embeddings, namespace=namespace)
+    else:
+        vectorstore = load_existing_index(index_name, embeddings)
+        vectorstore.delete(delete_all=True)
+
+    files = {
+        os.path.relpath(path, data_dir): {**file_fingerprint(path), "chunk_ids": []}
+        for path in list_pdf_files(data_dir)
+    }
 
-    splitter = build_splitter()
-    total_chunks = 0
+    def batches():
+        seen: Dict[tuple, int] = {}
+        for chunk_batch in iter_pdf_chunk_batches(list_pdf_files(data_dir), batch_size=batch_size):
+            ids = assign_chunk_ids(chunk_batch, data_dir, seen)
+            for chunk, chunk_id in zip(chunk_batch, ids):
+                files.setdefault(source_key(chunk, data_dir), {"chunk_ids": []})["chunk_ids"].append(chunk_id)
+            yield chunk_batch, ids
 
-    for chunk_batch in iter_chunk_batches(
-        iter_pdf_documents(data_dir),
-        batch_size=batch_size,
-        splitter=splitter,
-    ):
-        vectorstore.add_documents(chunk_batch)
-        total_chunks += len(chunk_batch)
-        if progress_callback:
-            progress_callback(total_chunks)
+    lexical = BM25Index()
+    try:
+        run_ingest_pipeline(batches(), vectorstore, embeddings, progress_callback=progress_callback, lexical=lexical)
+
+        if isinstance(vectorstore, LocalVectorStore):
+            vectorstore.save()
+        lexical.save(lexical_index_path(index_name))
+        save_manifest(index_name, files, namespace=namespace)
+    except BaseException:
+        if namespace is not None and active_namespace(index_name) != namespace:
+            outcome = discard_build_namespace(index_name, namespace, embeddings)
+            if cleanup_callback:
+                cleanup_callback(outcome)
+        raise
 
     return vectorstore
 
 
-def load_existing_index(index_name: str, embeddings):
-    return PineconeVectorStore.from_existing_index(
-        index_name=index_name,
-        embedding=embeddings,
+def sync_index_from_pdfs(
+    index_name: str,
+    data_dir: str,
+    embeddings,
+    batch_size: int = 32,
+    progress_callback: Optional[Callable[[int], None]] = None,
+    expected_callback: Optional[Callable[[int], None]] = None,
+    cleanup_callback: Optional[Callable[[str], None]] = None,
+):
+    """
+    Incrementally bring the index in line with the PDFs in data_dir.
+    Only chunks of new/edited files are embedded and upserted; vectors of removed
+    files and edited-away pages are deleted afterwards, so the index is never empty.
+    Before a file's chunks are upserted, its new and stale ids are journalled in the
+    manifest's "pending" section; the manifest is only marked complete after the deletes.
+    A run that crashed in between is finished by the next one: journalled ids no file
+    references any more are deleted then.
+    Falls back to a full rebuild when there is no usable manifest.
+    Returns (vectorstore, summary).
+    """
+    vectorstore = load_existing_index(index_name, embeddings)
+    manifest = load_manifest(index_name)
+    committed = load_manifest(index_name)  # what the manifest on disk keeps saying until the run completes
+    namespace = active_namespace(index_name)
+    previous_pending = read_manifest(index_name).get("pending") or {}
+    journal = {
+        "upserted": list(previous_pending.get("upserted", [])),
+        "stale": list(previous_pending.get("stale", [])),
+    }
+    leftover = set(journal["upserted"]) | set(journal["stale"])  # from a run that did not finish
+    empty_local = isinstance(vectorstore, LocalVectorStore) and len(vectorstore) == 0
+    no_lexical = not os.path.exists(lexical_index_path(index_name))  # built before hybrid search existed
+    if not manifest or empty_local or no_lexical or not manifest_is_compatible(index_name):
+        vectorstore = rebuild_index_from_pdfs(
+            index_name, data_dir, embeddings,
+            batch_size=batch_size,
+            progress_callback=progress_callback,
+            expected_callback=expected_callback,
+            cleanup_callback=cleanup_callback,
+        )
+        return vectorstore, {"mode": "full", "files": len(load_manifest(index_name))}
+
+    summary = {
+        "mode": "incremental",
+        "files_unchanged": 0,
+        "files_changed": 0,
+        "files_added": 0,
+        "files_removed": 0,
+        "chunks_upserted": 0,
+        "chunks_deleted": 0,
+        "resumed": bool(previous_pending),
+    }
+    current = {os.path.relpath(path, data_dir): path for path in list_pdf_files(data_dir)}
+    stale_ids: List[str] = []
+
+    def batches():
+        expected = 0
+        for rel, path in current.items():
+            previous = manifest.get(rel)
+            stat = path.stat()
+            if previous and previous.get("mtime") == stat.st_mtime and previous.get("size") == stat.st_size:
+                summary["files_unchanged"] += 1
+                continue
+
+            fingerprint = file_fingerprint(path)
+            if previous and previous.get("sha256") == fingerprint["sha256"]:
+                # Touched but not modified
+                manifest[rel] = {**previous, **fingerprint}
+                summary["files_unchanged"] += 1
+                continue
+
+            chunks = [chunk for batch in iter_pdf_chunk_batches([path], batch_size=batch_size) for chunk in batch]
+            ids = assign_chunk_ids(chunks, data_dir, {})
+            old_ids = set(previous.get("chunk_ids", [])) if previous else set()
+            fresh = [(chunk, chunk_id) for chunk, chunk_id in zip(chunks, ids) if chunk_id not in old_ids]
+            expected += len(fresh)
+            if expected_callback:
+                expected_callback(expected)
+
+            # Stale ids are only deleted once every upsert has landed
+            file_stale = sorted(old_ids - set(ids))
+            stale_ids.extend(file_stale)
+            summary["files_changed" if previous else "files_added"] += 1
+            manifest[rel] = {**fingerprint, "chunk_ids": ids}
+
+            journal["upserted"].extend(chunk_id for _, chunk_id in fresh)
+            journal["stale"].extend(file_stale)
+            save_manifest(index_name, committed, namespace=namespace, pending=journal)
+
+            for start in range(0, len(fresh), batch_size):
+                batch = fresh[start:start + batch_size]
+                yield [c for c, _ in batch], [i for _, i in batch]
+
+    lexical = load_lexical_index(index_name)
+    summary["chunks_upserted"] = run_ingest_pipeline(
+        batches(), vectorstore, embeddings, progress_callback=progress_callback, lexical=lexical,
     )
 
+    for rel in sorted(set(manifest) - set(current)):
+        stale_ids.extend(manifest.pop(rel).get("chunk_ids", []))
+        summary["files_removed"] += 1
 
-def build_rag_chain(retriever: BaseRetriever, llm: ChatOpenAI) -> Runnable:
-    # Let answers be complete/clear; do not limit to 3 sentences.
-    system_prompt = (
-        "You are HOPEr, an empathetic and wise spiritual guide and healing companion, which basically stands for Hope, Openness, Positivity, and Empathy through Responsible AI. Your tagline is 'turning moments of stress into steps of hope'. Your purpose is to share spiritual knowledge, emotional support, and guidance to help users overcome mental and emotional struggles, regain inner peace, and grow spiritually.\n"
-        "Use the retrieved context to answer accurately. If the answer is not in the context, "
-        "Your core objectives are to provide spiritual insight grounded in compassion, mindfulness, and wisdom, offering comfort and clarity to users experiencing stress, anxiety, sadness, or confusion. You help users reconnect with their inner self, faith, or universal consciousness while encouraging practical actions such as mindfulness, gratitude, reflection, journaling, prayer, or meditation to foster healing. Throughout every interaction, you maintain a non-judgmental, safe, and positive space for emotional and spiritual growth.Your tone and personality should remain warm, compassionate, reassuring, and gentle - speaking like a wise friend or mentor rather than a therapist or preacher. Avoid formality or robotic phrasing; respond with calm energy and emotional sensitivity, using simple yet profound language that inspires introspection and hope.When responding, always acknowledge emotions first and show empathy before offering insight - for example, \"I understand how heavy that must feel. Let's take a deep breath together.\" Blend spiritual and psychological wisdom while staying within supportive conversation, never offering medical or diagnostic advice. Encourage self-awareness, self-compassion, and gentle reflection, and when appropriate, include short guided reflections, affirmations, breathing or mindfulness exercises, or inclusive spiritual teachings from diverse traditions. If a user is in deep distress or crisis, gently encourage seeking professional help or contacting a mental health helpline while providing compassionate support. You must not diagnose, prescribe, or replace therapy or medical advice. Avoid controversial religious claims, conspiracy, or superstition, and always respect all beliefs - remaining inclusive, neutral, and open-minded across spiritual paths. Uphold privacy, sensitivity, and safety in every response.Your communication style should embody peace and presence, for example: \"Peace begins within you. Let's take a quiet moment to feel your breath. You are safe, guided, and growing - even if it feels uncertain right now. Tell me what's been on your heart lately.\"\n"
-        "Cite key points briefly when possible.\n\n{context}"
+    # Chunks an interrupted run upserted (or failed to delete) that no file references now
+    live = {chunk_id for entry in manifest.values() for chunk_id in entry.get("chunk_ids", [])}
+    stale_ids.extend(sorted(leftover - live - set(stale_ids)))
+
+    delete_ids(vectorstore, stale_ids)
+    lexical.delete(stale_ids)
+    summary["chunks_deleted"] = len(stale_ids)
+
+    if isinstance(vectorstore, LocalVectorStore):
+        vectorstore.save()
+    lexical.save(lexical_index_path(index_name))
+    save_manifest(index_name, manifest, namespace=namespace)  # complete: no pending section
+
+    return vectorstore, summary
+
+
+def load_existing_index(index_name: str, embeddings, namespace: Optional[str] = None):
+    if VECTOR_BACKEND == "local":
+        return LocalVectorStore.load(
+            LOCAL_INDEX_DIR,
+            embedding=embeddings,
+            dim=EMBED_DIM,
+            index_type=LOCAL_INDEX_TYPE,
+        )
+    return PineconeVectorStore(
+        index=DeadlineBoundIndex(PineconeVectorStore.get_pinecone_index(index_name)),
+        embedding=embeddings,
+        namespace=namespace if namespace is not None else active_namespace(index_name),
     )
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            ("human", "{input}"),
-        ]
+
+
+class DeadlineBoundIndex:
+    """
+    Pinecone Index whose queries carry the caller's remaining() as their HTTP timeout.
+    langchain_pinecone passes no timeout, and cancelling the awaiting request does not
+    stop the worker thread: without this a slow store keeps retrieval threads busy.
+    """
+
+    def __init__(self, index):
+        self._index = index
+
+    def __getattr__(self, name: str):
+        return getattr(self._index, name)
+
+    def query(self, *args, **kwargs):
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                raise DeadlineExceeded("no time left for the vector store query")
+            kwargs.setdefault("_request_timeout", left)
+        return self._index.query(*args, **kwargs)
+
+
+def retire_namespace(index_name: str, namespace: Optional[str], embeddings):
+    """Drop a Pinecone namespace that no longer serves traffic."""
+    load_existing_index(index_name, embeddings, namespace=namespace or "").delete(delete_all=True)
+
+
+def discard_build_namespace(index_name: str, namespace: str, embeddings) -> str:
+    """Delete the namespace of a full build that never went live; returns what happened."""
+    try:
+        retire_namespace(index_name, namespace, embeddings)
+    except Exception as e:
+        print(f"❌ Could not delete unfinished build namespace {namespace}: {e}")
+        return f"failed to delete build namespace {namespace}: {e}"
+    print(f"✅ Deleted unfinished build namespace {namespace}")
+    return f"deleted build namespace {namespace}"
+
+
+def normalize_prompt(prompt: str) -> str:
+    # MiniLM is uncased, so case/whitespace variants embed the same
+    return " ".join(prompt.lower().split())
+
+
+def embed_query_cached(embeddings, prompt: str) -> List[float]:
+    key = normalize_prompt(prompt)
+    vector = _query_embedding_cache.get(key)
+    if vector is None:
+        with span("embed"):
+            vector = embeddings.embed_query(key)
+        _query_embedding_cache.put(key, vector)
+    return vector
+
+
+def vector_key(vector: List[float]) -> str:
+    return hashlib.sha1(array("f", vector).tobytes()).hexdigest()
+
+
+def retrieve_scored(
+    retriever: BaseRetriever,
+    question: str,
+    query_vector: Optional[List[float]] = None,
+    k: Optional[int] = None,
+) -> List[Tuple[Any, float]]:
+    """
+    Retrieve (doc, cosine score) pairs from the shared retriever's vector store.
+    `k` is a per-call override (no per-k retriever is built), and an already
+    computed query embedding is reused when given. Store queries (retrieval-cache
+    misses) go through the retrieval circuit breaker: CircuitOpen while it is open.
+    """
+    k = k or getattr(retriever, "search_kwargs", {}).get("k", K_TOP)
+    vectorstore = retriever.vectorstore
+    if query_vector is None:
+        query_vector = embed_query_cached(vectorstore.embeddings, question)
+
+    key = (id(retriever), vector_key(query_vector), k)
+    scored = _retrieval_cache.get(key)
+    if scored is None:
+        # Only the store's own failures and slowness count: DeadlineExceeded means the
+        # request had no time left for the query, which says nothing about the store
+        with _retrieval_breaker.guard(neutral=(DeadlineExceeded,)):
+            if isinstance(retriever, HybridRetriever):
+                scored = retriever.search_with_scores(question, query_vector, k)
+            else:
+                scored = vectorstore.similarity_search_by_vector_with_score(query_vector, k=k)
+        _retrieval_cache.put(key, scored)
+    return list(scored)
+
+
+def retrieve_docs(
+    retriever: BaseRetriever,
+    question: str,
+    query_vector: Optional[List[float]] = None,
+    k: Optional[int] = None,
+) -> List:
+    return [doc for doc, _ in retrieve_scored(retriever, question, query_vector, k)]
+
+
+def retrieve_ranked(
+    pipeline: "Pipeline",
+    question: str,
+    query_vector: Optional[List[float]],
+    k: int,
+) -> List[Tuple[Any, float]]:
+    """
+    Scored retrieval for the request path. With a reranker: retrieve
+    RERANK_CANDIDATES, keep the k best by cross-encoder score.
+    """
+    if pipeline.reranker is None:
+        with span("retrieve"):
+            return retrieve_scored(pipeline.retriever, question, query_vector, k)
+    with span("retrieve"):
+        candidates = retrieve_scored(pipeline.retriever, question, query_vector, max(k, RERANK_CANDIDATES))
+    with span("rerank"):
+        return pipeline.reranker.rerank(normalize_prompt(question), candidates, top_n=k)
+
+
+async def retrieve_guarded(
+    pipeline: "Pipeline",
+    question: str,
+    query_vector: Optional[List[float]],
+    k: int,
+) -> List[Tuple[Any, float]]:
+    """
+    retrieve_ranked for the endpoints: bounded by RETRIEVAL_TIMEOUT and the request deadline.
+    The circuit breaker sits in retrieve_scored, around the store query alone: embedding,
+    reranking and retrieval-cache hits neither count against it nor are refused by it.
+    """
+    # Inside the worker, remaining() is this timeout: the store query is cut off with it
+    return await with_deadline(
+        run_on(_retrieval_executor, retrieve_ranked, pipeline, question, query_vector, k), RETRIEVAL_TIMEOUT
     )
 
+
+def select_relevant(scored: List[Tuple[Any, float]], min_score: float = RAG_MIN_SCORE) -> List:
+    """Docs whose score clears the relevance threshold, in retrieval (best-first) order."""
+    return [doc for doc, score in scored if score >= min_score]
+
+
+def should_use_rag(context_docs: List) -> bool:
+    return len(context_docs) >= max(FALLBACK_IF_CONTEXT_LT, 1)
+
+
+def pack_docs(docs: List) -> List:
+    """Best-first docs -> de-duplicated passages that fit CONTEXT_MAX_TOKENS."""
+    passages, _ = pack_context(docs or [], CONTEXT_MAX_TOKENS, max_overlap=CHUNK_OVERLAP)
+    return passages
+
+
+def build_rag_chain(retriever: BaseRetriever, llm: ChatOpenAI) -> Runnable:
     def rag_fn(inputs: Dict[str, Any]) -> Dict[str, Any]:
         question = inputs.get("input") or inputs.get("question") or ""
-        docs = retriever.get_relevant_documents(question)
-        context_text = "\n\n".join([doc.page_content for doc in docs]) if docs else ""
-        messages = prompt.format_messages(context=context_text, input=question)
-        llm_response = llm.invoke(messages)
+        docs = inputs.get("context_docs")
+        if docs is None:
+            docs = retrieve_docs(retriever, question, inputs.get("query_vector"), inputs.get("k"))
+        docs = pack_docs(docs)
+        messages = rag_messages(join_passages(docs), question)
+        with span("llm_rag"):
+            llm_response = llm.invoke(messages)
         answer_text = getattr(llm_response, "content", str(llm_response))
-        return {"answer": answer_text, "context": docs}
+        return {"answer": answer_text, "context": docs, "usage": getattr(llm_response, "usage_metadata", None)}
 
-    return RunnableLambda(rag_fn)
+    async def arag_fn(inputs: Dict[str, Any]) -> Dict[str, Any]:
+        question = inputs.get("input") or inputs.get("question") or ""
+        docs = inputs.get("context_docs")
+        if docs is None:
+            # Embedding the query is CPU-bound -> bounded executor; the LLM call is awaited.
+            docs = await run_blocking(retrieve_docs, retriever, question, inputs.get("query_vector"), inputs.get("k"))
+        docs = await run_blocking(pack_docs, docs)  # tokenizing the passages is CPU work too
+        messages = rag_messages(join_passages(docs), question)
+        with span("llm_rag"):
+            llm_response = await _llm_calls.call(lambda: llm.ainvoke(messages))
+        answer_text = getattr(llm_response, "content", str(llm_response))
+        return {"answer": answer_text, "context": docs, "usage": getattr(llm_response, "usage_metadata", None)}
+
+    return RunnableLambda(rag_fn, afunc=arag_fn)
 
 
 def needs_fallback(answer_text: str, context_docs: List) -> bool:
-    """Fallback if zero/too-few docs or the answer looks uncertain/empty."""
+    """
+    Fallback if zero/too-few docs or the answer looks uncertain/empty.
+    Last resort only: retrieval scores already routed weak matches to plain mode.
+    """
     if not context_docs or len(context_docs) < FALLBACK_IF_CONTEXT_LT:
         return True
     if not answer_text:
@@ -230,19 +1083,92 @@ def needs_fallback(answer_text: str, context_docs: List) -> bool:
     return any(phrase in low for phrase in FALLBACK_IF_CONTAINS)
 
 
-def openai_fallback_answer(q: str, llm: ChatOpenAI) -> str:
-    """Plain LLM answer (no retrieval context)."""
-    system_fallback = (
-        "You are HOPEr, an empathetic and wise spiritual guide and healing companion. "
-        "Your tagline is 'turning moments of stress into steps of hope'. "
-        "Answer the user's question clearly and completely with compassion and wisdom."
-    )
-    fallback_prompt = ChatPromptTemplate.from_messages([
-        ("system", system_fallback),
-        ("human", "{q}"),
-    ])
-    messages = fallback_prompt.format_messages(q=q)
-    return llm.invoke(messages).content
+async def aopenai_fallback_answer(q: str, llm: ChatOpenAI) -> str:
+    """Async plain LLM answer (no retrieval context)."""
+    messages = fallback_messages(q)
+    with span("llm_fallback"):
+        message = await _llm_calls.call(lambda: llm.ainvoke(messages))
+    _llm_costs.record("fallback", getattr(message, "usage_metadata", None))
+    return message.content
+
+
+def start_speculative_fallback(q: str, llm: ChatOpenAI) -> asyncio.Task:
+    """Generate the plain answer in the background while the RAG answer is produced (already a hedge: not hedged again)."""
+    messages = fallback_messages(q)
+    return asyncio.create_task(_llm_calls.call(lambda: llm.ainvoke(messages), hedge=False))
+
+
+async def take_speculative_fallback(task: asyncio.Task, q: str, llm: ChatOpenAI) -> str:
+    """RAG lost: use the speculative plain answer (or call again if it failed)."""
+    try:
+        with span("llm_fallback"):  # only the part of the call not overlapped with RAG
+            message = await task
+    except Exception:
+        return await aopenai_fallback_answer(q, llm)
+    _llm_costs.record("speculative_fallback", getattr(message, "usage_metadata", None))
+    return message.content
+
+
+def discard_speculative_fallback(task: asyncio.Task):
+    """RAG won: cancel the plain answer if still running, else count it as waste."""
+    if not task.done():
+        task.cancel()
+        _llm_costs.cancelled("speculative_fallback")
+    elif not task.cancelled() and task.exception() is None:
+        _llm_costs.record("speculative_fallback", getattr(task.result(), "usage_metadata", None), used=False)
+
+
+async def astream_llm_text(
+    llm: ChatOpenAI,
+    messages: List,
+    usage: Optional[Dict[str, Any]] = None,
+    first_token_sent: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Yield non-empty text deltas from a streaming LLM call; token usage is copied into `usage`.
+    Not hedged (tokens are already on their way to the client). Until the client has its first
+    token the request deadline applies; after that, each chunk must come within STREAM_IDLE_TIMEOUT.
+    """
+    chunks = llm.astream(messages)
+    try:
+        while True:
+            try:
+                if first_token_sent:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), STREAM_IDLE_TIMEOUT)
+                else:
+                    chunk = await with_deadline(chunks.__anext__())
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError as e:
+                if isinstance(e, DeadlineExceeded):
+                    raise
+                raise asyncio.TimeoutError(f"LLM stream stalled: no output for {STREAM_IDLE_TIMEOUT:g}s") from None
+            if usage is not None and getattr(chunk, "usage_metadata", None):
+                usage.update(chunk.usage_metadata)  # sent once, on the final chunk
+            text = getattr(chunk, "content", "") or ""
+            if text:
+                first_token_sent = True
+                yield text
+    finally:
+        await chunks.aclose()
+
+
+def format_sources(context_docs: List) -> List[Dict[str, str]]:
+    sources = []
+    for doc in context_docs:
+        meta = getattr(doc, "metadata", {}) or {}
+        src = meta.get("source") or meta.get("file_path") or "Unknown source"
+        content = getattr(doc, "page_content", "") or ""
+        sources.append({
+            "source": src,
+            "content": content[:500] + ("…" if len(content) > 500 else "")
+        })
+    return sources
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 # -----------------------------
@@ -264,60 +1190,197 @@ app.add_middleware(
 )
 
 # Global state for initialized components
-_embeddings = None
-_retriever = None
-_llm = None
-_rag_chain = None
-
-
-def bootstrap_pipeline(k_top: int = K_TOP):
-    """Initialize the RAG pipeline components."""
-    global _embeddings, _retriever, _llm, _rag_chain
-    
-    if _rag_chain is not None:
-        # Already initialized, just update retriever if k_top changed
-        if k_top != K_TOP:
-            vectorstore = load_existing_index(INDEX_NAME, _embeddings)
-            _retriever = vectorstore.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": k_top}
-            )
-            _rag_chain = build_rag_chain(_retriever, _llm)
-        return _embeddings, _retriever, _llm, _rag_chain
-    
-    _embeddings = get_embeddings()
-
-    pc = get_pinecone_client()
-    ensure_index(pc, INDEX_NAME)
-
-    vectorstore = load_existing_index(INDEX_NAME, _embeddings)
+class Pipeline(NamedTuple):
+    embeddings: Any
+    vectorstore: Any
+    retriever: BaseRetriever
+    llm: ChatOpenAI
+    rag_chain: Runnable
+    faq: Optional[FAQIndex]
+    reranker: Optional[CrossEncoderReranker]
+    generation: int = 0  # bumped per reindex swap; tags response-cache puts
+
+
+# Replaced as a whole (never mutated), so a request always sees one consistent pipeline
+_pipeline: Optional[Pipeline] = None
+_pipeline_lock = threading.RLock()  # serialises bootstrap and reindex swaps
+_response_cache = SemanticResponseCache(
+    threshold=RESPONSE_CACHE_THRESHOLD,
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=RESPONSE_CACHE_TTL,
+)
+_query_embedding_cache = TTLCache(max_entries=QUERY_CACHE_MAX_ENTRIES, ttl_seconds=QUERY_CACHE_TTL)
+_retrieval_cache = TTLCache(max_entries=QUERY_CACHE_MAX_ENTRIES, ttl_seconds=QUERY_CACHE_TTL)
+_llm_costs = LLMCostMeter()
+
+# Scraped by /metrics from the counters these objects already keep
+STATS.caches.update({
+    "response": _response_cache.stats,
+    "query_embedding": _query_embedding_cache.stats,
+    "retrieval": _retrieval_cache.stats,
+    "embedding": lambda: _pipeline.embeddings.stats()
+    if _pipeline and isinstance(_pipeline.embeddings, CachedEmbeddings) else None,
+    "faq": lambda: _pipeline.faq.stats() if _pipeline and _pipeline.faq else None,
+    "rerank_score": lambda: _pipeline.reranker.stats()["score_cache"] if _pipeline and _pipeline.reranker else None,
+})
+STATS.llm_costs = _llm_costs.stats
+
+_llm_admission = AdmissionController(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT)
+_client_limiter = ClientRateLimiter(CLIENT_RATE_LIMIT, CLIENT_BURST)
+
+
+def admission_stats() -> Dict[str, Any]:
+    stats = _llm_admission.stats()
+    stats["shed"]["rate_limited"] = _client_limiter.stats()["rejected"]
+    return stats
+
+
+STATS.admission = admission_stats
+
+# Transient OpenAI failures worth another attempt (APITimeoutError is an APIConnectionError)
+LLM_RETRYABLE = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+_llm_calls = HedgedCaller(
+    RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN_PER_SECOND),
+    hedge=LLM_HEDGE,
+    quantile=LLM_HEDGE_QUANTILE,
+    min_delay=LLM_HEDGE_MIN_DELAY,
+    max_delay=LLM_HEDGE_MAX_DELAY,
+    max_attempts=LLM_MAX_ATTEMPTS,
+    retry_on=LLM_RETRYABLE,
+)
+STATS.llm_calls = _llm_calls.stats
+
+_retrieval_breaker = CircuitBreaker(
+    "retrieval",
+    window=BREAKER_WINDOW,
+    min_calls=BREAKER_MIN_CALLS,
+    error_rate=BREAKER_ERROR_RATE,
+    slow_call=BREAKER_SLOW_CALL,
+    slow_rate=BREAKER_SLOW_RATE,
+    open_seconds=BREAKER_OPEN_SECONDS,
+    probes=BREAKER_PROBES,
+    enabled=RETRIEVAL_BREAKER,
+)
+STATS.breakers["retrieval"] = _retrieval_breaker.stats
 
-    _retriever = vectorstore.as_retriever(
-        search_type="similarity",
-        search_kwargs={"k": k_top}
-    )
 
+def build_llm() -> ChatOpenAI:
     # Build LLM without artificial output cap
     llm_kwargs = {
         "model": OPENAI_MODEL,
         "temperature": TEMPERATURE,
+        "stream_usage": True,  # token usage for streamed answers too
+        "timeout": LLM_TIMEOUT,  # per HTTP attempt; for streams, the longest gap between chunks
+        "max_retries": 0,        # retried by _llm_calls under the retry budget instead
     }
     # Only set max_tokens if you WANT a cap; by default we omit it
     if MAX_TOKENS is not None:
         llm_kwargs["max_tokens"] = MAX_TOKENS
 
-    _llm = ChatOpenAI(**llm_kwargs)
+    return ChatOpenAI(**llm_kwargs)
+
+
+def build_retriever(vectorstore) -> BaseRetriever:
+    if SEARCH_TYPE == "hybrid":
+        return HybridRetriever(
+            vectorstore=vectorstore,
+            lexical=load_lexical_index(INDEX_NAME),
+            search_kwargs={"k": K_TOP},
+            lexical_score=RAG_MIN_SCORE,  # strong keyword-only hits still count as context
+        )
+    return vectorstore.as_retriever(
+        search_type="similarity",
+        search_kwargs={"k": K_TOP}
+    )
+
+
+def build_pipeline(
+    embeddings,
+    vectorstore,
+    llm: Optional[ChatOpenAI] = None,
+    reranker: Optional[CrossEncoderReranker] = None,
+    generation: int = 0,
+) -> Pipeline:
+    # One long-lived retriever; requests pass their own k at call time
+    retriever = build_retriever(vectorstore)
+    llm = llm or build_llm()
+    return Pipeline(
+        embeddings, vectorstore, retriever, llm, build_rag_chain(retriever, llm),
+        build_faq_index(embeddings), reranker or build_reranker(), generation,
+    )
+
+
+def build_reranker() -> Optional[CrossEncoderReranker]:
+    """Cross-encoder for the rerank stage; None (no rerank) if disabled or unavailable."""
+    if not RERANK_ENABLED:
+        return None
+    try:
+        reranker = CrossEncoderReranker(RERANK_MODEL, device=EMBED_DEVICE, batch_size=RERANK_BATCH_SIZE)
+    except Exception as e:
+        print(f"❌ Reranker disabled: {e}")
+        return None
+    print(f"✅ Reranker ready: {RERANK_MODEL} (top {RERANK_CANDIDATES} candidates)")
+    return reranker
+
+
+def build_faq_index(embeddings) -> Optional[FAQIndex]:
+    """FAQ index over hoperkb.txt; None (FAQ path off) if disabled or unavailable."""
+    if not FAQ_ENABLED or not os.path.exists(FAQ_PATH):
+        return None
+    try:
+        faq = FAQIndex.from_file(FAQ_PATH, embeddings=embeddings)
+    except Exception as e:
+        print(f"❌ FAQ index disabled: {e}")
+        return None
+    print(f"✅ FAQ index ready: {len(faq)} questions")
+    return faq
+
+
+def install_pipeline(embeddings, vectorstore):
+    """Atomically swap in a freshly built vector store (used after reindexing)."""
+    global _pipeline
+    with _pipeline_lock:
+        _pipeline = build_pipeline(
+            embeddings, vectorstore,
+            llm=_pipeline.llm if _pipeline else None,
+            reranker=_pipeline.reranker if _pipeline else None,  # scores don't depend on the index
+            generation=_pipeline.generation + 1 if _pipeline else _response_cache.generation + 1,
+        )
+        # Cached answers/sources/doc hits describe the old index; answers still in flight
+        # on the old pipeline carry its generation and are refused by the response cache
+        _response_cache.clear(generation=_pipeline.generation)
+        _retrieval_cache.clear()
+        _query_embedding_cache.clear()
+
+
+def bootstrap_pipeline() -> Pipeline:
+    """Initialize the RAG pipeline components (once)."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            return _pipeline
+
+        embeddings = get_embeddings()
+        ensure_vector_backend()
+        vectorstore = load_existing_index(INDEX_NAME, embeddings)
+        _pipeline = build_pipeline(embeddings, vectorstore)
+        return _pipeline
 
-    # RAG chain
-    _rag_chain = build_rag_chain(_retriever, _llm)
 
-    return _embeddings, _retriever, _llm, _rag_chain
+async def get_pipeline() -> Pipeline:
+    pipeline = _pipeline
+    if pipeline is not None:
+        return pipeline  # hot path: no lock, no executor hop
+    # First use may hit the network -> keep it off the event loop
+    return await run_blocking(bootstrap_pipeline)
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize the pipeline on startup."""
     # Environment variables already loaded at module level
+    # The tokenizer may need a download with no timeout: never on the loop, never blocking startup
+    threading.Thread(target=load_encoding, name="hoper-tokenizer", daemon=True).start()
     try:
         bootstrap_pipeline()
         print("✅ HOPEr API initialized successfully")
@@ -326,6 +1389,70 @@ async def startup_event():
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if _ingest_pool is not None:
+        _ingest_pool.shutdown(cancel_futures=True)
+
+
+# Answering endpoints: traced (stage breakdown + hoper_request_seconds), deadline-bound and rate limited per client
+CHAT_ENDPOINTS = {"/chat": "chat", "/chat/stream": "chat_stream"}
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    endpoint = CHAT_ENDPOINTS.get(request.url.path)
+    if endpoint is None:
+        return await call_next(request)
+    # The deadline and trace are copied into the endpoint's context, so they also cover a stream after this returns
+    with request_trace(endpoint) as trace, deadline_scope(REQUEST_DEADLINE):
+        response = await call_next(request)
+        if response.headers.get("content-type", "").startswith("text/event-stream"):
+            # call_next returns at response start; retrieval and generation run while the body is sent
+            trace.deferred = True
+            response.body_iterator = traced_stream(response.body_iterator, trace)
+        elif DEBUG_TIMING_HEADER:
+            response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+
+async def traced_stream(body: AsyncIterator[bytes], trace: RequestTrace) -> AsyncIterator[bytes]:
+    """Pass a stream's body through and record the request once it has been sent in full."""
+    try:
+        async for chunk in body:
+            yield chunk
+        if DEBUG_TIMING_HEADER:
+            yield sse_event("timing", {"server_timing": trace.server_timing()}).encode()
+    finally:
+        trace.finish()
+
+
+@app.middleware("http")
+async def limit_clients(request: Request, call_next):
+    endpoint = CHAT_ENDPOINTS.get(request.url.path)
+    if endpoint is not None and _client_limiter.enabled:
+        # Behind a proxy, run uvicorn with --proxy-headers so this is the real client
+        wait = _client_limiter.take(request.client.host if request.client else "unknown")
+        if wait > 0:
+            count_answer(endpoint, "rate_limited")
+            return JSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+    return await call_next(request)
+
+
+def shed_response(endpoint: str, error: Overloaded) -> HTTPException:
+    count_answer(endpoint, "shed")
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+
+
+def deadline_response(endpoint: str) -> HTTPException:
+    count_answer(endpoint, "deadline")
+    return HTTPException(status_code=504, detail=f"No answer within the {REQUEST_DEADLINE:g}s request deadline")
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -337,8 +1464,80 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+    """Health check endpoint; "degraded" while the retrieval breaker is not closed (answers skip RAG)."""
+    retrieval = _retrieval_breaker.stats()
+    return {"status": "healthy" if retrieval["state"] == "closed" else "degraded", "retrieval": retrieval}
+
+
+async def lookup_cached_response(embeddings, prompt: str, k_top: int):
+    """
+    Embed the prompt once (through the query-embedding cache) and check the
+    semantic response cache. Returns (cached_response, query_vector).
+    """
+    try:
+        query_vector = await with_deadline(run_blocking(embed_query_cached, embeddings, prompt))
+    except Exception:
+        return None, None
+    if not RESPONSE_CACHE_ENABLED:
+        return None, query_vector
+    return _response_cache.get(query_vector, k_top, text=prompt), query_vector
+
+
+def faq_response(match: FAQMatch) -> ChatResponse:
+    return ChatResponse(answer=match.entry.answer, used_rag=False, sources=None, faq=True)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the FAQ, response, query-embedding, retrieval and embedding caches."""
+    stats: Dict[str, Any] = {
+        "response_cache": _response_cache.stats(),
+        "query_embedding_cache": _query_embedding_cache.stats(),
+        "retrieval_cache": _retrieval_cache.stats(),
+    }
+    embeddings = _pipeline.embeddings if _pipeline else None
+    if isinstance(embeddings, CachedEmbeddings):
+        stats["embedding_cache"] = embeddings.stats()
+    if _pipeline is not None and _pipeline.faq is not None:
+        stats["faq"] = _pipeline.faq.stats()
+    return stats
+
+
+@app.get("/timings")
+async def timings():
+    """
+    Latency per stage (embed, retrieve, rerank, llm_rag, llm_fallback...) and rerank cache use.
+    Derived from the hoper_stage_seconds histogram on /metrics: percentiles are bucket estimates.
+    """
+    stats: Dict[str, Any] = {"stages": stage_summary()}
+    if _pipeline is not None and _pipeline.reranker is not None:
+        stats["reranker"] = _pipeline.reranker.stats()
+    return stats
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: stage/request latency histograms, answer modes, cache and token counters."""
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/admission")
+async def admission():
+    """LLM concurrency slots, wait queue and shed counts; per-client rate limit state."""
+    return {"llm": _llm_admission.stats(), "client_rate_limit": _client_limiter.stats()}
+
+
+@app.get("/llm/costs")
+async def llm_costs():
+    """
+    LLM calls and tokens per answer mode (incl. discarded speculative work),
+    plus hedges/retries issued under the retry budget.
+    """
+    return {
+        "speculative_fallback_enabled": SPECULATIVE_FALLBACK,
+        "modes": _llm_costs.stats(),
+        "hedging": _llm_calls.stats(),
+    }
 
 
 @app.post("/chat", response_model=ChatResponse)
@@ -357,103 +1556,389 @@ async def chat(request: ChatRequest):
     
     # Ensure pipeline is initialized
     try:
-        embeddings, retriever, llm, rag_chain = bootstrap_pipeline(k_top=k_top)
+        pipeline = await get_pipeline()
     except Exception as e:
+        count_answer("chat", "error")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to initialize pipeline: {str(e)}"
         )
     
-    used_fallback = False
+    # 0) Curated FAQ question (same or near-same wording) -> its answer, not even an embedding
+    faq_match = pipeline.faq.match_text(request.prompt) if pipeline.faq else None
+    if faq_match is not None:
+        count_answer("chat", "faq")
+        return faq_response(faq_match)
+
+    # Near-duplicate of a recent prompt -> cached answer, no retrieval or LLM call
+    cached, query_vector = await lookup_cached_response(pipeline.embeddings, request.prompt, k_top)
+    if cached is not None:
+        count_answer("chat", "cache")
+        return cached
+
+    # FAQ question phrased differently -> nearest curated question by embedding
+    faq_match = pipeline.faq.match_vector(query_vector, request.prompt) if pipeline.faq else None
+    if faq_match is not None:
+        count_answer("chat", "faq")
+        return faq_response(faq_match)
+
+    # Everything below needs the LLM: if it is saturated, shed before doing retrieval work
+    try:
+        _llm_admission.check()
+    except Overloaded as e:
+        raise shed_response("chat", e)
+
     answer = ""
     context_docs = []
     sources = None
 
+    # 1) Scored retrieval decides RAG vs plain before any LLM call
     try:
-        # 1) Try RAG
-        rag_resp = rag_chain.invoke({"input": request.prompt})
-        # LangChain can return 'answer' or 'result'
-        answer = (rag_resp.get("answer") or rag_resp.get("result") or "").strip()
-        context_docs = rag_resp.get("context", []) or []
-    except Exception as e:
-        # Any RAG error -> fallback
-        used_fallback = True
-        answer = openai_fallback_answer(request.prompt, llm)
-
-    # 2) Heuristic fallback if RAG outcome is weak
-    if not used_fallback and needs_fallback(answer, context_docs):
-        used_fallback = True
-        answer = openai_fallback_answer(request.prompt, llm)
+        scored = await retrieve_guarded(pipeline, request.prompt, query_vector, k_top)
+        context_docs = select_relevant(scored)
+    except Exception:
+        # Any retrieval error or timeout, or the breaker is open -> fallback
+        scored, context_docs = [], []
+    used_fallback = not should_use_rag(context_docs)
+
+    # One LLM slot covers this request's generation (incl. a speculative fallback and hedges)
+    try:
+        async with _llm_admission.slot():
+            # Borderline scores: optionally race the plain answer against the RAG one
+            speculative = None
+            best_score = max((score for _, score in scored), default=0.0)
+            if not used_fallback and SPECULATIVE_FALLBACK and best_score < RAG_CONFIDENT_SCORE:
+                speculative = start_speculative_fallback(request.prompt, pipeline.llm)
+
+            try:
+                if not used_fallback:
+                    try:
+                        # 2) RAG with the relevant chunks only
+                        rag_resp = await pipeline.rag_chain.ainvoke({
+                            "input": request.prompt,
+                            "context_docs": context_docs,
+                        })
+                        # LangChain can return 'answer' or 'result'
+                        answer = (rag_resp.get("answer") or rag_resp.get("result") or "").strip()
+                        context_docs = rag_resp.get("context", []) or []
+                        # 3) Last resort: the answer itself looks unsure/empty
+                        used_fallback = needs_fallback(answer, context_docs)
+                        _llm_costs.record("rag", rag_resp.get("usage"), used=not used_fallback)
+                    except Exception:
+                        # Any RAG error -> fallback
+                        used_fallback = True
+
+                if used_fallback:
+                    if speculative is not None:
+                        answer = await take_speculative_fallback(speculative, request.prompt, pipeline.llm)
+                    else:
+                        answer = await aopenai_fallback_answer(request.prompt, pipeline.llm)
+            finally:
+                # Winner known (or request aborted) -> stop paying for the loser
+                if speculative is not None and not used_fallback:
+                    discard_speculative_fallback(speculative)
+                elif speculative is not None and not speculative.done():
+                    speculative.cancel()
+    except Overloaded as e:
+        raise shed_response("chat", e)
+    except DeadlineExceeded:
+        raise deadline_response("chat")
 
     # Format sources if available
     if not used_fallback and context_docs:
-        sources = []
-        for doc in context_docs:
-            meta = getattr(doc, "metadata", {}) or {}
-            src = meta.get("source") or meta.get("file_path") or "Unknown source"
-            content = getattr(doc, "page_content", "") or ""
-            sources.append({
-                "source": src,
-                "content": content[:500] + ("…" if len(content) > 500 else "")
-            })
-
-    return ChatResponse(
+        sources = format_sources(context_docs)
+
+    count_answer("chat", "fallback" if used_fallback else "rag")
+    response = ChatResponse(
         answer=answer,
         used_rag=not used_fallback,
         sources=sources
     )
+    if query_vector is not None and answer:
+        _response_cache.put(query_vector, k_top, response, generation=pipeline.generation, text=request.prompt)
+    return response
 
 
-@app.post("/reindex")
-async def reindex():
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
     """
-    Rebuild the index from PDFs in the data directory.
-    This will clear the existing index and repopulate it.
+    Streaming variant of /chat using Server-Sent Events.
+
+    Events, in order:
+    - **sources**: `{"sources": [...]}` as soon as retrieval finishes
+    - **token**: `{"text": "..."}` for every generated text delta
+    - **reset**: `{}` if the RAG answer was discarded and a fallback answer follows
+    - **done**: `{"used_rag": bool, "faq": bool}` once generation is complete
+    - **error**: `{"detail": "..."}` if generation failed mid-stream
+      (plus `"retry_after"` seconds if the request was shed while waiting for the LLM)
+    - **timing**: `{"server_timing": "..."}` last, only with HOPER_DEBUG_TIMINGS=1
     """
+    if not request.prompt.strip():
+        raise HTTPException(status_code=400, detail="Prompt cannot be empty")
+
+    k_top = request.k_top if request.k_top is not None else K_TOP
+    started = time.perf_counter()
+
     try:
-        embeddings = get_embeddings()
-        pc = get_pinecone_client()
-        ensure_index(pc, INDEX_NAME)
-        
-        data_dir = find_data_dir()
-        
-        def progress_callback(chunk_count: int):
-            print(f"Embedded {chunk_count} chunks…")
-        
-        vectorstore = rebuild_index_from_pdfs(
-            INDEX_NAME,
-            data_dir,
-            embeddings,
-            batch_size=UPSERT_BATCH_SIZE,
-            progress_callback=progress_callback,
-        )
-        
-        # Reinitialize the pipeline
-        global _embeddings, _retriever, _llm, _rag_chain
-        _embeddings = embeddings
-        _retriever = vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": K_TOP}
-        )
-        
-        llm_kwargs = {
-            "model": OPENAI_MODEL,
-            "temperature": TEMPERATURE,
-        }
-        if MAX_TOKENS is not None:
-            llm_kwargs["max_tokens"] = MAX_TOKENS
-        
-        _llm = ChatOpenAI(**llm_kwargs)
-        _rag_chain = build_rag_chain(_retriever, _llm)
-        
-        return {"message": "Index rebuilt successfully", "status": "success"}
+        pipeline = await get_pipeline()
     except Exception as e:
+        count_answer("chat_stream", "error")
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to rebuild index: {str(e)}"
+            detail=f"Failed to initialize pipeline: {str(e)}"
+        )
+
+    # Same order as /chat: FAQ text match, response cache, FAQ embedding match.
+    # All before admission control: FAQ and cached answers never take (or wait for) an LLM slot.
+    question = request.prompt
+    cached, query_vector = None, None
+    faq_match = pipeline.faq.match_text(question) if pipeline.faq else None
+    if faq_match is None:
+        cached, query_vector = await lookup_cached_response(pipeline.embeddings, question, k_top)
+        if cached is None and pipeline.faq:
+            faq_match = pipeline.faq.match_vector(query_vector, question)
+    if faq_match is not None:
+        cached = faq_response(faq_match)
+
+    # A 503 is only possible before the stream starts; later sheds become error events
+    if cached is None:
+        try:
+            _llm_admission.check()
+        except Overloaded as e:
+            raise shed_response("chat_stream", e)
+
+    first_token = True
+
+    def token_event(text: str) -> str:
+        nonlocal first_token
+        if first_token:
+            first_token = False
+            observe("first_token", time.perf_counter() - started)  # TTFT as the client sees it
+        return sse_event("token", {"text": text})
+
+    async def event_stream() -> AsyncIterator[str]:
+        if cached is not None:
+            count_answer("chat_stream", "faq" if faq_match is not None else "cache")
+            yield sse_event("sources", {"sources": cached.sources or []})
+            yield token_event(cached.answer)
+            yield sse_event("done", {"used_rag": cached.used_rag, "faq": cached.faq})
+            return
+
+        try:
+            scored = await retrieve_guarded(pipeline, question, query_vector, k_top)
+            context_docs = await run_blocking(pack_docs, select_relevant(scored))
+        except Exception:
+            context_docs = []
+
+        sources = format_sources(context_docs)
+        yield sse_event("sources", {"sources": sources})
+
+        try:
+            async with _llm_admission.slot():
+                try:
+                    parts: List[str] = []
+                    used_rag = should_use_rag(context_docs)
+                    if used_rag:
+                        usage: Dict[str, Any] = {}
+                        messages = rag_messages(join_passages(context_docs), question)
+                        with span("llm_rag"):
+                            async for text in astream_llm_text(pipeline.llm, messages, usage):
+                                parts.append(text)
+                                yield token_event(text)
+                        # Same heuristic as /chat; tokens are already out, so tell the client to reset
+                        if needs_fallback("".join(parts).strip(), context_docs):
+                            used_rag = False
+                            parts = []
+                            yield sse_event("reset", {})
+                        _llm_costs.record("rag", usage, used=used_rag)
+
+                    if not used_rag:
+                        usage = {}
+                        with span("llm_fallback"):
+                            fallback_stream = astream_llm_text(
+                                pipeline.llm, fallback_messages(question), usage, first_token_sent=not first_token,
+                            )
+                            async for text in fallback_stream:
+                                parts.append(text)
+                                yield token_event(text)
+                        _llm_costs.record("fallback", usage)
+
+                    count_answer("chat_stream", "rag" if used_rag else "fallback")
+                    yield sse_event("done", {"used_rag": used_rag, "faq": False})
+
+                    answer = "".join(parts).strip()
+                    if query_vector is not None and answer:
+                        _response_cache.put(query_vector, k_top, ChatResponse(
+                            answer=answer,
+                            used_rag=used_rag,
+                            sources=sources if used_rag and sources else None,
+                        ), generation=pipeline.generation, text=question)
+                except DeadlineExceeded:
+                    count_answer("chat_stream", "deadline")
+                    yield sse_event("error", {"detail": f"No answer within the {REQUEST_DEADLINE:g}s request deadline"})
+                except Exception as e:
+                    count_answer("chat_stream", "error")
+                    yield sse_event("error", {"detail": f"Generation failed: {str(e)}"})
+        except Overloaded as e:
+            count_answer("chat_stream", "shed")
+            yield sse_event("error", {"detail": str(e), "retry_after": e.retry_after})
+        except DeadlineExceeded:
+            count_answer("chat_stream", "deadline")  # ran out while queued for a slot
+            yield sse_event("error", {"detail": f"No answer within the {REQUEST_DEADLINE:g}s request deadline"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# -----------------------------
+# Background reindex jobs
+# -----------------------------
+class ReindexJob:
+    """Progress of one background reindex run (written by the worker, read by /reindex/{job_id})."""
+
+    def __init__(self, full: bool):
+        self.job_id = uuid.uuid4().hex
+        self.full = full
+        self.status = "queued"
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.chunks_embedded = 0
+        self.chunks_expected: Optional[int] = None
+        self.summary: Optional[Dict[str, Any]] = None
+        self.errors: List[str] = []
+        self.cleanup: Optional[str] = None
+
+    def on_progress(self, chunk_count: int):
+        self.chunks_embedded = chunk_count
+        print(f"[reindex {self.job_id[:8]}] Embedded {chunk_count} chunks…")
+
+    def on_expected(self, chunk_count: int):
+        self.chunks_expected = chunk_count
+
+    def on_cleanup(self, outcome: str):
+        self.cleanup = outcome
+
+    def snapshot(self) -> ReindexJobStatus:
+        rate = eta = None
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            if elapsed > 0 and self.chunks_embedded:
+                rate = self.chunks_embedded / elapsed
+        if self.status == "running" and rate and self.chunks_expected is not None:
+            eta = max(self.chunks_expected - self.chunks_embedded, 0) / rate
+        return ReindexJobStatus(
+            job_id=self.job_id,
+            status=self.status,
+            full=self.full,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            chunks_embedded=self.chunks_embedded,
+            chunks_expected=self.chunks_expected,
+            chunks_per_sec=round(rate, 2) if rate else None,
+            eta_seconds=round(eta, 1) if eta is not None else None,
+            summary=self.summary,
+            errors=list(self.errors),
+            cleanup=self.cleanup,
         )
 
 
+_reindex_jobs: "OrderedDict[str, ReindexJob]" = OrderedDict()
+# One worker: reindex runs never overlap and never compete with the /chat executor
+_reindex_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hoper-reindex")
+
+
+def run_reindex_job(job: ReindexJob):
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        embeddings = _pipeline.embeddings if _pipeline else get_embeddings()
+        ensure_vector_backend()
+        data_dir = find_data_dir()
+        old_namespace = active_namespace(INDEX_NAME)
+        cache_before = embeddings.stats() if isinstance(embeddings, CachedEmbeddings) else None
+
+        if job.full:
+            with span("reindex_full"):
+                vectorstore = rebuild_index_from_pdfs(
+                    INDEX_NAME,
+                    data_dir,
+                    embeddings,
+                    batch_size=UPSERT_BATCH_SIZE,
+                    progress_callback=job.on_progress,
+                    expected_callback=job.on_expected,
+                    cleanup_callback=job.on_cleanup,
+                )
+            summary = {"mode": "full"}
+        else:
+            with span("reindex_sync"):
+                vectorstore, summary = sync_index_from_pdfs(
+                    INDEX_NAME,
+                    data_dir,
+                    embeddings,
+                    batch_size=UPSERT_BATCH_SIZE,
+                    progress_callback=job.on_progress,
+                    expected_callback=job.on_expected,
+                    cleanup_callback=job.on_cleanup,
+                )
+        if cache_before is not None:
+            stats = embeddings.stats()
+            summary["embed_cache_hits"] = stats["hits"] - cache_before["hits"]
+            summary["embed_cache_misses"] = stats["misses"] - cache_before["misses"]
+
+        # Live traffic has been served from the old index until this swap
+        install_pipeline(embeddings, vectorstore)
+
+        new_namespace = active_namespace(INDEX_NAME)
+        if VECTOR_BACKEND == "pinecone" and new_namespace != old_namespace:
+            retire_namespace(INDEX_NAME, old_namespace, embeddings)
+
+        job.summary = summary
+        job.status = "succeeded"
+        print(f"✅ Reindex {job.job_id[:8]} done: {summary}")
+    except Exception as e:
+        job.errors.append(str(e))
+        job.status = "failed"
+        print(f"❌ Reindex {job.job_id[:8]} failed: {e}")
+    finally:
+        job.finished_at = time.time()
+
+
+@app.post("/reindex", status_code=202)
+async def reindex(full: bool = False):
+    """
+    Start a background job that syncs the index with the PDFs in the data directory.
+    Poll `/reindex/{job_id}` for progress; /chat keeps using the current index until the job swaps the new one in.
+
+    - **full**: (Optional) Clear the index and rebuild everything instead of syncing only changed files.
+    """
+    for job in _reindex_jobs.values():
+        if job.status in ("queued", "running"):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Reindex job {job.job_id} is already in progress"
+            )
+
+    job = ReindexJob(full=full)
+    _reindex_jobs[job.job_id] = job
+    while len(_reindex_jobs) > REINDEX_JOBS_KEPT:
+        _reindex_jobs.popitem(last=False)
+
+    _reindex_executor.submit(run_reindex_job, job)
+    return {"message": "Reindex started", "status": "accepted", "job_id": job.job_id}
+
+
+@app.get("/reindex/{job_id}", response_model=ReindexJobStatus)
+async def reindex_status(job_id: str):
+    """Progress of a reindex job: chunks embedded, chunks/sec, ETA and errors."""
+    job = _reindex_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown reindex job: {job_id}")
+    return job.snapshot()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
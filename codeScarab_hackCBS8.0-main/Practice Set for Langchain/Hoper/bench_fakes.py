@@ -0,0 +1,175 @@
+"""
+Offline stand-ins for the remote services, used by benchmark.py:
+- FakeChatModel: ChatOpenAI look-alike with a configurable time-to-first-token and
+  token rate; streams, reports usage_metadata, never touches the network
+- HashingEmbeddings: deterministic bag-of-words hashing vectors, so similar texts
+  still land near each other (retrieval scores stay meaningful) without a model download
+- FakeVectorStore: Pinecone stand-in built on LocalVectorStore; "persists" to
+  process memory and can add a simulated network round trip per query/upsert
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from local_store import LocalVectorStore
+
+# -----------------------------
+# Config
+# -----------------------------
+DEFAULT_ANSWER = (
+    "It sounds like a lot is on your mind right now. Try to slow your breathing, name what you are "
+    "feeling, and take one small step that feels manageable today. Reaching out to someone you trust "
+    "or a counsellor can make this easier to carry."
+)
+_WORD = re.compile(r"\w+")
+
+
+# -----------------------------
+# LLM
+# -----------------------------
+class FakeChatModel(BaseChatModel):
+    """
+    Answers every prompt with `answer`, word by word: `ttft` seconds before the
+    first token, then `tokens_per_second`. `output_tokens` > 0 repeats/trims the
+    answer to that many words.
+    """
+
+    answer: str = DEFAULT_ANSWER
+    ttft: float = 0.3
+    tokens_per_second: float = 50.0
+    output_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "hoper-fake-chat"
+
+    def _tokens(self) -> List[str]:
+        words = self.answer.split()
+        if self.output_tokens > 0:
+            words = (words * (self.output_tokens // len(words) + 1))[: self.output_tokens]
+        return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+    def _usage(self, messages: List[BaseMessage], tokens: List[str]) -> Dict[str, int]:
+        # ~4 chars per token, like context_packer's fallback estimate
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        return {"input_tokens": input_tokens, "output_tokens": len(tokens), "total_tokens": input_tokens + len(tokens)}
+
+    def _gap(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens()
+        time.sleep(self.ttft + len(tokens) * self._gap())
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens()
+        await asyncio.sleep(self.ttft + len(tokens) * self._gap())
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        tokens = self._tokens()
+        time.sleep(self.ttft)
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self._gap())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        # Usage arrives on a final empty chunk, as with stream_usage=True
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._tokens()
+        await asyncio.sleep(self.ttft)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self._gap())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
+
+
+# -----------------------------
+# Embeddings
+# -----------------------------
+class HashingEmbeddings(Embeddings):
+    """
+    Signed feature hashing of lowercased words into `dim` buckets, L2-normalised.
+    `seconds_per_text` adds a fixed cost per text to mimic a real encoder.
+    """
+
+    def __init__(self, dim: int = 384, seconds_per_text: float = 0.0):
+        self.dim = dim
+        self.seconds_per_text = seconds_per_text
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+# -----------------------------
+# Vector store
+# -----------------------------
+class FakeVectorStore(LocalVectorStore):
+    """
+    LocalVectorStore whose save()/load() go to a process-wide dict instead of disk,
+    with optional simulated round trips (set the class attributes before use).
+    """
+
+    query_latency = 0.0   # seconds added to every search, like a Pinecone query
+    upsert_latency = 0.0  # seconds added to every upsert batch
+
+    _remote: Dict[str, Dict[str, Any]] = {}  # persist_dir -> saved snapshot
+
+    def add_vectors(self, vectors, texts, metadatas=None, ids=None) -> List[str]:
+        if self.upsert_latency:
+            time.sleep(self.upsert_latency)
+        return super().add_vectors(vectors, texts, metadatas=metadatas, ids=ids)
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4, **kwargs: Any):
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        return super().similarity_search_with_score_by_vector(embedding, k=k, **kwargs)
+
+    def save(self, persist_dir: Optional[str] = None):
+        with self._lock:
+            FakeVectorStore._remote[persist_dir or self.persist_dir or ""] = {
+                "vectors": self._vectors.copy(),
+                "ids": list(self._ids),
+                "texts": list(self._texts),
+                "metadatas": [dict(m) for m in self._metadatas],
+            }
+
+    @classmethod
+    def load(cls, persist_dir: str, embedding: Embeddings, dim: int, index_type: str = "flat") -> "FakeVectorStore":
+        store = cls(embedding=embedding, dim=dim, persist_dir=persist_dir, index_type=index_type)
+        snapshot = cls._remote.get(persist_dir)
+        if snapshot is not None:
+            store._restore(snapshot["vectors"], snapshot["ids"], snapshot["texts"], snapshot["metadatas"])
+        return store
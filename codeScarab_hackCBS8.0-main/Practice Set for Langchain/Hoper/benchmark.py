@@ -0,0 +1,462 @@
+"""
+Load test / benchmark for api.py, fully offline by default.
+- Starts api.py in a subprocess with the stand-ins from bench_fakes.py (fake ChatOpenAI,
+  hashing embeddings, in-memory vector store), or targets a running server via --url
+- Drives /chat, /chat/stream and /reindex at a fixed concurrency
+- Reports throughput, p50/p95/p99 latency, time-to-first-token, RAG rate and server RSS
+- Saves results as JSON (cache/bench/ by default) and compares against an earlier run
+Run:
+    python benchmark.py
+    python benchmark.py --concurrency 16 --requests 400 --llm-ttft 0.5 --vector-latency 0.02
+    python benchmark.py --k-top 4 --chunk-size 600 --compare cache/bench/<earlier run>.json
+    python benchmark.py --url http://localhost:8000 --scenarios chat,stream
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from faq import parse_faq
+
+# -----------------------------
+# Config (defaults)
+# -----------------------------
+HERE = Path(__file__).parent
+RESULTS_DIR = HERE / "cache" / "bench"
+FAQ_PATH = HERE.parent / "hoperkb.txt"  # curated questions double as the prompt set
+
+SCENARIOS = ("chat", "stream", "reindex")
+STARTUP_TIMEOUT = 180.0   # seconds for the server to come up (PDF ingest not included)
+REINDEX_POLL_SECONDS = 0.2
+RSS_SAMPLE_SECONDS = 0.5
+REQUEST_TIMEOUT = 300.0
+
+
+class Sample(NamedTuple):
+    ok: bool
+    latency: float                  # seconds, request start -> last byte (or job finished)
+    ttft: Optional[float] = None    # seconds to the first token event (streams only)
+    used_rag: Optional[bool] = None
+    extra: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+# -----------------------------
+# Server with fake services (subprocess)
+# -----------------------------
+def serve(args: argparse.Namespace):
+    """Run api.py on --serve-port with the offline stand-ins patched in."""
+    with tempfile.TemporaryDirectory(prefix="hoper-bench-") as index_dir:
+        # api.py reads its config at import time
+        os.environ["HOPER_VECTOR_BACKEND"] = "local"
+        os.environ["HOPER_LOCAL_INDEX_DIR"] = index_dir
+        os.environ["HOPER_EMBED_CACHE"] = os.path.join(index_dir, "embeddings.sqlite3")
+        if not args.with_caches:
+            # Measure the full retrieval + LLM path, not the shortcuts
+            os.environ["HOPER_FAQ"] = "0"
+            os.environ["HOPER_RESPONSE_CACHE"] = "0"
+        if args.rag_min_score is not None:
+            os.environ["HOPER_RAG_MIN_SCORE"] = str(args.rag_min_score)
+
+        import uvicorn
+
+        import api
+        from bench_fakes import FakeChatModel, FakeVectorStore, HashingEmbeddings
+
+        FakeVectorStore.query_latency = args.vector_latency
+        FakeVectorStore.upsert_latency = args.upsert_latency
+        api.LocalVectorStore = FakeVectorStore
+        if args.embeddings == "hashing":
+            api.build_embedding_engine = lambda *a, **kw: HashingEmbeddings(api.EMBED_DIM, args.embed_latency)
+        api.ChatOpenAI = lambda **kw: FakeChatModel(
+            ttft=args.llm_ttft,
+            tokens_per_second=args.llm_tokens_per_second,
+            output_tokens=args.llm_output_tokens,
+        )
+        if args.chunk_size is not None:
+            api.CHUNK_SIZE = args.chunk_size
+        if args.chunk_overlap is not None:
+            api.CHUNK_OVERLAP = args.chunk_overlap
+
+        uvicorn.run(api.app, host="127.0.0.1", port=args.serve_port, log_level="warning")
+
+
+def free_port() -> int:
+    import socket
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(log_path: Path) -> Tuple[subprocess.Popen, str]:
+    """Re-run this script in server mode with the same options (they configure the fakes)."""
+    port = free_port()
+    command = [sys.executable, str(Path(__file__).resolve()), *sys.argv[1:], "--serve-port", str(port)]
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.Popen(command, cwd=str(HERE), stdout=log, stderr=subprocess.STDOUT)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, process: Optional[subprocess.Popen]):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"Server not healthy after {STARTUP_TIMEOUT:.0f}s")
+
+
+# -----------------------------
+# Requests
+# -----------------------------
+async def chat_once(client: httpx.AsyncClient, prompt: str, k_top: Optional[int]) -> Sample:
+    start = time.perf_counter()
+    try:
+        r = await client.post("/chat", json={"prompt": prompt, "k_top": k_top})
+        latency = time.perf_counter() - start
+        if r.status_code != 200:
+            return Sample(False, latency, error=f"HTTP {r.status_code}")
+        return Sample(True, latency, used_rag=r.json().get("used_rag"))
+    except httpx.HTTPError as e:
+        return Sample(False, time.perf_counter() - start, error=repr(e))
+
+
+async def stream_once(client: httpx.AsyncClient, prompt: str, k_top: Optional[int]) -> Sample:
+    start = time.perf_counter()
+    ttft, event, used_rag = None, None, None
+    try:
+        async with client.stream("POST", "/chat/stream", json={"prompt": prompt, "k_top": k_top}) as r:
+            if r.status_code != 200:
+                return Sample(False, time.perf_counter() - start, error=f"HTTP {r.status_code}")
+            async for line in r.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                    if event == "token" and ttft is None:
+                        ttft = time.perf_counter() - start
+                elif line.startswith("data: ") and event == "done":
+                    used_rag = json.loads(line[len("data: "):]).get("used_rag")
+                elif line.startswith("data: ") and event == "error":
+                    return Sample(False, time.perf_counter() - start, ttft, error=line[len("data: "):])
+        return Sample(True, time.perf_counter() - start, ttft, used_rag)
+    except httpx.HTTPError as e:
+        return Sample(False, time.perf_counter() - start, ttft, error=repr(e))
+
+
+async def reindex_once(client: httpx.AsyncClient, full: bool) -> Sample:
+    """Submit a reindex job and poll it to completion; latency includes time queued behind other jobs."""
+    start = time.perf_counter()
+    try:
+        r = await client.post("/reindex", params={"full": full})
+        if r.status_code != 202:
+            return Sample(False, time.perf_counter() - start, error=f"HTTP {r.status_code}")
+        job_id = r.json()["job_id"]
+        while True:
+            await asyncio.sleep(REINDEX_POLL_SECONDS)
+            job = (await client.get(f"/reindex/{job_id}")).json()
+            if job["status"] in ("succeeded", "failed"):
+                break
+        extra = {"chunks_embedded": job["chunks_embedded"], "chunks_per_sec": job["chunks_per_sec"]}
+        error = "; ".join(job["errors"]) or None
+        return Sample(job["status"] == "succeeded", time.perf_counter() - start, extra=extra, error=error)
+    except httpx.HTTPError as e:
+        return Sample(False, time.perf_counter() - start, error=repr(e))
+
+
+async def read_rss(client: httpx.AsyncClient) -> Optional[float]:
+    """Server RSS in bytes from its /metrics endpoint (None if unavailable)."""
+    try:
+        r = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    for line in r.text.splitlines():
+        if line.startswith("process_resident_memory_bytes "):
+            return float(line.split()[1])
+    return None
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+async def drive(
+    client: httpx.AsyncClient,
+    request: Callable[[int], Awaitable[Sample]],
+    total: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """`total` requests from `concurrency` closed-loop workers, plus an RSS sampler."""
+    samples: List[Sample] = []
+    indexes = iter(range(total))
+    rss: List[float] = []
+
+    async def worker():
+        for i in indexes:
+            samples.append(await request(i))
+
+    async def sample_rss():
+        while True:
+            value = await read_rss(client)
+            if value is not None:
+                rss.append(value)
+            await asyncio.sleep(RSS_SAMPLE_SECONDS)
+
+    sampler = asyncio.create_task(sample_rss())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    sampler.cancel()
+    end_rss = await read_rss(client)
+    if end_rss is not None:
+        rss.append(end_rss)
+    return summarize(samples, wall, concurrency, rss)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def distribution_ms(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    values = sorted(values)
+    return {
+        "mean": round(sum(values) / len(values) * 1000, 2),
+        "p50": round(percentile(values, 50) * 1000, 2),
+        "p95": round(percentile(values, 95) * 1000, 2),
+        "p99": round(percentile(values, 99) * 1000, 2),
+        "max": round(values[-1] * 1000, 2),
+    }
+
+
+def summarize(samples: List[Sample], wall: float, concurrency: int, rss: List[float]) -> Dict[str, Any]:
+    ok = [s for s in samples if s.ok]
+    rag = [s.used_rag for s in ok if s.used_rag is not None]
+    summary: Dict[str, Any] = {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(ok) / wall, 3) if wall else 0.0,
+        "latency_ms": distribution_ms([s.latency for s in ok]),
+        "ttft_ms": distribution_ms([s.ttft for s in ok if s.ttft is not None]),
+        "rag_rate": round(sum(rag) / len(rag), 4) if rag else None,
+        "rss_mb": {
+            "start": round(rss[0] / 2**20, 1),
+            "peak": round(max(rss) / 2**20, 1),
+            "end": round(rss[-1] / 2**20, 1),
+        } if rss else None,
+    }
+    rates = [s.extra["chunks_per_sec"] for s in ok if s.extra and s.extra.get("chunks_per_sec")]
+    if rates:
+        summary["chunks_per_sec"] = round(sorted(rates)[len(rates) // 2], 2)
+    errors = [s.error for s in samples if s.error]
+    if errors:
+        summary["first_error"] = errors[0]
+    return summary
+
+
+def load_prompts(path: Optional[str]) -> List[str]:
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    with open(FAQ_PATH, encoding="utf-8") as f:
+        return [entry.question for entry in parse_faq(f.read())]
+
+
+async def run_benchmark(args: argparse.Namespace, base_url: str, process: Optional[subprocess.Popen]) -> Dict[str, Any]:
+    prompts = load_prompts(args.prompts)
+
+    def prompt_for(i: int) -> str:
+        base = prompts[i % len(prompts)]
+        # Unique wording defeats the query-embedding/retrieval caches unless they are under test
+        return base if args.with_caches else f"{base} ({i})"
+
+    results: Dict[str, Any] = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=REQUEST_TIMEOUT) as client:
+        await wait_until_healthy(client, process)
+        if process is not None:
+            # Fresh in-memory index: build it before any chat traffic
+            print("⏳ Building the benchmark index…")
+            warm = await reindex_once(client, full=True)
+            if not warm.ok:
+                raise RuntimeError(f"Initial reindex failed: {warm.error}")
+            print(f"✅ Index ready in {warm.latency:.1f}s ({warm.extra['chunks_embedded']} chunks)")
+        for i in range(args.warmup):
+            await chat_once(client, prompt_for(-1 - i), args.k_top)
+
+        scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+        for name in scenarios:
+            print(f"⏳ {name}: {args.requests if name != 'reindex' else args.reindex_requests} requests")
+            if name == "chat":
+                request = lambda i: chat_once(client, prompt_for(i), args.k_top)
+                results[name] = await drive(client, request, args.requests, args.concurrency)
+            elif name == "stream":
+                request = lambda i: stream_once(client, prompt_for(i), args.k_top)
+                results[name] = await drive(client, request, args.requests, args.concurrency)
+            elif name == "reindex":
+                # The server runs one job at a time and answers 409 to overlapping requests
+                request = lambda i: reindex_once(client, full=args.reindex_full)
+                results[name] = await drive(client, request, args.reindex_requests, 1)
+            else:
+                raise ValueError(f"Unknown scenario {name!r} (use {', '.join(SCENARIOS)})")
+    return results
+
+
+# -----------------------------
+# Report
+# -----------------------------
+def git_revision() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "."], cwd=HERE, capture_output=True, text=True).stdout
+        return commit + ("-dirty" if dirty.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_summary(results: Dict[str, Any]):
+    for name, s in results.items():
+        latency, ttft, rss = s["latency_ms"] or {}, s["ttft_ms"] or {}, s["rss_mb"] or {}
+        line = (
+            f"{name:8} {s['throughput_rps']:8.2f} req/s  "
+            f"p50 {latency.get('p50', 0):8.1f}  p95 {latency.get('p95', 0):8.1f}  p99 {latency.get('p99', 0):8.1f} ms"
+        )
+        if ttft:
+            line += f"  ttft p50 {ttft['p50']:.1f} / p95 {ttft['p95']:.1f} ms"
+        if s["rag_rate"] is not None:
+            line += f"  rag {s['rag_rate']:.0%}"
+        if s.get("chunks_per_sec"):
+            line += f"  {s['chunks_per_sec']} chunks/s"
+        if rss:
+            line += f"  rss peak {rss['peak']} MB"
+        if s["errors"]:
+            line += f"  ❌ {s['errors']} errors ({s.get('first_error')})"
+        print(line)
+
+
+COMPARED = (
+    ("throughput_rps",), ("latency_ms", "p50"), ("latency_ms", "p95"), ("latency_ms", "p99"),
+    ("ttft_ms", "p50"), ("ttft_ms", "p95"), ("rss_mb", "peak"),
+)
+
+
+def print_comparison(baseline: Dict[str, Any], current: Dict[str, Any]):
+    print(f"\nvs {baseline['meta']['commit']} ({baseline['meta']['timestamp']}):")
+    for name, s in current["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if not old:
+            continue
+        for path in COMPARED:
+            before, after = old, s
+            for key in path:
+                before = (before or {}).get(key)
+                after = (after or {}).get(key)
+            if before and after is not None:
+                print(f"  {name:8} {'.'.join(path):16} {before:>10} -> {after:<10} ({(after - before) / before:+.1%})")
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--url", help="benchmark a running server instead of starting one with fake services")
+    p.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated: chat, stream, reindex")
+    p.add_argument("--requests", type=int, default=200, help="requests per chat/stream scenario")
+    p.add_argument("--reindex-requests", type=int, default=2)
+    p.add_argument("--reindex-full", action="store_true", help="full rebuilds instead of incremental syncs")
+    p.add_argument("--concurrency", type=int, default=8, help="in-flight chat/stream requests (reindex jobs run one at a time)")
+    p.add_argument("--warmup", type=int, default=5, help="unrecorded /chat requests before measuring")
+    p.add_argument("--prompts", help="file with one prompt per line (default: hoperkb.txt questions)")
+    p.add_argument("--k-top", type=int, default=None, help="k_top sent with every request (default: server's K_TOP)")
+    p.add_argument("--with-caches", action="store_true", help="keep FAQ/response/query caches in play")
+    p.add_argument("--out", help="results JSON path (default: cache/bench/<timestamp>-<commit>.json)")
+    p.add_argument("--compare", help="earlier results JSON to diff against")
+
+    fakes = p.add_argument_group("fake services (ignored with --url)")
+    fakes.add_argument("--llm-ttft", type=float, default=0.3, help="seconds before the first token")
+    fakes.add_argument("--llm-tokens-per-second", type=float, default=50.0)
+    fakes.add_argument("--llm-output-tokens", type=int, default=80)
+    fakes.add_argument("--embeddings", choices=("hashing", "real"), default="hashing",
+                       help="'real' loads the configured sentence-transformers model (must be cached locally)")
+    fakes.add_argument("--embed-latency", type=float, default=0.0, help="seconds per embedded text (hashing only)")
+    fakes.add_argument("--vector-latency", type=float, default=0.0, help="seconds per vector search, e.g. 0.02")
+    fakes.add_argument("--upsert-latency", type=float, default=0.0, help="seconds per upsert batch")
+    fakes.add_argument("--chunk-size", type=int, default=None)
+    fakes.add_argument("--chunk-overlap", type=int, default=None)
+    fakes.add_argument("--rag-min-score", type=float, default=None)
+    p.add_argument("--serve-port", type=int, help=argparse.SUPPRESS)  # internal: run the server side
+    return p.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.serve_port:
+        serve(args)
+        return
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    process, log_path = None, RESULTS_DIR / "server.log"
+    base_url = args.url
+    if base_url is None:
+        process, base_url = start_server(log_path)
+    try:
+        scenarios = asyncio.run(run_benchmark(args, base_url, process))
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}" + (f" (server log: {log_path})" if process else ""))
+        raise SystemExit(1)
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    commit = git_revision()
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    params = {k: v for k, v in vars(args).items() if k not in ("serve_port", "out", "compare")}
+    results = {
+        "meta": {"commit": commit, "timestamp": timestamp, "fake_services": args.url is None, "params": params},
+        "scenarios": scenarios,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{timestamp}-{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    print_summary(scenarios)
+    print(f"✅ Results saved to {out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
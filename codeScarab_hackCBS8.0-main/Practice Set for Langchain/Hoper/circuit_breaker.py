@@ -0,0 +1,184 @@
+"""
+Circuit breaker for a dependency that can degrade (the vector store behind retrieval).
+- closed: calls go through; outcomes of the last `window` seconds are tracked
+- open: the error rate or slow-call rate reached its threshold -> calls are refused at
+  once (CircuitOpen) for `open_seconds`, so callers take their fallback without waiting
+- half_open: then up to `probes` trial calls; if all succeed in time the breaker closes,
+  any failure or slow call opens it again
+Thread-safe; stats() feeds /health and /metrics.
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Tuple, Type
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}  # gauge values for /metrics
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the dependency while the breaker is open."""
+
+    def __init__(self, name: str, next_probe_in: float):
+        super().__init__(f"{name} circuit open, next probe in {next_probe_in:.1f}s")
+        self.next_probe_in = next_probe_in
+
+
+class CircuitBreaker:
+    """
+    Trips when at least `min_calls` calls in the window show an error rate >= `error_rate`
+    or a share of calls slower than `slow_call` seconds >= `slow_rate`. enabled=False lets everything through.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float = 30.0,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call: float = 2.0,
+        slow_rate: float = 0.5,
+        open_seconds: float = 15.0,
+        probes: int = 3,
+        enabled: bool = True,
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = max(min_calls, 1)
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.probes = max(probes, 1)
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()  # (finished, failed, slow)
+        self._failed = 0
+        self._slow = 0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.trips = 0
+        self.short_circuited = 0
+
+    # -----------------------------
+    # State transitions (lock held)
+    # -----------------------------
+    def _open(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self.trips += 1
+        print(f"❌ {self.name} circuit opened; answering without it for {self.open_seconds:g}s")
+
+    def _close(self):
+        self._state = CLOSED
+        self._calls.clear()
+        self._failed = self._slow = 0
+        print(f"✅ {self.name} circuit closed")
+
+    def _prune(self, now: float):
+        while self._calls and self._calls[0][0] < now - self.window:
+            _, failed, slow = self._calls.popleft()
+            self._failed -= failed
+            self._slow -= slow
+
+    # -----------------------------
+    # Calls
+    # -----------------------------
+    def _admit(self) -> bool:
+        """True if this call is a half-open probe; raises CircuitOpen if it may not run."""
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if self._state == OPEN and now >= self._opened_at + self.open_seconds:
+                self._state = HALF_OPEN
+                self._probes_in_flight = self._probe_successes = 0
+            if self._state == CLOSED:
+                return False
+            if self._state == HALF_OPEN and self._probes_in_flight + self._probe_successes < self.probes:
+                self._probes_in_flight += 1
+                return True
+            self.short_circuited += 1
+            raise CircuitOpen(self.name, max(0.0, self._opened_at + self.open_seconds - now))
+
+    def _record(self, probe: bool, failed: bool, seconds: float):
+        now = time.monotonic()
+        slow = seconds >= self.slow_call
+        with self._lock:
+            if probe:
+                self._probes_in_flight -= 1
+                if self._state != HALF_OPEN:
+                    return
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.probes:
+                        self._close()
+                return
+            if self._state != CLOSED:
+                return  # started before the breaker opened
+            self._calls.append((now, failed, slow))
+            self._failed += failed
+            self._slow += slow
+            self._prune(now)
+            calls = len(self._calls)
+            if calls >= self.min_calls and (
+                self._failed / calls >= self.error_rate or self._slow / calls >= self.slow_rate
+            ):
+                self._open(now)
+
+    def _release_probe(self, probe: bool):
+        if probe:
+            with self._lock:
+                self._probes_in_flight -= 1
+
+    @contextmanager
+    def guard(self, neutral: Tuple[Type[BaseException], ...] = ()) -> Iterator[None]:
+        """
+        Run the enclosed call through the breaker. Exceptions count as failures, except
+        `neutral` ones (e.g. the caller's own deadline running out), which give no verdict.
+        """
+        probe = self._admit()
+        if not self.enabled:
+            yield
+            return
+        start = time.monotonic()
+        try:
+            yield
+        except neutral:
+            self._release_probe(probe)
+            raise
+        except Exception:
+            self._record(probe, True, time.monotonic() - start)
+            raise
+        except BaseException:
+            # Caller cancelled: no verdict on the dependency either
+            self._release_probe(probe)
+            raise
+        self._record(probe, False, time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            calls = len(self._calls)
+            return {
+                "enabled": self.enabled,
+                "state": self._state,
+                "calls_in_window": calls,
+                "error_rate": round(self._failed / calls, 3) if calls else 0.0,
+                "slow_rate": round(self._slow / calls, 3) if calls else 0.0,
+                "next_probe_in": round(max(0.0, self._opened_at + self.open_seconds - now), 1)
+                if self._state == OPEN else None,
+                "trips": self.trips,
+                "short_circuited": self.short_circuited,
+            }
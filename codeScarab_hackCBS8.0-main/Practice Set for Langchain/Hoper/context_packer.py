@@ -0,0 +1,178 @@
+"""
+Token-budgeted context packing for the RAG prompt.
+- chunks arrive best-first (by retrieval score) and keep that order
+- neighbouring chunks of the same page that share their CHUNK_OVERLAP text are
+  merged into one passage; duplicates and contained chunks are dropped
+- passages are added until the token budget is spent; the last one is trimmed
+Token counts use tiktoken's o200k_base (the gpt-4o/gpt-5 family) once load_encoding()
+has run, else a ~4 chars/token estimate. tiktoken downloads the BPE file on first use
+(no timeout), so the request path never loads it: api.py calls load_encoding() in a
+background thread at startup, and the file is kept under cache/tiktoken afterwards.
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# -----------------------------
+# Config
+# -----------------------------
+ENCODING_NAME = "o200k_base"
+TIKTOKEN_CACHE_DIR = os.getenv("TIKTOKEN_CACHE_DIR", str(Path(__file__).parent / "cache" / "tiktoken"))
+CHARS_PER_TOKEN = 4       # estimate used when tiktoken/its encoding is unavailable
+MIN_OVERLAP_CHARS = 20    # shorter shared edges are treated as coincidence
+MIN_TRIMMED_TOKENS = 32   # don't append a trimmed passage shorter than this
+PASSAGE_SEPARATOR = "\n\n"
+
+# -----------------------------
+# Tokenizer
+# -----------------------------
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def load_encoding() -> bool:
+    """
+    Load the tiktoken encoding (blocking; may download the BPE file once).
+    Returns False if tiktoken or the file is unavailable; counts stay estimated.
+    """
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                os.environ.setdefault("TIKTOKEN_CACHE_DIR", TIKTOKEN_CACHE_DIR)
+                import tiktoken
+                _encoding = tiktoken.get_encoding(ENCODING_NAME)
+                print(f"✅ Tokenizer {ENCODING_NAME} loaded")
+            except Exception as e:
+                print(f"❌ Tokenizer {ENCODING_NAME} unavailable ({e}); estimating {CHARS_PER_TOKEN} chars/token")
+        return _encoding is not None
+
+
+def _get_encoding():
+    """The loaded tiktoken encoding, or None until load_encoding() succeeded (never blocks)."""
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode_ordinary(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode_ordinary(text)
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit)  # don't split a word
+    return text[: cut if cut > 0 else limit]
+
+
+# -----------------------------
+# Overlap merging
+# -----------------------------
+def _overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right` (0 if < MIN_OVERLAP_CHARS)."""
+    probe = right[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    tail = left[-max_overlap:]
+    start = tail.find(probe)
+    while start != -1:
+        if right.startswith(tail[start:]):
+            return len(tail) - start
+        start = tail.find(probe, start + 1)
+    return 0
+
+
+def _same_page(a: Document, b: Document) -> bool:
+    return (a.metadata.get("source"), a.metadata.get("page")) == (b.metadata.get("source"), b.metadata.get("page"))
+
+
+def merge_overlapping(docs: List[Document], max_overlap: int) -> List[Document]:
+    """
+    Collapse chunks that repeat each other. A merged passage takes the rank of its
+    best chunk and the metadata of its first; the text reads in document order.
+    """
+    passages = _merge_pass(docs, max_overlap)
+    # A middle chunk can join two earlier passages -> repeat until nothing merges
+    while len(passages) < len(docs):
+        docs, passages = passages, _merge_pass(passages, max_overlap)
+    return passages
+
+
+def _merge_pass(docs: List[Document], max_overlap: int) -> List[Document]:
+    passages: List[Document] = []
+    for doc in docs:
+        text = doc.page_content
+        for i, passage in enumerate(passages):
+            if not _same_page(passage, doc):
+                continue
+            current = passage.page_content
+            if text in current:
+                break
+            if current in text:
+                passages[i] = Document(page_content=text, metadata=passage.metadata)
+                break
+            forward = _overlap(current, text, max_overlap)
+            if forward:
+                passages[i] = Document(page_content=current + text[forward:], metadata=passage.metadata)
+                break
+            backward = _overlap(text, current, max_overlap)
+            if backward:
+                passages[i] = Document(page_content=text + current[backward:], metadata=passage.metadata)
+                break
+        else:
+            passages.append(Document(page_content=text, metadata=dict(doc.metadata)))
+    return passages
+
+
+# -----------------------------
+# Packing
+# -----------------------------
+def pack_context(
+    docs: List[Document],
+    max_tokens: int,
+    max_overlap: int = 200,
+    counter: Optional[Callable[[str], int]] = None,
+) -> Tuple[List[Document], int]:
+    """
+    Merge, order and trim best-first `docs` to at most `max_tokens` of context.
+    Returns (passages, tokens_used). max_tokens <= 0 disables the budget.
+    """
+    counter = counter or count_tokens
+    separator_tokens = counter(PASSAGE_SEPARATOR)
+    packed: List[Document] = []
+    used = 0
+
+    for passage in merge_overlapping(docs, max_overlap):
+        cost = counter(passage.page_content) + (separator_tokens if packed else 0)
+        if max_tokens <= 0 or used + cost <= max_tokens:
+            packed.append(passage)
+            used += cost
+            continue
+        remaining = max_tokens - used - (separator_tokens if packed else 0)
+        if remaining >= MIN_TRIMMED_TOKENS:
+            text = truncate_to_tokens(passage.page_content, remaining)
+            packed.append(Document(page_content=text, metadata=passage.metadata))
+            used += counter(text) + (separator_tokens if len(packed) > 1 else 0)
+        break
+    return packed, used
+
+
+def join_passages(passages: List[Document]) -> str:
+    return PASSAGE_SEPARATOR.join(doc.page_content for doc in passages)
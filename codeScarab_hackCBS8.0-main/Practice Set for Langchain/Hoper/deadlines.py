@@ -0,0 +1,278 @@
+"""
+Request deadlines and tail-latency control for LLM calls.
+- deadline_scope(seconds): end-to-end time budget of the current request. It is a
+  contextvar, so it follows the request into tasks and executor hops (see run_blocking)
+- with_deadline(): await something within a stage timeout and the request deadline
+- RetryBudget: retries and hedges together may add at most `ratio` extra calls per
+  call, plus a small per-second reserve so a quiet server can still retry
+- HedgedCaller: one logical call = the first attempt, a hedged duplicate once it has
+  run longer than the recent p95 latency, and budgeted retries on transient errors.
+  The first attempt to succeed wins; the others are cancelled
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+# -----------------------------
+# Config
+# -----------------------------
+HEDGE_WINDOW = 512       # recent successful call latencies the hedge delay is computed from
+HEDGE_MIN_SAMPLES = 20   # until then, hedge only after max_delay
+RETRY_BACKOFF = 0.25     # seconds before the first retry; doubles per retry
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request ran out of its end-to-end time budget."""
+
+
+# -----------------------------
+# Deadlines
+# -----------------------------
+_deadline: ContextVar[Optional[float]] = ContextVar("hoper_deadline", default=None)  # time.monotonic()
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[None]:
+    """Give the enclosed work `seconds` in total (<= 0: no deadline); a nested scope can only shorten it."""
+    if seconds <= 0:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (None if there is none, <= 0 once it passed)."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def bounded(timeout: Optional[float]) -> Optional[float]:
+    """`timeout` clipped to the time left (None = no limit)."""
+    left = remaining()
+    if left is None:
+        return timeout
+    left = max(left, 0.0)
+    return left if timeout is None else min(timeout, left)
+
+
+async def with_deadline(awaitable: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """
+    Await within `timeout` seconds and the request deadline. Raises DeadlineExceeded
+    if the deadline is what ran out, asyncio.TimeoutError if only `timeout` did.
+    The awaited work sees the tighter of the two as its deadline, so a blocking call it
+    makes can pass remaining() on as its own timeout (cancelling the await cannot stop a thread).
+    """
+    left = remaining()
+    if left is None and timeout is None:
+        return await awaitable
+    limit = bounded(timeout)
+    try:
+        with deadline_scope(limit):  # copied into the task wait_for wraps the awaitable in
+            return await asyncio.wait_for(awaitable, limit)
+    except asyncio.TimeoutError:
+        if left is not None and (timeout is None or left <= timeout):
+            raise DeadlineExceeded("request deadline exceeded") from None
+        raise
+
+
+# -----------------------------
+# Retry budget
+# -----------------------------
+class RetryBudget:
+    """
+    Each call deposits `ratio` tokens (up to `max_balance`); each retry or hedge
+    withdraws one. A reserve refilled at `min_per_second` covers low traffic.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_balance: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = max_balance
+        self._lock = threading.Lock()
+        self._balance = 0.0
+        self._reserve_cap = max(min_per_second, 1.0)
+        self._reserve = self._reserve_cap
+        self._refilled = time.monotonic()
+        self.withdrawn = 0
+        self.exhausted = 0
+
+    def deposit(self):
+        with self._lock:
+            self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        """Spend one token for an extra call; False (and counted) if the budget is spent."""
+        now = time.monotonic()
+        with self._lock:
+            self._reserve = min(self._reserve_cap, self._reserve + (now - self._refilled) * self.min_per_second)
+            self._refilled = now
+            if self._balance >= 1.0:
+                self._balance -= 1.0
+            elif self._reserve >= 1.0:
+                self._reserve -= 1.0
+            else:
+                self.exhausted += 1
+                return False
+            self.withdrawn += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ratio": self.ratio,
+                "min_per_second": self.min_per_second,
+                "available": round(self._balance + self._reserve, 2),
+                "withdrawn": self.withdrawn,
+                "exhausted": self.exhausted,
+            }
+
+
+# -----------------------------
+# Hedged + retried calls
+# -----------------------------
+class HedgedCaller:
+    """
+    Runs `make_call()` with hedging and retries, all bounded by the request deadline.
+    Only exceptions in `retry_on` are retried; anything else fails the call at once.
+    """
+
+    def __init__(
+        self,
+        budget: RetryBudget,
+        hedge: bool = True,
+        quantile: float = 0.95,
+        min_delay: float = 1.0,
+        max_delay: float = 20.0,
+        max_attempts: int = 3,
+        retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    ):
+        self.budget = budget
+        self.hedge = hedge
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_on = retry_on
+
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=HEDGE_WINDOW)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.retries = 0
+        self.cancelled = 0
+        self.deadline_exceeded = 0
+
+    def hedge_delay(self) -> float:
+        """Recent `quantile` latency of successful calls, clamped to [min_delay, max_delay]."""
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return self.max_delay
+            ordered = sorted(self._latencies)
+        value = ordered[min(len(ordered) - 1, math.ceil(self.quantile * len(ordered)) - 1)]
+        return min(self.max_delay, max(self.min_delay, value))
+
+    async def call(self, make_call: Callable[[], Awaitable[T]], hedge: bool = True) -> T:
+        """One logical call; `hedge=False` still retries but never duplicates a slow attempt."""
+        self.budget.deposit()
+        with self._lock:
+            self.calls += 1
+        started = time.monotonic()
+        hedge_at = started + self.hedge_delay() if self.hedge and hedge else math.inf
+        retry_at = math.inf
+        attempts = 0
+        running: Dict[asyncio.Future, bool] = {}  # attempt -> is_hedge
+        error: Optional[BaseException] = None
+
+        def launch(is_hedge: bool):
+            nonlocal attempts
+            attempts += 1
+            running[asyncio.ensure_future(make_call())] = is_hedge
+
+        launch(False)
+        try:
+            while True:
+                left = remaining()
+                if left is not None and left <= 0:
+                    with self._lock:
+                        self.deadline_exceeded += 1
+                    raise DeadlineExceeded("request deadline exceeded")
+                wake = min(hedge_at, retry_at) - time.monotonic()
+                timeout = None if wake == math.inf else max(wake, 0.0)
+                if left is not None:
+                    timeout = left if timeout is None else min(timeout, left)
+
+                if running:
+                    done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    await asyncio.sleep(timeout)  # retry backoff
+                    done = set()
+
+                for attempt in done:
+                    is_hedge = running.pop(attempt)
+                    if attempt.exception() is None:
+                        with self._lock:
+                            # From the call's start: a hedge that wins after 1s on top of a 2s
+                            # hedge delay still took the caller 3s
+                            self._latencies.append(time.monotonic() - started)
+                            self.hedge_wins += is_hedge
+                        return attempt.result()
+                    error = attempt.exception()
+                    if not isinstance(error, self.retry_on):
+                        raise error
+
+                now = time.monotonic()
+                if done and not running and retry_at == math.inf:
+                    # Every attempt so far failed: retry after a backoff, if the budget allows
+                    if attempts >= self.max_attempts or not self.budget.try_withdraw():
+                        raise error
+                    retry_at = now + RETRY_BACKOFF * 2 ** (attempts - 1)
+                if retry_at <= now:
+                    retry_at = math.inf
+                    launch(False)
+                    with self._lock:
+                        self.retries += 1
+                if hedge_at <= now:
+                    hedge_at = math.inf
+                    if running and attempts < self.max_attempts and self.budget.try_withdraw():
+                        launch(True)
+                        with self._lock:
+                            self.hedges += 1
+        finally:
+            # Winner found, error raised or caller cancelled: stop paying for the rest
+            for attempt in running:
+                attempt.cancel()
+            with self._lock:
+                self.cancelled += len(running)
+
+    def stats(self) -> Dict[str, Any]:
+        delay = self.hedge_delay()
+        with self._lock:
+            return {
+                "hedging_enabled": self.hedge,
+                "hedge_delay_seconds": round(delay, 3),
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "retries": self.retries,
+                "cancelled": self.cancelled,
+                "deadline_exceeded": self.deadline_exceeded,
+                "budget": self.budget.stats(),
+            }
@@ -0,0 +1,109 @@
+"""
+Persistent embedding cache: wraps any LangChain Embeddings and stores document
+vectors in SQLite keyed by (model name, sha256(chunk text)).
+Re-indexing unchanged PDFs then only runs the model on new/changed chunks.
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+
+# -----------------------------
+# Config (tunable)
+# -----------------------------
+SQLITE_MAX_VARS = 500  # stay well under SQLite's bound-parameter limit per query
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# Cache
+# -----------------------------
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with an on-disk cache for embed_documents()."""
+
+    def __init__(self, underlying: Embeddings, model_name: str, path: str):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), SQLITE_MAX_VARS):
+                part = unique[start:start + SQLITE_MAX_VARS]
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(part))})",
+                    [self.model_name, *part],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [
+                    (self.model_name, h, np.asarray(vec, dtype=np.float32).tobytes())
+                    for h, vec in items.items()
+                ],
+            )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [content_hash(t) for t in texts]
+        cached = self._lookup(hashes)
+
+        missing: Dict[str, str] = {}
+        for h, text in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = text
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self._store(fresh)
+            cached.update(fresh)
+
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
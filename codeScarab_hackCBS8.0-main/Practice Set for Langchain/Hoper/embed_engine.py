@@ -0,0 +1,133 @@
+"""
+Embedding engine: one place to build the sentence-transformers model used for
+both ingest and query embedding, with tunable batch size / device / threads and
+an optional ONNX Runtime (fp32 or int8-quantized) CPU backend.
+Check a backend against the PyTorch reference:
+    python embed_engine.py --backend onnx-int8
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import argparse
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+
+# -----------------------------
+# Config
+# -----------------------------
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# ONNX exports shipped in the sentence-transformers/all-MiniLM-L6-v2 repo
+ONNX_FILE = "onnx/model.onnx"
+ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"  # portable x86 int8; *_avx512_vnni / *_arm64 also exist
+
+PARITY_TOLERANCE = 0.01  # max allowed 1 - cosine(reference, candidate)
+
+
+def engine_id(model_name: str, backend: str) -> str:
+    """Cache key for vectors produced by this model + backend."""
+    return model_name if backend == "torch" else f"{model_name}#{backend}"
+
+
+def build_embedding_engine(
+    model_name: str,
+    backend: str = "torch",
+    device: str = "cpu",
+    batch_size: int = 32,
+    threads: int = 0,
+    onnx_file: Optional[str] = None,
+) -> Embeddings:
+    """
+    Build a HuggingFaceEmbeddings configured for throughput.
+    - batch_size: sentences per forward pass for embed_documents
+    - threads: intra-op threads (0 = library default)
+    - backend: "torch", "onnx" or "onnx-int8" (needs `optimum[onnxruntime]`)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r} (use one of {', '.join(BACKENDS)}).")
+
+    model_kwargs: Dict[str, Any] = {"device": device}
+    if backend == "torch":
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+    else:
+        inner_kwargs: Dict[str, Any] = {
+            "file_name": onnx_file or (ONNX_INT8_FILE if backend == "onnx-int8" else ONNX_FILE),
+            "provider": "CPUExecutionProvider",
+        }
+        if threads:
+            import onnxruntime
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = threads
+            inner_kwargs["session_options"] = session_options
+        model_kwargs["backend"] = "onnx"
+        model_kwargs["model_kwargs"] = inner_kwargs
+
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs={"batch_size": batch_size},
+        query_encode_kwargs={"batch_size": 1},
+    )
+
+
+def max_cosine_distance(reference: List[List[float]], candidate: List[List[float]]) -> float:
+    import numpy as np
+
+    a = np.asarray(reference, dtype=np.float32)
+    b = np.asarray(candidate, dtype=np.float32)
+    a /= np.linalg.norm(a, axis=1, keepdims=True)
+    b /= np.linalg.norm(b, axis=1, keepdims=True)
+    return float(np.max(1.0 - np.sum(a * b, axis=1)))
+
+
+# -----------------------------
+# CLI: parity + speed check
+# -----------------------------
+SAMPLE_TEXTS = [
+    "How can I improve my sleep?",
+    "How can I manage my stress?",
+    "I'm feeling very depressed. What should I do now?",
+    "What are the signs of mental health that I should be aware of?",
+    "Depression can make everything seem heavy and hopeless, but remember - you're not alone.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare an embedding backend against the PyTorch reference.")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--backend", default="onnx", choices=BACKENDS)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = SAMPLE_TEXTS * 8
+    engines = {
+        "torch": build_embedding_engine(args.model, "torch", batch_size=args.batch_size, threads=args.threads),
+        args.backend: build_embedding_engine(args.model, args.backend, batch_size=args.batch_size, threads=args.threads),
+    }
+    vectors = {}
+    for name, engine in engines.items():
+        engine.embed_documents(texts[:2])  # warm-up
+        start = time.perf_counter()
+        vectors[name] = engine.embed_documents(texts)
+        docs_s = len(texts) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            engine.embed_query(texts[0])
+        query_ms = (time.perf_counter() - start) / args.repeat * 1000
+        print(f"{name:>10}: dim={len(vectors[name][0])} docs/s={docs_s:.1f} query={query_ms:.2f}ms")
+
+    distance = max_cosine_distance(vectors["torch"], vectors[args.backend])
+    status = "OK" if distance <= PARITY_TOLERANCE else "OUT OF TOLERANCE"
+    print(f"max(1 - cosine) vs torch: {distance:.5f} (tolerance {PARITY_TOLERANCE}) -> {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+FAQ fast path: curated question/answer pairs from hoperkb.txt ("Ques N: ..." then
+the answer) served without retrieval or an LLM call.
+Matching, cheapest first, all with strict thresholds:
+- exact: normalized question text -> hash map
+- lexical: difflib ratio between normalized texts, and no negation or content word
+  added or dropped (a character ratio can't tell "not depressed" from "depressed")
+- embedding: cosine similarity against the pre-embedded FAQ questions, and the same
+  number of negations (paraphrases may use other words, but not flip the meaning)
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import re
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from query_terms import negation_count, same_question
+
+# -----------------------------
+# Config
+# -----------------------------
+LEXICAL_THRESHOLD = 0.9     # difflib ratio on normalized text
+EMBEDDING_THRESHOLD = 0.92  # cosine similarity of query vs FAQ question embeddings
+
+_QUESTION_LINE = re.compile(r"^\s*Ques\s*\d+\s*:\s*(.+?)\s*$", re.IGNORECASE)
+
+
+class FAQEntry(NamedTuple):
+    question: str
+    answer: str
+
+
+class FAQMatch(NamedTuple):
+    entry: FAQEntry
+    kind: str     # "exact", "lexical" or "embedding"
+    score: float
+
+
+def normalize_question(text: str) -> str:
+    """Case, accents, curly quotes, punctuation and whitespace don't matter."""
+    text = unicodedata.normalize("NFKD", text).replace("’", "'").lower()
+    text = re.sub(r"[^\w\s']", " ", text).replace("'", "")
+    return " ".join(text.split())
+
+
+def parse_faq(text: str) -> List[FAQEntry]:
+    """Split hoperkb.txt-style text into (question, answer) pairs."""
+    entries: List[FAQEntry] = []
+    question: Optional[str] = None
+    answer_lines: List[str] = []
+
+    def flush():
+        answer = re.sub(r"\n{3,}", "\n\n", "\n".join(answer_lines)).strip()
+        if question and answer:
+            entries.append(FAQEntry(question, answer))
+
+    for line in text.splitlines():
+        match = _QUESTION_LINE.match(line)
+        if match:
+            flush()
+            question, answer_lines = match.group(1), []
+        elif question is not None:
+            answer_lines.append(line.rstrip())
+    flush()
+    return entries
+
+
+# -----------------------------
+# Index
+# -----------------------------
+class FAQIndex:
+    """Curated answers looked up by exact, lexical or embedding match."""
+
+    def __init__(
+        self,
+        entries: List[FAQEntry],
+        embeddings=None,
+        lexical_threshold: float = LEXICAL_THRESHOLD,
+        embedding_threshold: float = EMBEDDING_THRESHOLD,
+    ):
+        self.entries = entries
+        self.lexical_threshold = lexical_threshold
+        self.embedding_threshold = embedding_threshold
+        self._normalized = [normalize_question(e.question) for e in entries]
+        self._negations = np.array([negation_count(q) for q in self._normalized], dtype=np.int32)
+        self._exact: Dict[str, FAQEntry] = dict(zip(self._normalized, entries))
+
+        self._matrix: Optional[np.ndarray] = None
+        if embeddings is not None and entries:
+            vectors = np.asarray(embeddings.embed_documents([e.question for e in entries]), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._matrix = vectors / norms
+
+        self._lock = threading.Lock()
+        self.hits = {"exact": 0, "lexical": 0, "embedding": 0}
+        self.misses = 0
+
+    @classmethod
+    def from_file(cls, path: str, embeddings=None, **kwargs: Any) -> "FAQIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls(parse_faq(f.read()), embeddings=embeddings, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _hit(self, entry: FAQEntry, kind: str, score: float) -> FAQMatch:
+        with self._lock:
+            self.hits[kind] += 1
+        return FAQMatch(entry, kind, score)
+
+    def match_text(self, prompt: str) -> Optional[FAQMatch]:
+        """Exact or near-exact text match; no embedding needed."""
+        key = normalize_question(prompt)
+        entry = self._exact.get(key)
+        if entry is not None:
+            return self._hit(entry, "exact", 1.0)
+
+        best, best_score = None, 0.0
+        for i, candidate in enumerate(self._normalized):
+            matcher = SequenceMatcher(None, key, candidate)
+            # quick_ratio is an upper bound -> skip the full diff for clear misses
+            if matcher.quick_ratio() < self.lexical_threshold:
+                continue
+            score = matcher.ratio()
+            if score > best_score and same_question(key, candidate):
+                best, best_score = self.entries[i], score
+        if best is not None and best_score >= self.lexical_threshold:
+            return self._hit(best, "lexical", best_score)
+        return None
+
+    def match_vector(self, query_vector: List[float], prompt: Optional[str] = None) -> Optional[FAQMatch]:
+        """
+        Nearest FAQ question by cosine similarity; counts a miss if none is close enough.
+        With `prompt`, questions negated differently from it are never matched.
+        """
+        if self._matrix is not None and query_vector is not None:
+            query = np.asarray(query_vector, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            scores = self._matrix @ (query / norm if norm else query)
+            if prompt is not None:
+                scores = np.where(self._negations == negation_count(prompt), scores, -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.embedding_threshold:
+                return self._hit(self.entries[best], "embedding", float(scores[best]))
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(self.hits.values())
+            lookups = hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
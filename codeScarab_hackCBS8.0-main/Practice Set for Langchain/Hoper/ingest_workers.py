@@ -0,0 +1,74 @@
+"""
+Process-pool workers for PDF ingest.
+Kept in their own light module so spawned workers don't import the FastAPI app.
+Output matches PyPDFLoader (one Document per page, same text, source/page/page_label and
+doc-info metadata such as title/author/creationdate) so chunk ids stay identical to the serial path.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pypdf import PdfReader
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+def count_pages(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def doc_info(reader: PdfReader, path: str) -> Dict[str, Any]:
+    """Document-level metadata normalised the way PyPDFLoader does it (lower-case keys, ISO dates)."""
+    raw = {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""} | dict(reader.metadata or {})
+    raw |= {"source": path, "total_pages": len(reader.pages)}
+    metadata: Dict[str, Any] = {}
+    for key, value in raw.items():
+        if type(value) not in (str, int):
+            value = str(value)
+        key = key.lstrip("/").lower()
+        if key in ("creationdate", "moddate"):
+            try:
+                value = datetime.strptime(value.replace("'", ""), "D:%Y%m%d%H%M%S%z").isoformat("T")
+            except ValueError:
+                pass
+        elif isinstance(value, str):
+            value = value.strip()
+        metadata[key] = value
+    return metadata
+
+
+def extract_pages(path: str, start: int = 0, stop: Optional[int] = None) -> List[Document]:
+    """One Document per page in [start, stop) of one PDF (all pages by default)."""
+    reader = PdfReader(path)
+    total_pages = len(reader.pages)
+    stop = total_pages if stop is None else min(stop, total_pages)
+    info = doc_info(reader, path)
+    page_labels = reader.page_labels  # computed over the whole document: once, not per page
+    return [
+        Document(
+            page_content=reader.pages[page_number].extract_text(extraction_mode="plain").strip(),
+            metadata={**info, "page": page_number, "page_label": page_labels[page_number]},
+        )
+        for page_number in range(start, stop)
+    ]
+
+
+def split_pages(pages: List[Document], chunk_size: int, chunk_overlap: int) -> List[Document]:
+    """Split page by page, exactly like iter_chunk_batches does."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks: List[Document] = []
+    for page_doc in pages:
+        chunks.extend(splitter.split_documents([page_doc]))
+    return chunks
+
+
+def parse_and_split_pages(
+    path: str,
+    start: int,
+    stop: int,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> List[Document]:
+    """Extract pages [start, stop) of one PDF and split them into chunks."""
+    return split_pages(extract_pages(path, start, stop), chunk_size, chunk_overlap)
@@ -0,0 +1,270 @@
+"""
+Lexical side of hybrid retrieval.
+- BM25Index: compact in-memory inverted index over the chunk corpus, filled by
+  the ingest pipeline and persisted next to the vectors (lexical.json)
+- HybridRetriever: dense + BM25 candidates fused with reciprocal rank fusion,
+  used when the pipeline's search_type is "hybrid"
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# -----------------------------
+# Config
+# -----------------------------
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60                  # standard reciprocal rank fusion constant
+HYBRID_CANDIDATES = 20      # candidates taken from each side before fusion
+LEXICAL_MIN_COVERAGE = 0.5  # idf-weighted share of query terms a lexical-only hit must contain
+
+STOPWORDS = frozenset(
+    "a an and are as at be been but by can could do does for from had has have how i if in into is it its "
+    "me my of on or our so that the their them then there these they this to was we were what when where "
+    "which who why will with would you your".split()
+)
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class LexicalHit(NamedTuple):
+    doc: Document
+    score: float     # BM25
+    coverage: float  # idf-weighted share of query terms present in the doc
+
+
+# -----------------------------
+# BM25 index
+# -----------------------------
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring; ids are upserted like vector ids."""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._doc_terms: List[Dict[str, int]] = []
+        self._positions: Dict[str, int] = {}
+        # term -> (doc positions, BM25 weights); None means "rebuild before next search"
+        self._postings: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None
+        self._idf: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ----- writes -----
+    def add(self, ids: List[str], texts: List[str], metadatas: Optional[List[dict]] = None):
+        metadatas = metadatas or [{} for _ in texts]
+        with self._lock:
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                terms = dict(Counter(tokenize(text)))
+                position = self._positions.get(chunk_id)
+                if position is None:
+                    self._positions[chunk_id] = len(self._ids)
+                    self._ids.append(chunk_id)
+                    self._texts.append(text)
+                    self._metadatas.append(dict(metadata))
+                    self._doc_terms.append(terms)
+                else:
+                    self._texts[position] = text
+                    self._metadatas[position] = dict(metadata)
+                    self._doc_terms[position] = terms
+            self._postings = None
+
+    def delete(self, ids: List[str]):
+        drop = set(ids)
+        with self._lock:
+            keep = [i for i, chunk_id in enumerate(self._ids) if chunk_id not in drop]
+            if len(keep) == len(self._ids):
+                return
+            self._ids = [self._ids[i] for i in keep]
+            self._texts = [self._texts[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._doc_terms = [self._doc_terms[i] for i in keep]
+            self._positions = {chunk_id: i for i, chunk_id in enumerate(self._ids)}
+            self._postings = None
+
+    def _ensure_postings(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        if self._postings is None:
+            n = len(self._ids)
+            lengths = np.array([sum(terms.values()) for terms in self._doc_terms], dtype=np.float32)
+            avgdl = float(lengths.mean()) if n else 0.0
+            norm = self.k1 * (1.0 - self.b + self.b * lengths / avgdl) if avgdl else lengths
+
+            by_term: Dict[str, Tuple[List[int], List[int]]] = {}
+            for position, terms in enumerate(self._doc_terms):
+                for term, tf in terms.items():
+                    docs, tfs = by_term.setdefault(term, ([], []))
+                    docs.append(position)
+                    tfs.append(tf)
+
+            postings, idf = {}, {}
+            for term, (docs, tfs) in by_term.items():
+                df = len(docs)
+                idf[term] = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+                positions = np.asarray(docs, dtype=np.int32)
+                tf = np.asarray(tfs, dtype=np.float32)
+                postings[term] = (positions, idf[term] * tf * (self.k1 + 1.0) / (tf + norm[positions]))
+            self._postings, self._idf = postings, idf
+        return self._postings
+
+    # ----- reads -----
+    def search(self, query: str, k: int = 4) -> List[LexicalHit]:
+        query_terms = set(tokenize(query))
+        with self._lock:
+            postings = self._ensure_postings()
+            terms = [t for t in query_terms if t in postings]
+            if not terms or k <= 0:
+                return []
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+            for term in terms:
+                positions, weights = postings[term]
+                scores[positions] += weights
+
+            matched = np.flatnonzero(scores)
+            if len(matched) > k:
+                matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            matched = matched[np.argsort(-scores[matched])]
+
+            # Query terms the corpus never saw count as (maximally rare) missing terms
+            unseen_idf = math.log(1.0 + (len(self._ids) + 0.5) / 0.5)
+            total_idf = sum(self._idf[t] for t in terms) + (len(query_terms) - len(terms)) * unseen_idf
+            hits = []
+            for position in matched:
+                present = sum(self._idf[t] for t in terms if t in self._doc_terms[position])
+                hits.append(LexicalHit(
+                    Document(
+                        id=self._ids[position],
+                        page_content=self._texts[position],
+                        metadata=dict(self._metadatas[position]),
+                    ),
+                    float(scores[position]),
+                    present / total_idf,
+                ))
+            return hits
+
+    # ----- persistence -----
+    def save(self, path: str):
+        """Write the inverted index atomically."""
+        with self._lock:
+            postings: Dict[str, List[List[int]]] = {}
+            for position, terms in enumerate(self._doc_terms):
+                for term, tf in terms.items():
+                    docs, tfs = postings.setdefault(term, [[], []])
+                    docs.append(position)
+                    tfs.append(tf)
+            payload = {
+                "k1": self.k1,
+                "b": self.b,
+                "ids": list(self._ids),
+                "texts": list(self._texts),
+                "metadatas": [dict(m) for m in self._metadatas],
+                "postings": postings,
+            }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load a persisted index, or return an empty one if none exists yet."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        index = cls(k1=payload.get("k1", BM25_K1), b=payload.get("b", BM25_B))
+        index._ids = payload["ids"]
+        index._texts = payload["texts"]
+        index._metadatas = payload["metadatas"]
+        index._positions = {chunk_id: i for i, chunk_id in enumerate(index._ids)}
+        index._doc_terms = [{} for _ in index._ids]
+        for term, (docs, tfs) in payload["postings"].items():
+            for position, tf in zip(docs, tfs):
+                index._doc_terms[position][term] = tf
+        index._ensure_postings()  # ready before the first query
+        return index
+
+
+# -----------------------------
+# Hybrid retrieval
+# -----------------------------
+def reciprocal_rank_fusion(rankings: List[List[str]], rrf_k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Fuse best-first id lists: score(id) = sum over lists of 1 / (rrf_k + rank)."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+
+def _doc_key(doc: Document) -> str:
+    return doc.id or doc.page_content
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense + BM25 retrieval fused with RRF. Scores returned by search_with_scores
+    stay on the dense (cosine) scale so relevance thresholds keep their meaning:
+    a doc only BM25 found gets `lexical_score` if it covers enough of the query
+    terms, else 0.
+    """
+
+    vectorstore: Any
+    lexical: Any
+    search_type: str = "hybrid"
+    search_kwargs: Dict[str, Any] = {"k": 4}
+    candidates: int = HYBRID_CANDIDATES
+    rrf_k: int = RRF_K
+    lexical_score: float = 0.3
+    min_coverage: float = LEXICAL_MIN_COVERAGE
+
+    def search_with_scores(self, query: str, query_vector: List[float], k: int) -> List[Tuple[Document, float]]:
+        pool = max(k, self.candidates)
+        dense = self.vectorstore.similarity_search_by_vector_with_score(query_vector, k=pool)
+        lexical = self.lexical.search(query, pool)
+
+        docs: Dict[str, Document] = {}
+        scores: Dict[str, float] = {}
+        for hit in lexical:
+            key = _doc_key(hit.doc)
+            docs[key] = hit.doc
+            scores[key] = self.lexical_score if hit.coverage >= self.min_coverage else 0.0
+        for doc, score in dense:
+            key = _doc_key(doc)
+            docs[key] = doc
+            scores[key] = max(score, scores.get(key, 0.0))
+
+        fused = reciprocal_rank_fusion(
+            [[_doc_key(doc) for doc, _ in dense], [_doc_key(hit.doc) for hit in lexical]],
+            rrf_k=self.rrf_k,
+        )
+        return [(docs[key], scores[key]) for key, _ in fused[:k]]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        k = kwargs.get("k", self.search_kwargs.get("k", 4))
+        query_vector = self.vectorstore.embeddings.embed_query(query)
+        return [doc for doc, _ in self.search_with_scores(query, query_vector, k)]
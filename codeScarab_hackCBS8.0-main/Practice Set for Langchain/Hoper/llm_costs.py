@@ -0,0 +1,53 @@
+"""
+Per-mode LLM cost counters: calls and token usage for each way an answer can be
+produced ("rag", "fallback", "speculative_fallback"), including how much of it was
+generated and then thrown away. Makes the cost side of speculative fallback visible.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+FIELDS = (
+    "calls",             # LLM calls that completed
+    "used",              # ... whose answer was returned to the user
+    "discarded",         # ... whose answer was thrown away
+    "cancelled",         # calls cancelled before completing (tokens unknown)
+    "input_tokens",
+    "output_tokens",
+    "discarded_tokens",  # input + output tokens of discarded answers
+)
+
+
+class LLMCostMeter:
+    """Thread-safe counters keyed by answer mode."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._modes: Dict[str, Dict[str, int]] = {}
+
+    def _counters(self, mode: str) -> Dict[str, int]:
+        return self._modes.setdefault(mode, dict.fromkeys(FIELDS, 0))
+
+    def record(self, mode: str, usage: Optional[Dict[str, Any]], used: bool = True):
+        """Count one completed call; `usage` is an AIMessage.usage_metadata dict (may be None)."""
+        usage = usage or {}
+        input_tokens = int(usage.get("input_tokens") or 0)
+        output_tokens = int(usage.get("output_tokens") or 0)
+        with self._lock:
+            counters = self._counters(mode)
+            counters["calls"] += 1
+            counters["input_tokens"] += input_tokens
+            counters["output_tokens"] += output_tokens
+            if used:
+                counters["used"] += 1
+            else:
+                counters["discarded"] += 1
+                counters["discarded_tokens"] += input_tokens + output_tokens
+
+    def cancelled(self, mode: str):
+        with self._lock:
+            self._counters(mode)["cancelled"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {mode: dict(counters) for mode, counters in self._modes.items()}
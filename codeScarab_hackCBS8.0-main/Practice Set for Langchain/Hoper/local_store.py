@@ -0,0 +1,332 @@
+"""
+In-process vector store: a drop-in replacement for PineconeVectorStore.
+- "flat": NumPy matrix of L2-normalised embeddings, brute-force cosine top-k
+- "hnsw": same matrix plus an hnswlib graph for larger corpora (optional dependency)
+Vectors live in a preallocated buffer that grows geometrically, and upserts of known
+ids overwrite their row in place, so a batched ingest is linear in copies.
+Persisted to a directory as docs.json + vectors-<generation>.npy (+ hnsw-<generation>.bin).
+docs.json names the generation it belongs to and is replaced last, so a save that
+crashes half way leaves the previous generation readable.
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+try:
+    import hnswlib
+except ImportError:  # optional: only needed for index_type="hnsw"
+    hnswlib = None
+
+# -----------------------------
+# Config (tunable)
+# -----------------------------
+DOCS_FILE = "docs.json"
+VECTORS_FILE = "vectors.npy"  # unversioned names written by older saves
+HNSW_FILE = "hnsw.bin"
+MIN_CAPACITY = 1024           # rows preallocated on the first insert
+
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+# -----------------------------
+# Vector store
+# -----------------------------
+class LocalVectorStore(VectorStore):
+    """Cosine-similarity vector store held in RAM and persisted to disk."""
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        dim: int,
+        persist_dir: Optional[str] = None,
+        index_type: str = "flat",
+    ):
+        if index_type not in ("flat", "hnsw"):
+            raise ValueError(f"Unknown local index type: {index_type!r} (use 'flat' or 'hnsw')")
+        if index_type == "hnsw" and hnswlib is None:
+            raise RuntimeError("index_type='hnsw' requires hnswlib. Install it with `pip install hnswlib`.")
+
+        self._embedding = embedding
+        self.dim = dim
+        self.persist_dir = persist_dir
+        self.index_type = index_type
+
+        self._lock = threading.RLock()
+        self._buffer = np.zeros((0, dim), dtype=np.float32)  # rows [0, len(self)) are in use
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}  # id -> row
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._hnsw = None  # built lazily; None means "rebuild before next search"
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def _vectors(self) -> np.ndarray:
+        return self._buffer[: len(self._ids)]
+
+    def _restore(self, vectors: np.ndarray, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace the whole contents (used by load)."""
+        if len(vectors) != len(ids):
+            raise RuntimeError(f"Local index has {len(vectors)} vectors for {len(ids)} ids. Run /reindex.")
+        with self._lock:
+            self._buffer = np.array(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+            self._ids = list(ids)
+            self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+            self._texts = list(texts)
+            self._metadatas = [dict(m) for m in metadatas]
+            self._hnsw = None
+
+    def _reserve(self, rows: int):
+        if rows > len(self._buffer):
+            buffer = np.empty((max(rows, 2 * len(self._buffer), MIN_CAPACITY), self.dim), dtype=np.float32)
+            buffer[: len(self._ids)] = self._vectors
+            self._buffer = buffer
+
+    # ----- writes -----
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = self._embedding.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas=metadatas, ids=ids)
+
+    def add_vectors(
+        self,
+        vectors: List[List[float]],
+        texts: List[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Insert precomputed embeddings; existing ids are overwritten (upsert)."""
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dim))
+
+        with self._lock:
+            self._reserve(len(self._ids) + len(ids))
+            rows = []
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                row = self._rows.get(chunk_id)
+                if row is None:
+                    row = self._rows[chunk_id] = len(self._ids)
+                    self._ids.append(chunk_id)
+                    self._texts.append(text)
+                    self._metadatas.append(dict(metadata))
+                else:
+                    self._texts[row] = text
+                    self._metadatas[row] = dict(metadata)
+                rows.append(row)
+            self._buffer[rows] = matrix
+            self._hnsw = None
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False, **kwargs: Any) -> Optional[bool]:
+        with self._lock:
+            if delete_all:
+                self._buffer = np.zeros((0, self.dim), dtype=np.float32)
+                self._ids, self._texts, self._metadatas = [], [], []
+                self._rows = {}
+            elif ids:
+                self._delete_ids(ids)
+            self._hnsw = None
+        return True
+
+    def _delete_ids(self, ids: List[str]):
+        drop = {self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows}
+        if not drop:
+            return
+        keep = [i for i in range(len(self._ids)) if i not in drop]
+        self._buffer[: len(keep)] = self._buffer[keep]
+        self._ids = [self._ids[i] for i in keep]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        self._texts = [self._texts[i] for i in keep]
+        self._metadatas = [self._metadatas[i] for i in keep]
+
+    # ----- reads -----
+    def _top_k(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        n = len(self._ids)
+        if n == 0 or k <= 0:
+            return []
+        k = min(k, n)
+
+        if self.index_type == "hnsw":
+            graph = self._ensure_hnsw()
+            labels, distances = graph.knn_query(query, k=k)
+            # hnswlib "cosine" space returns 1 - cos
+            return [(int(i), float(1.0 - d)) for i, d in zip(labels[0], distances[0])]
+
+        scores = self._vectors @ query
+        if k < n:
+            idx = np.argpartition(-scores, k - 1)[:k]
+        else:
+            idx = np.arange(n)
+        idx = idx[np.argsort(-scores[idx])]
+        return [(int(i), float(scores[i])) for i in idx]
+
+    def _ensure_hnsw(self):
+        if self._hnsw is None:
+            graph = hnswlib.Index(space="cosine", dim=self.dim)
+            graph.init_index(max_elements=max(len(self._ids), 1), ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+            if len(self._ids):
+                graph.add_items(self._vectors, np.arange(len(self._ids)))
+            graph.set_ef(HNSW_EF_SEARCH)
+            self._hnsw = graph
+        return self._hnsw
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        query = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, self.dim))[0]
+        with self._lock:
+            hits = self._top_k(query, k)
+            return [
+                (
+                    Document(id=self._ids[i], page_content=self._texts[i], metadata=dict(self._metadatas[i])),
+                    score,
+                )
+                for i, score in hits
+            ]
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        # PineconeVectorStore's name for the same call
+        return self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k=k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities in [-1, 1]; map to [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    # ----- persistence -----
+    def save(self, persist_dir: Optional[str] = None):
+        """Write the index to disk as a new generation; docs.json switches to it atomically."""
+        persist_dir = persist_dir or self.persist_dir
+        if not persist_dir:
+            raise ValueError("No persist_dir configured for LocalVectorStore.")
+        Path(persist_dir).mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            vectors = self._vectors.copy()
+            generation = uuid.uuid4().hex[:12]
+            payload = {
+                "dim": self.dim,
+                "generation": generation,
+                "vectors_file": f"vectors-{generation}.npy",
+                "ids": list(self._ids),
+                "texts": list(self._texts),
+                "metadatas": [dict(m) for m in self._metadatas],
+            }
+            graph = self._ensure_hnsw() if self.index_type == "hnsw" and len(self._ids) else None
+
+            if graph is not None:
+                payload["hnsw_file"] = f"hnsw-{generation}.bin"
+
+        # New generation's files first (nothing references them yet), docs.json last
+        with open(os.path.join(persist_dir, payload["vectors_file"]), "wb") as f:
+            np.save(f, vectors)
+        if graph is not None:
+            graph.save_index(os.path.join(persist_dir, payload["hnsw_file"]))
+        tmp_docs = os.path.join(persist_dir, DOCS_FILE + ".tmp")
+        with open(tmp_docs, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_docs, os.path.join(persist_dir, DOCS_FILE))
+
+        # Older generations are unreferenced now
+        current = {payload["vectors_file"], payload.get("hnsw_file")}
+        for path in Path(persist_dir).iterdir():
+            stale = path.name in (VECTORS_FILE, HNSW_FILE) or (
+                path.name.startswith(("vectors-", "hnsw-")) and path.suffix in (".npy", ".bin")
+            )
+            if stale and path.name not in current:
+                path.unlink(missing_ok=True)
+
+    @classmethod
+    def load(
+        cls,
+        persist_dir: str,
+        embedding: Embeddings,
+        dim: int,
+        index_type: str = "flat",
+    ) -> "LocalVectorStore":
+        """Load a persisted index, or return an empty store if none exists yet."""
+        store = cls(embedding=embedding, dim=dim, persist_dir=persist_dir, index_type=index_type)
+        docs_path = os.path.join(persist_dir, DOCS_FILE)
+        if not os.path.exists(docs_path):
+            return store
+
+        with open(docs_path, encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("dim") != dim:
+            raise RuntimeError(
+                f"Local index at {persist_dir} has dim={payload.get('dim')}, expected {dim}. Run /reindex."
+            )
+        vectors_path = os.path.join(persist_dir, payload.get("vectors_file", VECTORS_FILE))
+        if not os.path.exists(vectors_path):
+            raise RuntimeError(f"Local index at {persist_dir} is missing {os.path.basename(vectors_path)}. Run /reindex.")
+        store._restore(np.load(vectors_path), payload["ids"], payload["texts"], payload["metadatas"])
+
+        graph_path = os.path.join(persist_dir, payload.get("hnsw_file", HNSW_FILE))
+        if index_type == "hnsw" and os.path.exists(graph_path) and len(store._ids):
+            graph = hnswlib.Index(space="cosine", dim=dim)
+            graph.load_index(graph_path, max_elements=len(store._ids))
+            graph.set_ef(HNSW_EF_SEARCH)
+            store._hnsw = graph
+        return store
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        dim: int = 384,
+        persist_dir: Optional[str] = None,
+        index_type: str = "flat",
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding=embedding, dim=dim, persist_dir=persist_dir, index_type=index_type)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
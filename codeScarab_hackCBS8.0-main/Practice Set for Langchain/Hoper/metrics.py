@@ -0,0 +1,249 @@
+"""
+Observability for the request path: timing spans, Prometheus metrics, per-request traces.
+- span(stage): times a block into the hoper_stage_seconds histogram and, when a request
+  is being traced, that request's breakdown
+- stage_summary(): the /timings view of that histogram (count, mean, bucket-estimated p50/p95)
+- request_trace(): collects one request's spans (returned as a Server-Timing header, or
+  a final `timing` event for streams, whose duration is recorded when the body ends)
+- StatsCollector: exports counters the caches and cost meter already keep, read at scrape time
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    ProcessCollector,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from circuit_breaker import STATE_CODES
+
+# -----------------------------
+# Metrics
+# -----------------------------
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)  # RSS, CPU seconds, open fds
+
+# Embedding / search are milliseconds, LLM calls and reindex stages are seconds
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "hoper_stage_seconds", "Time spent per pipeline stage", ["stage"],
+    buckets=STAGE_BUCKETS, registry=REGISTRY,
+)
+REQUEST_SECONDS = Histogram(
+    "hoper_request_seconds", "End-to-end latency of traced endpoints (to the last byte for streams)",
+    ["endpoint"], buckets=STAGE_BUCKETS, registry=REGISTRY,
+)
+ANSWERS = Counter(
+    "hoper_answers", "Answers by endpoint and how they were produced (rag, fallback, faq, cache, error, shed, rate_limited, deadline)",
+    ["endpoint", "mode"], registry=REGISTRY,
+)
+
+
+# -----------------------------
+# Spans
+# -----------------------------
+class RequestTrace:
+    """Stage durations of one request, in the order they finished."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+        self.deferred = False  # set for streams: finish() runs when the body ends
+        self._finished = False
+
+    def add(self, stage: str, seconds: float):
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. `embed;dur=4.1, retrieve;dur=0.8, total;dur=912.0`."""
+        parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.spans.items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def finish(self):
+        """Record the request duration (once)."""
+        if not self._finished:
+            self._finished = True
+            REQUEST_SECONDS.labels(self.endpoint).observe(time.perf_counter() - self.started)
+
+
+# Set per request; executor hops must copy the context (see run_blocking) to see it
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("hoper_request_trace", default=None)
+
+
+def observe(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def request_trace(endpoint: str) -> Iterator[RequestTrace]:
+    trace = RequestTrace(endpoint)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        if not trace.deferred:
+            trace.finish()
+
+
+def count_answer(endpoint: str, mode: str):
+    ANSWERS.labels(endpoint, mode).inc()
+
+
+# -----------------------------
+# Stage summary (/timings)
+# -----------------------------
+def _quantile(q: float, buckets: List[Tuple[float, float]], count: float) -> float:
+    """Like PromQL histogram_quantile: linear interpolation inside the bucket holding rank q*count."""
+    rank = q * count
+    lower, below = 0.0, 0.0
+    for upper, cumulative in buckets:
+        if cumulative >= rank:
+            if upper == float("inf"):
+                return lower  # beyond the last finite bucket: report its bound
+            return lower + (upper - lower) * (rank - below) / (cumulative - below) if cumulative > below else lower
+        lower, below = upper, cumulative
+    return lower
+
+
+def stage_summary() -> Dict[str, Dict[str, Any]]:
+    """Per-stage count / mean / p50 / p95 since start, read from the hoper_stage_seconds histogram."""
+    stages: Dict[str, Dict[str, Any]] = {}
+    for metric in STAGE_SECONDS.collect():
+        for sample in metric.samples:
+            stage = stages.setdefault(sample.labels["stage"], {"buckets": []})
+            if sample.name.endswith("_bucket"):
+                stage["buckets"].append((float(sample.labels["le"]), sample.value))
+            elif sample.name.endswith("_count"):
+                stage["count"] = sample.value
+            elif sample.name.endswith("_sum"):
+                stage["sum"] = sample.value
+    summary = {}
+    for name, stage in stages.items():
+        count = stage.get("count", 0)
+        if not count:
+            continue
+        buckets = sorted(stage["buckets"])
+        summary[name] = {
+            "count": int(count),
+            "mean_ms": round(stage["sum"] / count * 1000, 3),
+            "p50_ms": round(_quantile(0.5, buckets, count) * 1000, 3),
+            "p95_ms": round(_quantile(0.95, buckets, count) * 1000, 3),
+        }
+    return summary
+
+
+# -----------------------------
+# Counters kept elsewhere
+# -----------------------------
+class StatsCollector:
+    """
+    Reads existing stats() dicts at scrape time instead of double-counting:
+    - caches: name -> callable returning {"hits", "misses", ...} (or None if absent)
+    - llm_costs: callable returning LLMCostMeter.stats()
+    - admission: callable returning AdmissionController.stats() (shed counts by reason)
+    - llm_calls: callable returning HedgedCaller.stats() (hedges, retries, retry budget)
+    - breakers: name -> callable returning CircuitBreaker.stats()
+    """
+
+    def __init__(self):
+        self.caches: Dict[str, Callable[[], Optional[Dict[str, Any]]]] = {}
+        self.llm_costs: Optional[Callable[[], Dict[str, Dict[str, Any]]]] = None
+        self.admission: Optional[Callable[[], Dict[str, Any]]] = None
+        self.llm_calls: Optional[Callable[[], Dict[str, Any]]] = None
+        self.breakers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def collect(self):
+        hits = CounterMetricFamily("hoper_cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("hoper_cache_misses", "Cache misses", labels=["cache"])
+        for name, read in self.caches.items():
+            stats = read()
+            if not stats:
+                continue
+            cache_hits = stats["hits"]
+            hits.add_metric([name], sum(cache_hits.values()) if isinstance(cache_hits, dict) else cache_hits)
+            misses.add_metric([name], stats["misses"])
+        yield hits
+        yield misses
+
+        if self.llm_costs is not None:
+            tokens = CounterMetricFamily("hoper_llm_tokens", "LLM tokens by answer mode", labels=["mode", "kind"])
+            calls = CounterMetricFamily("hoper_llm_calls", "LLM calls by answer mode", labels=["mode", "result"])
+            for mode, stats in self.llm_costs().items():
+                for kind in ("input", "output"):
+                    tokens.add_metric([mode, kind], stats[f"{kind}_tokens"])
+                for result in ("used", "discarded", "cancelled"):
+                    calls.add_metric([mode, result], stats[result])
+            yield tokens
+            yield calls
+
+        if self.admission is not None:
+            stats = self.admission()
+            yield GaugeMetricFamily("hoper_llm_in_flight", "Requests currently holding an LLM slot", value=stats["in_flight"])
+            yield GaugeMetricFamily("hoper_llm_queue_depth", "Requests waiting for an LLM slot", value=stats["queued"])
+            yield CounterMetricFamily("hoper_llm_admitted", "Requests admitted to the LLM", value=stats["admitted"])
+            shed = CounterMetricFamily("hoper_shed", "Requests rejected by admission control", labels=["reason"])
+            for reason, count in stats["shed"].items():
+                shed.add_metric([reason], count)
+            yield shed
+
+        if self.llm_calls is not None:
+            stats = self.llm_calls()
+            extra = CounterMetricFamily("hoper_llm_extra_attempts", "LLM attempts beyond the first", labels=["kind"])
+            extra.add_metric(["hedge"], stats["hedges"])
+            extra.add_metric(["retry"], stats["retries"])
+            yield extra
+            yield CounterMetricFamily("hoper_llm_hedge_wins", "Calls answered by the hedged attempt", value=stats["hedge_wins"])
+            yield CounterMetricFamily(
+                "hoper_retry_budget_exhausted", "Hedges/retries skipped because the budget was spent",
+                value=stats["budget"]["exhausted"],
+            )
+            yield GaugeMetricFamily("hoper_llm_hedge_delay_seconds", "Current hedge delay (recent p95)", value=stats["hedge_delay_seconds"])
+
+        if self.breakers:
+            state = GaugeMetricFamily("hoper_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", labels=["breaker"])
+            trips = CounterMetricFamily("hoper_circuit_trips", "Times the breaker opened", labels=["breaker"])
+            skipped = CounterMetricFamily("hoper_circuit_short_circuited", "Calls refused while open", labels=["breaker"])
+            for name, read in self.breakers.items():
+                stats = read()
+                state.add_metric([name], STATE_CODES[stats["state"]])
+                trips.add_metric([name], stats["trips"])
+                skipped.add_metric([name], stats["short_circuited"])
+            yield state
+            yield trips
+            yield skipped
+
+
+STATS = StatsCollector()
+REGISTRY.register(STATS)
+
+
+def render_latest() -> bytes:
+    """Prometheus text exposition (content type CONTENT_TYPE_LATEST)."""
+    return generate_latest(REGISTRY)
@@ -0,0 +1,72 @@
+"""
+Term-level guards for fuzzy question matching (FAQ fast path, semantic response cache).
+Character ratios and sentence embeddings both rate "I want to hurt myself" and
+"I don't want to hurt myself" as near-identical; these checks catch what they miss.
+- same_polarity(): both texts contain the same number of negations ("not", "dont", "never"...)
+- same_content(): neither text has a content word the other lacks; typos and simple
+  inflections ("depresed", "feeling"/"feel") still count as the same word
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import re
+from difflib import get_close_matches
+from typing import FrozenSet, List
+
+# -----------------------------
+# Config
+# -----------------------------
+CLOSE_WORD_CUTOFF = 0.8  # difflib ratio at which two content words count as the same (typos)
+
+NEGATIONS = frozenset(
+    "not no never nothing nobody none nor neither nowhere without cannot cant dont doesnt didnt "
+    "isnt arent wasnt werent wont wouldnt shouldnt couldnt havent hasnt hadnt aint mustnt neednt".split()
+)
+STOPWORDS = frozenset(
+    "a an the i im ive id ill me my myself mine you your yours we our us it its is am are was were "
+    "be been being do does did doing have has had to of in on at for with about into from by as "
+    "and or but so if then than that this these those there what which who whom how why when where "
+    "can could should would will shall may might must just very really now please some any also".split()
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+
+def words(text: str) -> List[str]:
+    """Lower-case words; apostrophes are dropped so "don't" reads as "dont"."""
+    return _WORD.findall(text.lower().replace("’", "'").replace("'", ""))
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def negation_count(text: str) -> int:
+    return sum(word in NEGATIONS for word in words(text))
+
+
+def content_terms(text: str) -> FrozenSet[str]:
+    return frozenset(_stem(word) for word in words(text) if word not in STOPWORDS and word not in NEGATIONS)
+
+
+def same_polarity(a: str, b: str) -> bool:
+    return negation_count(a) == negation_count(b)
+
+
+def _covered(terms: FrozenSet[str], pool: FrozenSet[str]) -> bool:
+    return all(term in pool or get_close_matches(term, pool, n=1, cutoff=CLOSE_WORD_CUTOFF) for term in terms)
+
+
+def same_content(a: str, b: str) -> bool:
+    terms_a, terms_b = content_terms(a), content_terms(b)
+    return _covered(terms_a, terms_b) and _covered(terms_b, terms_a)
+
+
+def same_question(a: str, b: str) -> bool:
+    """Neither a negation nor a content word was added or dropped."""
+    return same_polarity(a, b) and same_content(a, b)
@@ -0,0 +1,83 @@
+"""
+Optional cross-encoder reranking: retrieve many candidates, score every
+(query, chunk) pair in one batched CPU forward pass, keep the best few.
+Scores are cached per (query, chunk), so a repeated question skips the model.
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import hashlib
+import threading
+from typing import Any, Dict, List, Tuple
+
+from ttl_cache import TTLCache
+
+# -----------------------------
+# Config
+# -----------------------------
+DEFAULT_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"  # ~22M params, fast on CPU
+MAX_LENGTH = 512
+
+
+class CrossEncoderReranker:
+    """Reorders retrieved (doc, score) pairs by a sentence-transformers CrossEncoder."""
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        device: str = "cpu",
+        batch_size: int = 32,
+        cache_entries: int = 20000,
+        cache_ttl: float = 3600.0,
+    ):
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = CrossEncoder(model_name, device=device, max_length=MAX_LENGTH)
+        self._model_lock = threading.Lock()  # one forward pass at a time; CPU threads are already busy
+        self._scores = TTLCache(max_entries=cache_entries, ttl_seconds=cache_ttl)
+        self.batches = 0
+        self.pairs_scored = 0
+
+    @staticmethod
+    def _chunk_key(doc) -> str:
+        # Chunk ids are content-derived, so cached scores survive a reindex
+        return getattr(doc, "id", None) or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+    def score(self, query: str, docs: List) -> List[float]:
+        """Relevance logits for (query, doc) pairs; only uncached pairs hit the model."""
+        keys = [(query, self._chunk_key(doc)) for doc in docs]
+        scores = [self._scores.get(key) for key in keys]
+        missing = [i for i, value in enumerate(scores) if value is None]
+        if missing:
+            pairs = [(query, docs[i].page_content) for i in missing]
+            with self._model_lock:
+                predicted = self._model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+                self.batches += 1
+                self.pairs_scored += len(pairs)
+            for i, value in zip(missing, predicted):
+                scores[i] = float(value)
+                self._scores.put(keys[i], scores[i])
+        return scores
+
+    def rerank(self, query: str, scored: List[Tuple[Any, float]], top_n: int) -> List[Tuple[Any, float]]:
+        """
+        Best `top_n` of the (doc, retrieval score) pairs by cross-encoder score.
+        Retrieval scores are passed through, so relevance thresholds keep their meaning.
+        """
+        if not scored:
+            return []
+        relevance = self.score(query, [doc for doc, _ in scored])
+        order = sorted(range(len(scored)), key=lambda i: -relevance[i])[:top_n]
+        return [scored[i] for i in order]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._model_lock:
+            return {
+                "model": self.model_name,
+                "batches": self.batches,
+                "pairs_scored": self.pairs_scored,
+                "score_cache": self._scores.stats(),
+            }
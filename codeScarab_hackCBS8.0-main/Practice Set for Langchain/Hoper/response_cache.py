@@ -0,0 +1,157 @@
+"""
+Semantic response cache: near-duplicate prompts (cosine similarity of their
+query embeddings above a threshold) with the same k_top reuse a previous answer.
+LRU + TTL eviction, thread-safe, with hit/miss counters.
+- Embeddings live in a matrix preallocated to max_entries rows and updated in place on
+  put/evict, so a lookup is one matrix-vector product on the event loop (no per-lookup
+  expiry pass or np.stack)
+- Entries belong to a generation (the pipeline that produced them): clear(generation)
+  starts a new one, and puts still tagged with an older one are rejected
+- Entries put with their prompt text only match prompts with the same negations and
+  content words (query_terms.same_question): embeddings score "I want to hurt myself"
+  and "I don't want to hurt myself" well above the threshold
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from query_terms import same_question
+
+
+class SemanticResponseCache:
+    """Maps query embeddings to cached responses by cosine similarity."""
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1024, ttl_seconds: float = 3600.0):
+        self.threshold = threshold
+        self.max_entries = max(max_entries, 0)
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None  # (max_entries, dim) unit vectors, allocated on the first put
+        self._partitions = np.full(self.max_entries, -1, dtype=np.int64)  # partition id per slot, -1 = free
+        self._created = np.zeros(self.max_entries)
+        self._values: List[Any] = [None] * self.max_entries
+        self._texts: List[Optional[str]] = [None] * self.max_entries
+        self._partition_ids: Dict[Any, int] = {}
+        self._lru: "OrderedDict[int, None]" = OrderedDict()  # used slots, least recently used first
+        self._free: List[int] = list(range(self.max_entries - 1, -1, -1))
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_puts = 0
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    # -----------------------------
+    # Slots (lock held)
+    # -----------------------------
+    def _drop(self, slot: int):
+        self._partitions[slot] = -1
+        self._values[slot] = None
+        self._texts[slot] = None
+        del self._lru[slot]
+        self._free.append(slot)
+
+    def _expire(self, now: float):
+        expired = np.flatnonzero((self._partitions >= 0) & (self._created < now - self.ttl_seconds))
+        for slot in expired:
+            self._drop(int(slot))
+        self.evictions += len(expired)
+
+    def _reset(self):
+        self._partitions.fill(-1)
+        self._values = [None] * self.max_entries
+        self._texts = [None] * self.max_entries
+        self._partition_ids.clear()
+        self._lru.clear()
+        self._free = list(range(self.max_entries - 1, -1, -1))
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    def get(self, vector: List[float], partition: Any, text: Optional[str] = None) -> Optional[Any]:
+        """Best cached value in `partition` (e.g. k_top) whose similarity >= threshold.
+        With `text`, entries whose prompt differs from it by a negation or content word are skipped."""
+        query = self._unit(vector)
+        with self._lock:
+            partition_id = self._partition_ids.get(partition)
+            if partition_id is not None and self._matrix is not None and self._matrix.shape[1] == query.shape[0]:
+                live = (self._partitions == partition_id) & (self._created >= time.time() - self.ttl_seconds)
+                if live.any():
+                    scores = np.where(live, self._matrix @ query, -np.inf)
+                    candidates = np.flatnonzero(scores >= self.threshold)
+                    for slot in candidates[np.argsort(-scores[candidates])]:
+                        slot = int(slot)
+                        cached_text = self._texts[slot]
+                        if text is None or cached_text is None or same_question(text, cached_text):
+                            self._lru.move_to_end(slot)
+                            self.hits += 1
+                            return self._values[slot]
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        vector: List[float],
+        partition: Any,
+        value: Any,
+        generation: Optional[int] = None,
+        text: Optional[str] = None,
+    ):
+        """Cache `value` (for prompt `text`); dropped if `generation` is given and the cache has since moved on."""
+        if not self.max_entries:
+            return
+        unit = self._unit(vector)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.stale_puts += 1
+                return
+            if self._matrix is None or self._matrix.shape[1] != unit.shape[0]:
+                # First put, or the embedding model changed: old vectors are not comparable
+                self._reset()
+                self._matrix = np.zeros((self.max_entries, unit.shape[0]), dtype=np.float32)
+            now = time.time()
+            self._expire(now)
+            if not self._free:
+                self._drop(next(iter(self._lru)))
+                self.evictions += 1
+            slot = self._free.pop()
+            self._matrix[slot] = unit
+            self._partitions[slot] = self._partition_ids.setdefault(partition, len(self._partition_ids))
+            self._created[slot] = now
+            self._values[slot] = value
+            self._texts[slot] = text
+            self._lru[slot] = None
+
+    def clear(self, generation: Optional[int] = None):
+        """Drop every entry; with `generation`, only puts tagged with it are accepted from now on."""
+        with self._lock:
+            self._reset()
+            if generation is not None:
+                self.generation = generation
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.time())
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._lru),
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale_puts": self.stale_puts,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,318 @@
+"""
+Offline retrieval evaluation: recall / MRR against prompt size and latency over a parameter grid.
+- Gold set: the curated "Ques N:" questions in hoperkb.txt, plus optional --pairs (JSONL)
+- Relevant chunks for a question: the chunks on the pair's "pages", or silver labels from
+  its reference answer: chunks that BM25 *and* dense search over the answer text both rank
+  in their top AGREEMENT_DEPTH, above a term-coverage and a similarity floor (best
+  --gold-depth by combined rank). Neither evaluated retriever sees the answer, but both
+  score families shape the labels, so compare search types with page labels where you can.
+  Questions whose answer has no such chunk (not grounded in the corpus) are reported as
+  unlabelled and left out of recall/MRR
+- Every CHUNK_SIZE x CHUNK_OVERLAP re-chunks the Hoper/data corpus and embeds it through
+  the persistent embedding cache (HOPER_EMBED_CACHE), so only unseen chunk texts hit the
+  model; K_TOP, RAG_MIN_SCORE and FALLBACK_IF_CONTEXT_LT are swept over one search per question
+Run:
+    python retrieval_eval.py
+    python retrieval_eval.py --chunk-sizes 600,1000,1400 --chunk-overlaps 60,120 --k-tops 1,2,4,8
+    python retrieval_eval.py --pairs my_pairs.jsonl --search-types similarity,hybrid
+Pairs file, one JSON object per line:
+    {"question": "...", "answer": "reference answer text"}
+    {"question": "...", "pages": [12, 13], "source": "Mental Health.pdf"}   # 1-based PDF pages
+"""
+
+# -----------------------------
+# Imports
+# -----------------------------
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import api
+from context_packer import load_encoding, pack_context
+from faq import parse_faq
+from ingest_workers import extract_pages, split_pages
+from lexical_index import BM25Index, HybridRetriever
+from local_store import LocalVectorStore
+
+# -----------------------------
+# Config
+# -----------------------------
+RESULTS_DIR = Path(__file__).parent / "cache" / "eval"
+GOLD_DEPTH = 3               # silver-labelled chunks per question, at most
+AGREEMENT_DEPTH = 10         # BM25 and dense candidates per reference answer that must overlap
+MIN_ANSWER_COVERAGE = 0.06   # idf-weighted share of answer terms a labelled chunk must contain
+MIN_ANSWER_SIMILARITY = 0.4  # answer-to-chunk cosine a labelled chunk must reach (model dependent)
+LABEL_METHOD = (
+    "explicit pages, else chunks in both the BM25 and dense top-"
+    f"{AGREEMENT_DEPTH} for the reference answer (silver, independent of the question)"
+)
+
+
+class GoldQuery(NamedTuple):
+    question: str
+    answer: Optional[str] = None
+    pages: Optional[Set[int]] = None  # 1-based PDF page numbers
+    source: Optional[str] = None      # PDF file name the pages belong to (any if None)
+
+
+def load_gold(faq_path: str, pairs_path: Optional[str]) -> List[GoldQuery]:
+    gold: List[GoldQuery] = []
+    if faq_path and os.path.exists(faq_path):
+        with open(faq_path, encoding="utf-8") as f:
+            gold.extend(GoldQuery(e.question, e.answer) for e in parse_faq(f.read()))
+    if pairs_path:
+        with open(pairs_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                pair = json.loads(line)
+                pages = set(pair["pages"]) if pair.get("pages") else None
+                gold.append(GoldQuery(pair["question"], pair.get("answer"), pages, pair.get("source")))
+    return gold
+
+
+def relevant_ids(
+    query: GoldQuery,
+    answer_vector: Optional[List[float]],
+    chunks: List,
+    ids: List[str],
+    store: LocalVectorStore,
+    lexical: BM25Index,
+    depth: int,
+    min_similarity: float,
+) -> Set[str]:
+    """Explicit page labels, else lexical/dense agreement on the reference answer (empty = unlabelled)."""
+    if query.pages:
+        return {
+            chunk_id for chunk, chunk_id in zip(chunks, ids)
+            if chunk.metadata.get("page", -1) + 1 in query.pages
+            and (query.source is None or os.path.basename(chunk.metadata.get("source", "")) == query.source)
+        }
+    if not query.answer or answer_vector is None:
+        return set()
+    lexical_rank = {
+        hit.doc.id: rank for rank, hit in enumerate(lexical.search(query.answer, AGREEMENT_DEPTH))
+        if hit.coverage >= MIN_ANSWER_COVERAGE
+    }
+    dense_rank = {
+        doc.id: rank for rank, (doc, score) in enumerate(store.similarity_search_by_vector_with_score(answer_vector, k=AGREEMENT_DEPTH))
+        if score >= min_similarity
+    }
+    agreed = sorted(set(lexical_rank) & set(dense_rank), key=lambda chunk_id: lexical_rank[chunk_id] + dense_rank[chunk_id])
+    return set(agreed[:depth])
+
+
+# -----------------------------
+# Metrics
+# -----------------------------
+def percentile_ms(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 3) if values else 0.0
+
+
+def score_rankings(
+    rankings: List[List[Tuple[Any, float]]],
+    relevant: List[Set[str]],
+    k: int,
+    min_score: float,
+    fallback_if_context_lt: int,
+    chunk_overlap: int,
+) -> Dict[str, Any]:
+    """recall@k / MRR@k over labelled questions; RAG rate and packed context size as api.py would see them."""
+    recalls, reciprocal_ranks, context_tokens = [], [], []
+    for ranked, rel in zip(rankings, relevant):
+        top = ranked[:k]
+        if rel:
+            found = [i for i, (doc, _) in enumerate(top) if doc.id in rel]
+            recalls.append(len(found) / len(rel))
+            reciprocal_ranks.append(1.0 / (found[0] + 1) if found else 0.0)
+        context = [doc for doc, score in top if score >= min_score]
+        if len(context) >= max(fallback_if_context_lt, 1):
+            _, tokens = pack_context(context, api.CONTEXT_MAX_TOKENS, max_overlap=chunk_overlap)
+            context_tokens.append(tokens)
+    return {
+        "recall@k": round(sum(recalls) / len(recalls), 4) if recalls else None,
+        "mrr": round(sum(reciprocal_ranks) / len(reciprocal_ranks), 4) if reciprocal_ranks else None,
+        "rag_rate": round(len(context_tokens) / len(rankings), 4) if rankings else 0.0,
+        "context_tokens_mean": round(sum(context_tokens) / len(context_tokens), 1) if context_tokens else 0.0,
+        "context_tokens_max": max(context_tokens, default=0),
+    }
+
+
+# -----------------------------
+# Sweep
+# -----------------------------
+def evaluate_chunking(
+    gold: List[GoldQuery],
+    query_vectors: List[List[float]],
+    answer_vectors: List[Optional[List[float]]],
+    pages: List,
+    embeddings,
+    chunk_size: int,
+    chunk_overlap: int,
+    args: argparse.Namespace,
+) -> List[Dict[str, Any]]:
+    """All K_TOP / RAG_MIN_SCORE / FALLBACK_IF_CONTEXT_LT / search type rows for one chunking."""
+    chunks = split_pages(pages, chunk_size, chunk_overlap)
+    ids = [f"chunk-{i}" for i in range(len(chunks))]
+    texts = [c.page_content for c in chunks]
+
+    before = embeddings.stats() if hasattr(embeddings, "stats") else None
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    index_seconds = time.perf_counter() - start
+    after = embeddings.stats() if before is not None else None
+    store = LocalVectorStore(embedding=embeddings, dim=len(vectors[0]), index_type=args.index_type)
+    store.add_vectors(vectors, texts, metadatas=[c.metadata for c in chunks], ids=ids)
+    lexical = BM25Index()
+    lexical.add(ids, texts, [c.metadata for c in chunks])
+    relevant = [
+        relevant_ids(q, answer_vector, chunks, ids, store, lexical, args.gold_depth, args.min_answer_similarity)
+        for q, answer_vector in zip(gold, answer_vectors)
+    ]
+    unlabelled = [q.question for q, rel in zip(gold, relevant) if not rel]
+    print(
+        f"✅ chunk_size={chunk_size} overlap={chunk_overlap}: {len(chunks)} chunks embedded in {index_seconds:.1f}s"
+        + (f" ({after['misses'] - before['misses']} new)" if before is not None else "")
+    )
+    if unlabelled:
+        print(f"❌ {len(unlabelled)}/{len(gold)} questions unlabelled (answer not grounded in the corpus):")
+        for question in unlabelled:
+            print(f"   - {question}")
+
+    depth = max(args.k_tops)
+    rows = []
+    for search_type in args.search_types:
+        hybrid = HybridRetriever(vectorstore=store, lexical=lexical, lexical_score=api.RAG_MIN_SCORE)
+        rankings, search_seconds = [], []
+        for query, vector in zip(gold, query_vectors):
+            start = time.perf_counter()
+            if search_type == "hybrid":
+                ranked = hybrid.search_with_scores(query.question, vector, depth)
+            else:
+                ranked = store.similarity_search_by_vector_with_score(vector, k=depth)
+            search_seconds.append(time.perf_counter() - start)
+            rankings.append(ranked)
+
+        for k in args.k_tops:
+            for min_score in args.min_scores:
+                for fallback_lt in args.fallback_if_context_lt:
+                    rows.append({
+                        "search_type": search_type,
+                        "chunk_size": chunk_size,
+                        "chunk_overlap": chunk_overlap,
+                        "k_top": k,
+                        "rag_min_score": min_score,
+                        "fallback_if_context_lt": fallback_lt,
+                        "chunks": len(chunks),
+                        "labelled_questions": len(gold) - len(unlabelled),
+                        "unlabelled_questions": unlabelled,
+                        **score_rankings(rankings, relevant, k, min_score, fallback_lt, chunk_overlap),
+                        "search_ms_p50": percentile_ms(search_seconds, 0.5),
+                        "search_ms_p95": percentile_ms(search_seconds, 0.95),
+                        "index_embed_seconds": round(index_seconds, 3),
+                    })
+    return rows
+
+
+def print_rows(rows: List[Dict[str, Any]], embed_ms: Dict[str, float]):
+    print(f"\nquery embedding: p50 {embed_ms['p50']} ms, p95 {embed_ms['p95']} ms")
+    print(f"recall/mrr: {LABEL_METHOD}; unlabelled questions excluded")
+    header = f"{'search':10} {'size':>5} {'ovl':>4} {'k':>3} {'min':>5} {'fb<':>3} {'chunks':>6} {'recall@k':>8} {'mrr':>6} {'rag':>5} {'ctx_tok':>7} {'search p50/p95 ms':>18}"
+    print(header)
+    for r in rows:
+        recall = f"{r['recall@k']:.3f}" if r["recall@k"] is not None else "-"
+        mrr = f"{r['mrr']:.3f}" if r["mrr"] is not None else "-"
+        print(
+            f"{r['search_type']:10} {r['chunk_size']:>5} {r['chunk_overlap']:>4} {r['k_top']:>3} {r['rag_min_score']:>5} "
+            f"{r['fallback_if_context_lt']:>3} {r['chunks']:>6} {recall:>8} {mrr:>6} {r['rag_rate']:>5.0%} "
+            f"{r['context_tokens_mean']:>7.0f} {r['search_ms_p50']:>8.2f}/{r['search_ms_p95']:<8.2f}"
+        )
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def float_list(value: str) -> List[float]:
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-sizes", type=int_list, default=[api.CHUNK_SIZE])
+    parser.add_argument("--chunk-overlaps", type=int_list, default=[api.CHUNK_OVERLAP])
+    parser.add_argument("--k-tops", type=int_list, default=sorted({1, api.K_TOP, 4, 8}))
+    parser.add_argument("--min-scores", type=float_list, default=[api.RAG_MIN_SCORE])
+    parser.add_argument("--fallback-if-context-lt", type=int_list, default=[api.FALLBACK_IF_CONTEXT_LT])
+    parser.add_argument("--search-types", type=lambda v: v.split(","), default=[api.SEARCH_TYPE])
+    parser.add_argument("--index-type", default="flat", choices=("flat", "hnsw"))
+    parser.add_argument("--faq", default=api.FAQ_PATH, help="hoperkb.txt-style Q/A file ('' to skip)")
+    parser.add_argument("--pairs", help="extra question/answer or question/pages pairs (JSONL)")
+    parser.add_argument("--gold-depth", type=int, default=GOLD_DEPTH)
+    parser.add_argument("--min-answer-similarity", type=float, default=MIN_ANSWER_SIMILARITY,
+                        help="cosine floor for silver labels; depends on the embedding model")
+    parser.add_argument("--out", help="results JSON path (default: cache/eval/<timestamp>.json)")
+    args = parser.parse_args()
+
+    gold = load_gold(args.faq, args.pairs)
+    if not gold:
+        raise SystemExit("❌ No gold questions: check --faq / --pairs")
+    load_encoding()  # context token counts; estimated if the tokenizer is unavailable
+    embeddings = api.get_embeddings()
+    engine = getattr(embeddings, "underlying", embeddings)
+
+    # Query vectors don't depend on chunking: embed once, uncached, and time it
+    engine.embed_query(gold[0].question)  # warm-up
+    query_vectors, embed_seconds = [], []
+    for query in gold:
+        start = time.perf_counter()
+        query_vectors.append(engine.embed_query(query.question))
+        embed_seconds.append(time.perf_counter() - start)
+    embed_ms = {"p50": percentile_ms(embed_seconds, 0.5), "p95": percentile_ms(embed_seconds, 0.95)}
+    answered = [q.answer for q in gold if q.answer and not q.pages]
+    answer_iter = iter(engine.embed_documents(answered) if answered else [])
+    answer_vectors = [next(answer_iter) if q.answer and not q.pages else None for q in gold]
+
+    print(f"⏳ Parsing PDFs ({len(gold)} gold questions)…")
+    data_dir = api.find_data_dir()
+    pages = [page for path in api.list_pdf_files(data_dir) for page in extract_pages(str(path))]
+
+    rows: List[Dict[str, Any]] = []
+    for chunk_size in args.chunk_sizes:
+        for chunk_overlap in args.chunk_overlaps:
+            if chunk_overlap >= chunk_size:
+                continue
+            rows.extend(evaluate_chunking(
+                gold, query_vectors, answer_vectors, pages, embeddings, chunk_size, chunk_overlap, args
+            ))
+    print_rows(rows, embed_ms)
+
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{timestamp}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "timestamp": timestamp,
+        "embed_model": api.EMBED_MODEL,
+        "embed_backend": api.EMBED_BACKEND,
+        "context_max_tokens": api.CONTEXT_MAX_TOKENS,
+        "gold_questions": len(gold),
+        "gold_depth": args.gold_depth,
+        "label_method": LABEL_METHOD,
+        "min_answer_coverage": MIN_ANSWER_COVERAGE,
+        "min_answer_similarity": args.min_answer_similarity,
+        "query_embed_ms": embed_ms,
+    }
+    out.write_text(json.dumps({"meta": meta, "rows": rows}, indent=2), encoding="utf-8")
+    print(f"✅ Results saved to {out}")
+
+
+if __name__ == "__main__":
+    main()
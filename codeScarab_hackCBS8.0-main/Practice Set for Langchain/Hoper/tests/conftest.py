@@ -0,0 +1,15 @@
+"""
+Shared test setup: the Hoper modules are flat siblings, imported by name.
+Run from Practice Set for Langchain/Hoper:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+from pathlib import Path
+
+HOPER_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(HOPER_DIR))
+
+# api.py reads this at import time: keep tests off Pinecone
+os.environ.setdefault("HOPER_VECTOR_BACKEND", "local")
@@ -0,0 +1,119 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from admission import AdmissionController, Overloaded
+from deadlines import DeadlineExceeded, deadline_scope
+
+
+def test_sheds_when_slots_and_queue_are_full():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+        await admission.acquire()
+        queued = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        assert admission.stats()["queued"] == 1
+
+        with pytest.raises(Overloaded) as shed:
+            admission.check()
+        assert shed.value.reason == "queue_full"
+        assert shed.value.retry_after >= 1
+        with pytest.raises(Overloaded):
+            await admission.acquire()
+
+        # Releasing hands the slot straight to the waiter
+        admission.release()
+        await queued
+        assert admission.stats()["in_flight"] == 1
+        assert admission.stats()["queued"] == 0
+        admission.release()
+        return admission.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == 2
+    assert stats["shed"] == {"queue_full": 2, "queue_timeout": 0}
+
+
+def test_queued_request_times_out():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        await admission.acquire()
+        with pytest.raises(Overloaded) as shed:
+            await admission.acquire()
+        assert shed.value.reason == "queue_timeout"
+        return admission.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["queued"] == 0
+    assert stats["in_flight"] == 1
+    assert stats["shed"]["queue_timeout"] == 1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+        await admission.acquire()
+        queued = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        admission.release()
+        return admission.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["queued"] == 0
+    assert stats["in_flight"] == 0
+
+
+def test_slot_is_released_when_the_body_fails():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1)
+        with pytest.raises(RuntimeError):
+            async with admission.slot():
+                raise RuntimeError("llm failed")
+        async with admission.slot():
+            pass
+        return admission.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == 2
+
+
+def test_wait_cut_short_by_the_request_deadline_is_a_deadline_error():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+        await admission.acquire()
+        with deadline_scope(0.05):
+            with pytest.raises(DeadlineExceeded):
+                await admission.acquire()
+        return admission.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["queued"] == 0
+    assert stats["shed"]["queue_timeout"] == 0
+
+
+def test_chat_queued_past_the_deadline_gets_504(monkeypatch):
+    admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+    admission._in_flight = 1
+    monkeypatch.setattr(api, "_llm_admission", admission)
+    monkeypatch.setattr(api, "REQUEST_DEADLINE", 0.2)
+    monkeypatch.setattr(api, "_pipeline", SimpleNamespace(faq=None, embeddings=None))
+
+    async def no_cache(embeddings, prompt, k_top):
+        return None, None
+
+    async def no_context(pipeline, question, query_vector, k_top):
+        return []
+
+    monkeypatch.setattr(api, "lookup_cached_response", no_cache)
+    monkeypatch.setattr(api, "retrieve_guarded", no_context)
+    response = TestClient(api.app).post("/chat", json={"prompt": "Something that needs the LLM"})
+    assert response.status_code == 504
+    assert admission.stats()["shed"]["queue_timeout"] == 0
@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from admission import AdmissionController
+from deadlines import DeadlineExceeded, deadline_scope
+from faq import FAQEntry, FAQIndex
+
+FAQ_QUESTION = "How can I improve my sleep?"
+FAQ_ANSWER = "Keep a regular bedtime and put screens away before bed."
+
+
+@pytest.fixture
+def saturated(monkeypatch):
+    """A pipeline that only knows one FAQ entry, and an LLM with its only slot taken and no queue."""
+    admission = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1)
+    admission._in_flight = 1
+    monkeypatch.setattr(api, "_llm_admission", admission)
+    pipeline = SimpleNamespace(
+        faq=FAQIndex([FAQEntry(FAQ_QUESTION, FAQ_ANSWER)]),
+        embeddings=SimpleNamespace(embed_query=lambda text: [1.0, 0.0]),
+    )
+    monkeypatch.setattr(api, "_pipeline", pipeline)
+    return admission
+
+
+def test_faq_hit_streams_while_llm_is_saturated(saturated):
+    client = TestClient(api.app)  # no `with`: skips the startup bootstrap
+    with client.stream("POST", "/chat/stream", json={"prompt": FAQ_QUESTION}) as response:
+        body = "".join(response.iter_text())
+    assert response.status_code == 200
+    assert api.sse_event("token", {"text": FAQ_ANSWER}) in body
+    assert api.sse_event("done", {"used_rag": False, "faq": True}) in body
+    assert saturated.stats()["shed"]["queue_full"] == 0
+
+
+def test_llm_request_is_shed_while_llm_is_saturated(saturated):
+    client = TestClient(api.app)
+    response = client.post("/chat/stream", json={"prompt": "Something not in the FAQ at all"})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert saturated.stats()["shed"]["queue_full"] == 1
+
+
+class DripLLM:
+    """Streams `texts`, sleeping `gaps[i]` before chunk i."""
+
+    def __init__(self, texts, gaps):
+        self.texts, self.gaps = texts, gaps
+
+    async def astream(self, messages):
+        for text, gap in zip(self.texts, self.gaps):
+            await asyncio.sleep(gap)
+            yield SimpleNamespace(content=text, usage_metadata=None)
+
+
+def collect(llm, monkeypatch, deadline, idle):
+    monkeypatch.setattr(api, "STREAM_IDLE_TIMEOUT", idle)
+
+    async def scenario():
+        with deadline_scope(deadline):
+            return [text async for text in api.astream_llm_text(llm, [])]
+
+    return asyncio.run(scenario())
+
+
+def test_long_stream_outlives_the_request_deadline(monkeypatch):
+    # 0.25s in total against a 0.1s deadline: fine, the first token came in time
+    llm = DripLLM(["a", "b", "c", "d", "e"], [0.01, 0.06, 0.06, 0.06, 0.06])
+    assert collect(llm, monkeypatch, deadline=0.1, idle=0.5) == ["a", "b", "c", "d", "e"]
+
+
+def test_deadline_still_bounds_the_first_token(monkeypatch):
+    with pytest.raises(DeadlineExceeded):
+        collect(DripLLM(["a"], [0.5]), monkeypatch, deadline=0.05, idle=5)
+
+
+def test_stalled_stream_times_out(monkeypatch):
+    with pytest.raises(asyncio.TimeoutError, match="stalled") as stalled:
+        collect(DripLLM(["a", "b"], [0.01, 0.5]), monkeypatch, deadline=5, idle=0.05)
+    assert not isinstance(stalled.value, DeadlineExceeded)
@@ -0,0 +1,187 @@
+import asyncio
+from contextlib import ExitStack
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+import api
+import circuit_breaker
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from deadlines import DeadlineExceeded
+from ttl_cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual clock for the breaker: advance with clock.now += seconds."""
+    fake = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=lambda: fake.now))
+    return fake
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    settings = dict(window=30, min_calls=2, error_rate=0.5, slow_call=2, slow_rate=0.5, open_seconds=10, probes=2)
+    settings.update(overrides)
+    return CircuitBreaker("store", **settings)
+
+
+def fail(breaker: CircuitBreaker):
+    with pytest.raises(ValueError):
+        with breaker.guard():
+            raise ValueError("store down")
+
+
+def succeed(breaker: CircuitBreaker):
+    with breaker.guard():
+        pass
+
+
+def test_opens_on_error_rate_and_short_circuits(clock):
+    breaker = make_breaker()
+    fail(breaker)
+    assert breaker.stats()["state"] == "closed"  # below min_calls
+    fail(breaker)
+    assert breaker.stats()["state"] == "open"
+
+    with pytest.raises(CircuitOpen) as refused:
+        with breaker.guard():
+            pytest.fail("the dependency must not be called while open")
+    assert refused.value.next_probe_in == pytest.approx(10)
+    stats = breaker.stats()
+    assert stats["trips"] == 1
+    assert stats["short_circuited"] == 1
+
+
+def test_half_open_probes_close_the_breaker(clock):
+    breaker = make_breaker()
+    fail(breaker)
+    fail(breaker)
+    clock.now += 10
+
+    with ExitStack() as probes:
+        probes.enter_context(breaker.guard())
+        assert breaker.stats()["state"] == "half_open"
+        probes.enter_context(breaker.guard())
+        with pytest.raises(CircuitOpen):  # only `probes` trial calls at a time
+            with breaker.guard():
+                pass
+    assert breaker.stats()["state"] == "closed"
+    assert breaker.stats()["calls_in_window"] == 0
+    succeed(breaker)
+
+
+def test_failed_probe_reopens(clock):
+    breaker = make_breaker()
+    fail(breaker)
+    fail(breaker)
+    clock.now += 10
+    fail(breaker)
+    stats = breaker.stats()
+    assert stats["state"] == "open"
+    assert stats["trips"] == 2
+    assert stats["next_probe_in"] == pytest.approx(10)
+
+
+def test_slow_calls_trip_the_breaker(clock):
+    breaker = make_breaker()
+    for _ in range(2):
+        with breaker.guard():
+            clock.now += 3
+    assert breaker.stats()["state"] == "open"
+
+
+def test_old_failures_leave_the_window(clock):
+    breaker = make_breaker(min_calls=3)
+    fail(breaker)
+    fail(breaker)
+    clock.now += 31
+    succeed(breaker)
+    stats = breaker.stats()
+    assert stats["state"] == "closed"
+    assert stats["calls_in_window"] == 1
+
+
+def test_neutral_exceptions_give_no_verdict(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        with pytest.raises(DeadlineExceeded):
+            with breaker.guard(neutral=(DeadlineExceeded,)):
+                raise DeadlineExceeded("request deadline exceeded")
+    stats = breaker.stats()
+    assert stats["state"] == "closed"
+    assert stats["calls_in_window"] == 0
+
+
+def test_disabled_breaker_lets_everything_through(clock):
+    breaker = make_breaker(enabled=False)
+    for _ in range(5):
+        fail(breaker)
+    succeed(breaker)
+    assert breaker.stats()["trips"] == 0
+
+
+# -----------------------------
+# Retrieval path
+# -----------------------------
+class CountingStore:
+    """Vector store stub: counts queries, optionally failing them."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.queries = 0
+        self.embeddings = None
+
+    def similarity_search_by_vector_with_score(self, query_vector, k):
+        self.queries += 1
+        if self.fail:
+            raise ConnectionError("store down")
+        return [(Document(page_content=f"doc {i}", metadata={}), 0.9 - i / 100) for i in range(k)]
+
+
+class SlowReranker:
+    def __init__(self, clock):
+        self.clock = clock
+
+    def rerank(self, query, candidates, top_n):
+        self.clock.now += 5  # far past slow_call, on the breaker's clock
+        return candidates[:top_n]
+
+
+@pytest.fixture
+def retrieval(clock, monkeypatch):
+    breaker = make_breaker(min_calls=2, open_seconds=10)
+    monkeypatch.setattr(api, "_retrieval_breaker", breaker)
+    monkeypatch.setattr(api, "_retrieval_cache", TTLCache(max_entries=16, ttl_seconds=60))
+    return breaker
+
+
+def pipeline_for(store, reranker=None):
+    return SimpleNamespace(retriever=SimpleNamespace(vectorstore=store, search_kwargs={}), reranker=reranker)
+
+
+def test_slow_reranker_does_not_open_the_breaker(retrieval, clock):
+    pipeline = pipeline_for(CountingStore(), SlowReranker(clock))
+    for i in range(4):
+        scored = asyncio.run(api.retrieve_guarded(pipeline, f"question {i}", [float(i), 1.0], 3))
+        assert len(scored) == 3
+    stats = retrieval.stats()
+    assert stats["state"] == "closed"
+    assert stats["slow_rate"] == 0.0
+
+
+def test_cache_hits_bypass_an_open_breaker(retrieval):
+    store = CountingStore()
+    pipeline = pipeline_for(store)
+    asyncio.run(api.retrieve_guarded(pipeline, "cached question", [1.0, 0.0], 3))
+
+    store.fail = True
+    with pytest.raises(ConnectionError):
+        asyncio.run(api.retrieve_guarded(pipeline, "new question", [0.0, 1.0], 3))
+    assert retrieval.stats()["state"] == "open"  # 1 of 2 queries failed
+
+    queries = store.queries
+    with pytest.raises(CircuitOpen):
+        asyncio.run(api.retrieve_guarded(pipeline, "another question", [1.0, 1.0], 3))
+    assert store.queries == queries  # refused without touching the store
+    assert len(asyncio.run(api.retrieve_guarded(pipeline, "cached question", [1.0, 0.0], 3))) == 3
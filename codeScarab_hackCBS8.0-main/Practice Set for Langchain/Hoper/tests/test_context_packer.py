@@ -0,0 +1,55 @@
+import pytest
+from langchain_core.documents import Document
+
+import context_packer
+from context_packer import MIN_TRIMMED_TOKENS, count_tokens, join_passages, pack_context
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    """Pin token counts to the 4 chars/token estimate, whether or not tiktoken loaded."""
+    monkeypatch.setattr(context_packer, "_encoding", None)
+
+
+def page(text: str, number: int) -> Document:
+    return Document(page_content=text, metadata={"source": "guide.pdf", "page": number})
+
+
+def words(count: int, tag: str) -> str:
+    return " ".join(f"{tag}{i:03d}" for i in range(count))  # 7 chars/word incl. space -> ~1.75 tokens
+
+
+def test_last_passage_is_trimmed_to_the_budget():
+    docs = [page(words(100, "a"), 1), page(words(100, "b"), 2)]
+    first = count_tokens(docs[0].page_content)
+    budget = first + 60
+    packed, used = pack_context(docs, max_tokens=budget)
+    assert len(packed) == 2
+    assert packed[0].page_content == docs[0].page_content
+    assert docs[1].page_content.startswith(packed[1].page_content)
+    assert len(packed[1].page_content) < len(docs[1].page_content)
+    assert used <= budget
+    assert count_tokens(join_passages(packed)) <= budget
+
+
+def test_short_remainder_is_dropped():
+    docs = [page(words(100, "a"), 1), page(words(100, "b"), 2)]
+    budget = count_tokens(docs[0].page_content) + MIN_TRIMMED_TOKENS // 2
+    packed, used = pack_context(docs, max_tokens=budget)
+    assert [doc.page_content for doc in packed] == [docs[0].page_content]
+    assert used == count_tokens(docs[0].page_content)
+
+
+def test_no_budget_keeps_everything_in_order():
+    docs = [page(words(50, "a"), 2), page(words(50, "b"), 1)]
+    packed, _ = pack_context(docs, max_tokens=0)
+    assert [doc.page_content for doc in packed] == [doc.page_content for doc in docs]
+
+
+def test_overlapping_chunks_of_a_page_are_merged():
+    text = words(60, "w")
+    docs = [page(text[:300], 1), page(text[250:], 1), page(text[:100], 1)]
+    packed, used = pack_context(docs, max_tokens=0)
+    assert len(packed) == 1
+    assert packed[0].page_content == text
+    assert used == count_tokens(text)
@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+
+import deadlines
+from deadlines import DeadlineExceeded, HedgedCaller, RetryBudget, bounded, deadline_scope, remaining, with_deadline
+
+
+class Transient(Exception):
+    pass
+
+
+# -----------------------------
+# Deadlines
+# -----------------------------
+def test_nested_scope_can_only_shorten_the_deadline():
+    assert remaining() is None
+    assert bounded(5) == 5
+    with deadline_scope(1.0):
+        with deadline_scope(10.0):
+            assert remaining() <= 1.0
+        with deadline_scope(0.5):
+            assert remaining() <= 0.5
+            assert bounded(5) <= 0.5
+            assert bounded(None) <= 0.5
+        assert 0.5 < remaining() <= 1.0
+    assert remaining() is None
+
+
+def test_with_deadline_tells_the_deadline_from_the_stage_timeout():
+    async def scenario():
+        with deadline_scope(0.05):
+            with pytest.raises(DeadlineExceeded):
+                await with_deadline(asyncio.sleep(1), timeout=5)
+        with deadline_scope(5):
+            with pytest.raises(asyncio.TimeoutError) as timed_out:
+                await with_deadline(asyncio.sleep(1), timeout=0.05)
+            assert not isinstance(timed_out.value, DeadlineExceeded)
+
+    asyncio.run(scenario())
+
+
+def test_awaited_work_sees_the_tighter_limit():
+    async def left():
+        return remaining()
+
+    async def scenario():
+        with deadline_scope(5):
+            return await with_deadline(left(), timeout=0.5)
+
+    assert asyncio.run(scenario()) <= 0.5
+
+
+# -----------------------------
+# Retry budget
+# -----------------------------
+def test_retry_budget_spends_deposits_then_the_reserve():
+    budget = RetryBudget(ratio=0.5, min_per_second=0)
+    budget.deposit()
+    budget.deposit()
+    assert budget.try_withdraw()      # earned by two calls
+    assert budget.try_withdraw()      # the reserve
+    assert not budget.try_withdraw()
+    stats = budget.stats()
+    assert stats["withdrawn"] == 2
+    assert stats["exhausted"] == 1
+
+
+def test_retry_budget_balance_is_capped():
+    budget = RetryBudget(ratio=1.0, min_per_second=0, max_balance=3)
+    for _ in range(100):
+        budget.deposit()
+    assert budget.stats()["available"] == 4  # 3 earned + 1 reserve
+
+
+# -----------------------------
+# Hedged + retried calls
+# -----------------------------
+def make_caller(budget: RetryBudget, **overrides) -> HedgedCaller:
+    settings = dict(hedge=True, min_delay=0.05, max_delay=0.05, max_attempts=3, retry_on=(Transient,))
+    settings.update(overrides)
+    return HedgedCaller(budget, **settings)
+
+
+def test_slow_attempt_is_hedged_and_the_loser_cancelled():
+    caller = make_caller(RetryBudget(ratio=1.0, min_per_second=0))
+    attempts = []
+
+    async def call():
+        attempts.append(len(attempts))
+        await asyncio.sleep(5 if len(attempts) == 1 else 0.01)
+        return len(attempts)
+
+    assert asyncio.run(caller.call(call)) == 2
+    stats = caller.stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+    assert stats["cancelled"] == 1
+    assert stats["budget"]["withdrawn"] == 1
+
+
+def test_no_hedge_once_the_budget_is_spent():
+    budget = RetryBudget(ratio=0, min_per_second=0)
+    assert budget.try_withdraw()  # use up the reserve
+    caller = make_caller(budget)
+
+    async def call():
+        await asyncio.sleep(0.1)
+        return "slow"
+
+    assert asyncio.run(caller.call(call)) == "slow"
+    assert caller.stats()["hedges"] == 0
+    assert budget.stats()["exhausted"] == 1
+
+
+def test_transient_errors_are_retried_within_the_budget(monkeypatch):
+    monkeypatch.setattr(deadlines, "RETRY_BACKOFF", 0.01)
+    caller = make_caller(RetryBudget(ratio=1.0, min_per_second=0), hedge=False)
+    attempts = []
+
+    async def call():
+        attempts.append(None)
+        if len(attempts) < 3:
+            raise Transient()
+        return "ok"
+
+    assert asyncio.run(caller.call(call)) == "ok"
+    assert caller.stats()["retries"] == 2
+
+    attempts.clear()
+    with pytest.raises(Transient):  # max_attempts reached
+        asyncio.run(make_caller(RetryBudget(ratio=1.0, min_per_second=0), max_attempts=2).call(call))
+    assert len(attempts) == 2
+
+
+def test_other_errors_fail_at_once():
+    caller = make_caller(RetryBudget(ratio=1.0, min_per_second=0))
+    attempts = []
+
+    async def call():
+        attempts.append(None)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(caller.call(call))
+    assert len(attempts) == 1
+    assert caller.stats()["retries"] == 0
+
+
+def test_request_deadline_stops_the_call():
+    caller = make_caller(RetryBudget(ratio=1.0, min_per_second=0), hedge=False)
+
+    async def scenario():
+        with deadline_scope(0.05):
+            await caller.call(lambda: asyncio.sleep(5))
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scenario())
+    stats = caller.stats()
+    assert stats["deadline_exceeded"] == 1
+    assert stats["cancelled"] == 1
+
+
+def test_winning_hedge_latency_counts_from_the_call_start():
+    caller = make_caller(RetryBudget(ratio=1.0, min_per_second=0), min_delay=0.1, max_delay=0.1)
+    attempts = []
+
+    async def call():
+        attempts.append(None)
+        await asyncio.sleep(5 if len(attempts) == 1 else 0.05)
+        return "hedge"
+
+    assert asyncio.run(caller.call(call)) == "hedge"
+    assert caller.stats()["hedge_wins"] == 1
+    # hedge delay + the hedge's own run time, not just the latter
+    assert list(caller._latencies)[0] >= 0.15
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import HOPER_DIR
+from faq import FAQEntry, FAQIndex, parse_faq
+from query_terms import same_question
+
+DEPRESSED = "I’m feeling very depressed.What should I do now?"
+SLEEP = "How I Can Improve my Sleep?"
+
+
+@pytest.fixture
+def faq() -> FAQIndex:
+    return FAQIndex([FAQEntry(DEPRESSED, "depression answer"), FAQEntry(SLEEP, "sleep answer")])
+
+
+def test_parse_faq():
+    text = "Intro\nQues 1: First?\nAnswer one.\n\n\n\nMore.\nQues 2 : Second?\nAnswer two.\n"
+    assert parse_faq(text) == [FAQEntry("First?", "Answer one.\n\nMore."), FAQEntry("Second?", "Answer two.")]
+
+
+def test_exact_and_near_exact_matches(faq):
+    assert faq.match_text("im feeling very depressed - what should i do now").kind == "exact"
+    match = faq.match_text("I'm feeling very depresed. What should I do now?")
+    assert (match.kind, match.entry.answer) == ("lexical", "depression answer")
+    assert faq.match_text("How can I improve my sleep").entry.answer == "sleep answer"
+
+
+@pytest.mark.parametrize("prompt", [
+    "I am not feeling very depressed. What should I do now?",  # ratio 0.94 against the FAQ question
+    "I'm never feeling very depressed. What should I do now?",
+    "How I Can't Improve my Sleep?",
+])
+def test_negated_question_is_not_matched(faq, prompt):
+    assert faq.match_text(prompt) is None
+
+
+@pytest.mark.parametrize("prompt", [
+    "I'm feeling very anxious. What should I do now?",
+    "I'm feeling very depressed. What should my friend do now?",
+    "How I Can Improve my Diet?",
+])
+def test_changed_content_word_is_not_matched(faq, prompt):
+    assert faq.match_text(prompt) is None
+
+
+def test_embedding_match_keeps_polarity():
+    embeddings = SimpleNamespace(embed_documents=lambda texts: [[1.0, 0.0], [0.0, 1.0]])
+    faq = FAQIndex([FAQEntry(DEPRESSED, "depression answer"), FAQEntry(SLEEP, "sleep answer")], embeddings=embeddings)
+    # Embeddings put negated paraphrases right next to the original
+    assert faq.match_vector([1.0, 0.05], "Feeling really down, what can I do?").entry.answer == "depression answer"
+    assert faq.match_vector([1.0, 0.05], "I'm not feeling down at all, what can I do?") is None
+    assert faq.match_vector([1.0, 0.05]).entry.answer == "depression answer"  # no prompt: vector only
+    assert faq.stats()["misses"] == 1
+
+
+def test_every_curated_question_still_matches_itself():
+    faq = FAQIndex.from_file(str(HOPER_DIR.parent / "hoperkb.txt"))
+    assert len(faq) > 0
+    for entry in faq.entries:
+        assert faq.match_text(entry.question).entry == entry
+
+
+def test_same_question_guard():
+    assert same_question("I want to hurt myself", "i want to hurt myself!")
+    assert not same_question("I want to hurt myself", "I don't want to hurt myself")
+    assert not same_question("I want to hurt myself", "I want to help myself and others")
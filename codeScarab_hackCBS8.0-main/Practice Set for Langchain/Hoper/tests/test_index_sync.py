@@ -0,0 +1,119 @@
+import os
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+
+import api
+from bench_fakes import HashingEmbeddings
+
+
+def fake_chunk_batches(paths, batch_size=32):
+    """The "PDFs" are text files: one chunk per line, the line number as its page."""
+    batch = []
+    for path in paths:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+        for page, line in enumerate(lines):
+            batch.append(Document(page_content=line, metadata={"source": str(path), "page": page}))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(api, "LOCAL_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(api, "iter_pdf_chunk_batches", fake_chunk_batches)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    return data_dir
+
+
+def write(data_dir: Path, name: str, *lines: str):
+    path = data_dir / name
+    path.write_text("\n".join(lines), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))  # a visible edit even within one mtime tick
+
+
+def sync(data_dir: Path):
+    return api.sync_index_from_pdfs("test", str(data_dir), HashingEmbeddings(api.EMBED_DIM), batch_size=2)
+
+
+def assert_store_matches_manifest(store):
+    manifest = api.read_manifest("test")
+    assert "pending" not in manifest
+    live = {chunk_id for entry in manifest["files"].values() for chunk_id in entry["chunk_ids"]}
+    assert set(store._ids) == live
+    assert len(store) == len(live)
+
+
+def test_first_sync_is_a_full_build(corpus):
+    write(corpus, "a.pdf", "alpha one", "alpha two")
+    store, summary = sync(corpus)
+    assert summary == {"mode": "full", "files": 1}
+    assert sorted(store._texts) == ["alpha one", "alpha two"]
+    assert_store_matches_manifest(store)
+
+
+def test_add_modify_remove_and_unchanged(corpus):
+    write(corpus, "a.pdf", "alpha one", "alpha two")
+    write(corpus, "b.pdf", "beta one", "beta two")
+    write(corpus, "c.pdf", "gamma one", "gamma two")
+    sync(corpus)
+
+    write(corpus, "b.pdf", "beta one", "beta three")
+    (corpus / "c.pdf").unlink()
+    write(corpus, "d.pdf", "delta one", "delta two")
+    store, summary = sync(corpus)
+
+    assert summary["mode"] == "incremental"
+    assert (summary["files_unchanged"], summary["files_changed"], summary["files_added"], summary["files_removed"]) == (1, 1, 1, 1)
+    assert summary["chunks_upserted"] == 3  # beta three + both delta chunks; beta one kept its id
+    assert summary["chunks_deleted"] == 3   # beta two + both gamma chunks
+    assert sorted(store._texts) == ["alpha one", "alpha two", "beta one", "beta three", "delta one", "delta two"]
+    assert_store_matches_manifest(store)
+
+    reloaded = api.load_existing_index("test", HashingEmbeddings(api.EMBED_DIM))
+    assert sorted(reloaded._texts) == sorted(store._texts)
+
+
+def test_touched_but_unmodified_file_is_skipped(corpus):
+    write(corpus, "a.pdf", "alpha one", "alpha two")
+    sync(corpus)
+    stat = (corpus / "a.pdf").stat()
+    os.utime(corpus / "a.pdf", (stat.st_atime, stat.st_mtime + 60))
+    store, summary = sync(corpus)
+    assert summary["files_unchanged"] == 1
+    assert summary["chunks_upserted"] == summary["chunks_deleted"] == 0
+    assert_store_matches_manifest(store)
+
+
+def test_interrupted_sync_is_finished_by_the_next_one(corpus, monkeypatch):
+    write(corpus, "a.pdf", "alpha one", "alpha two")
+    write(corpus, "b.pdf", "beta one", "beta two")
+    sync(corpus)
+
+    # Crash after the upserts, before the stale ids are deleted
+    write(corpus, "b.pdf", "beta one", "beta second draft")
+    with monkeypatch.context() as crash:
+        def fail(vectorstore, ids):
+            vectorstore.save()  # upserts are durable, as on Pinecone
+            raise RuntimeError("store went away")
+
+        crash.setattr(api, "delete_ids", fail)
+        with pytest.raises(RuntimeError):
+            sync(corpus)
+    pending = api.read_manifest("test")["pending"]
+    assert pending["stale"] and pending["upserted"]
+
+    # Edited again before the next run: the second draft's chunks are referenced by nothing
+    write(corpus, "b.pdf", "beta one", "beta final")
+    store, summary = sync(corpus)
+    assert summary["resumed"]
+    assert "beta second draft" not in store._texts
+    assert sorted(store._texts) == ["alpha one", "alpha two", "beta final", "beta one"]
+    assert_store_matches_manifest(store)
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+import local_store
+from local_store import DOCS_FILE, LocalVectorStore
+
+
+class AxisEmbeddings(Embeddings):
+    """Texts are named after a basis vector: "x", "y" or "z"."""
+
+    AXES = {"x": [1.0, 0.0, 0.0], "y": [0.0, 1.0, 0.0], "z": [0.0, 0.0, 1.0]}
+
+    def embed_documents(self, texts):
+        return [self.AXES[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.AXES[text]
+
+
+def test_top_k_and_upsert():
+    store = LocalVectorStore(AxisEmbeddings(), dim=3)
+    store.add_texts(["x", "y", "z"], ids=["1", "2", "3"])
+    hits = store.similarity_search_with_score_by_vector([1.0, 0.2, 0.0], k=2)
+    assert [doc.id for doc, _ in hits] == ["1", "2"]
+    assert hits[0][1] == pytest.approx(1 / np.sqrt(1.04))
+
+    store.add_vectors([[0.0, 1.0, 0.0]], ["y"], ids=["1"])  # same id: replaced in place, not duplicated
+    assert len(store) == 3
+    hits = store.similarity_search_with_score_by_vector([0.0, 1.0, 0.0], k=3)
+    assert sorted(doc.id for doc, score in hits if score == pytest.approx(1.0)) == ["1", "2"]
+    assert store.similarity_search_with_score("x", k=1)[0][1] == pytest.approx(0.0)
+
+
+def test_many_batches_grow_the_buffer_and_keep_rows_aligned():
+    store = LocalVectorStore(AxisEmbeddings(), dim=3)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(3000, 3))
+    for start in range(0, 3000, 32):
+        stop = min(start + 32, 3000)
+        store.add_vectors(vectors[start:stop].tolist(), [f"t{i}" for i in range(start, stop)],
+                          ids=[f"id{i}" for i in range(start, stop)])
+    assert len(store) == 3000
+    assert len(store._buffer) >= 3000
+
+    store.delete(ids=[f"id{i}" for i in range(0, 3000, 2)])
+    assert len(store) == 1500
+    for i in (1, 777, 2999):
+        doc, score = store.similarity_search_with_score_by_vector(vectors[i].tolist(), k=1)[0]
+        assert (doc.id, doc.page_content) == (f"id{i}", f"t{i}")
+        assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = LocalVectorStore(AxisEmbeddings(), dim=3, persist_dir=str(tmp_path))
+    store.add_texts(["x", "y"], metadatas=[{"page": 1}, {"page": 2}], ids=["a", "b"])
+    store.save()
+    store.add_texts(["z"], ids=["c"])
+    store.save()
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("vectors-")]) == 1
+
+    loaded = LocalVectorStore.load(str(tmp_path), AxisEmbeddings(), dim=3)
+    assert len(loaded) == 3
+    assert loaded.similarity_search("y", k=1)[0].metadata == {"page": 2}
+    with pytest.raises(RuntimeError):
+        LocalVectorStore.load(str(tmp_path), AxisEmbeddings(), dim=4)
+
+
+def test_crashed_save_keeps_the_previous_generation(tmp_path, monkeypatch):
+    store = LocalVectorStore(AxisEmbeddings(), dim=3, persist_dir=str(tmp_path))
+    store.add_texts(["x"], ids=["a"])
+    store.save()
+    store.add_texts(["y", "z"], ids=["b", "c"])
+
+    def crash(src, dst):
+        raise OSError("disk gone")
+
+    monkeypatch.setattr(local_store.os, "replace", crash)  # dies before docs.json switches over
+    with pytest.raises(OSError):
+        store.save()
+    monkeypatch.undo()
+
+    loaded = LocalVectorStore.load(str(tmp_path), AxisEmbeddings(), dim=3)
+    assert [doc.id for doc in loaded.similarity_search("x", k=5)] == ["a"]
+
+
+def test_vectors_that_do_not_match_the_ids_are_rejected(tmp_path):
+    store = LocalVectorStore(AxisEmbeddings(), dim=3, persist_dir=str(tmp_path))
+    store.add_texts(["x", "y"], ids=["a", "b"])
+    store.save()
+    vectors_file = next(name for name in os.listdir(tmp_path) if name.startswith("vectors-"))
+    np.save(tmp_path / vectors_file, np.zeros((1, 3), dtype=np.float32))
+    assert (tmp_path / DOCS_FILE).exists()
+    with pytest.raises(RuntimeError):
+        LocalVectorStore.load(str(tmp_path), AxisEmbeddings(), dim=3)
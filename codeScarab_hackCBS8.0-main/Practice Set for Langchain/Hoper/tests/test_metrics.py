@@ -0,0 +1,34 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import metrics
+
+
+def test_timings_is_read_from_the_stage_histogram():
+    before = metrics.stage_summary().get("test_stage", {}).get("count", 0)
+    for seconds in [0.003] * 10 + [0.2] * 10:
+        metrics.observe("test_stage", seconds)
+    stage = TestClient(api.app).get("/timings").json()["stages"]["test_stage"]
+    assert stage["count"] == before + 20
+    assert stage["mean_ms"] == pytest.approx(101.5)
+    assert 2.5 <= stage["p50_ms"] <= 5.0      # inside the (2.5ms, 5ms] bucket
+    assert 100.0 <= stage["p95_ms"] <= 250.0  # inside the (100ms, 250ms] bucket
+
+
+def test_speculative_fallback_wait_is_a_span():
+    async def plain_answer():
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(content="plain", usage_metadata=None)
+
+    async def take():
+        with metrics.request_trace("test") as trace:
+            answer = await api.take_speculative_fallback(asyncio.create_task(plain_answer()), "q", llm=None)
+        return answer, trace
+
+    answer, trace = asyncio.run(take())
+    assert answer == "plain"
+    assert trace.spans["llm_fallback"] >= 0.005
@@ -0,0 +1,63 @@
+import pytest
+
+import api
+from bench_fakes import HashingEmbeddings
+
+
+class NamespaceRecorder:
+    """Stands in for a PineconeVectorStore bound to one namespace."""
+
+    fail_deletes = False
+
+    def __init__(self, namespace, deleted):
+        self.namespace = namespace
+        self.deleted = deleted
+
+    def delete(self, delete_all=False, **kwargs):
+        if self.fail_deletes:
+            raise ConnectionError("pinecone unreachable")
+        if delete_all:
+            self.deleted.append(self.namespace)
+
+
+@pytest.fixture
+def pinecone_build(tmp_path, monkeypatch):
+    """A full Pinecone rebuild whose ingest fails half way."""
+    deleted = []
+    monkeypatch.setattr(api, "VECTOR_BACKEND", "pinecone")
+    monkeypatch.setattr(api, "manifest_path", lambda index_name: str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(api, "ensure_vector_backend", lambda: None)
+    monkeypatch.setattr(api, "find_data_dir", lambda: str(tmp_path))
+    monkeypatch.setattr(api, "_pipeline", None)
+    monkeypatch.setattr(api, "get_embeddings", lambda: HashingEmbeddings(api.EMBED_DIM))
+    monkeypatch.setattr(
+        api, "load_existing_index",
+        lambda index_name, embeddings, namespace=None: NamespaceRecorder(namespace, deleted),
+    )
+
+    def broken_ingest(*args, **kwargs):
+        raise RuntimeError("upsert failed")
+
+    monkeypatch.setattr(api, "run_ingest_pipeline", broken_ingest)
+    return deleted
+
+
+def test_failed_full_build_deletes_its_namespace(pinecone_build):
+    job = api.ReindexJob(full=True)
+    api.run_reindex_job(job)
+    status = job.snapshot()
+    assert status.status == "failed"
+    assert status.errors == ["upsert failed"]
+    assert len(pinecone_build) == 1 and pinecone_build[0].startswith("build-")
+    assert status.cleanup == f"deleted build namespace {pinecone_build[0]}"
+    assert api.active_namespace(api.INDEX_NAME) is None  # never switched over
+
+
+def test_failed_cleanup_is_reported(pinecone_build, monkeypatch):
+    monkeypatch.setattr(NamespaceRecorder, "fail_deletes", True)
+    job = api.ReindexJob(full=True)
+    api.run_reindex_job(job)
+    status = job.snapshot()
+    assert status.status == "failed"
+    assert status.errors == ["upsert failed"]  # the build error, not the cleanup one
+    assert status.cleanup.startswith("failed to delete build namespace build-")
@@ -0,0 +1,33 @@
+from response_cache import SemanticResponseCache
+
+HURT = [1.0, 0.0, 0.0]
+NOT_HURT = [0.99, 0.14, 0.0]  # cosine 0.99: embeddings barely register the negation
+
+
+def test_negated_prompt_does_not_reuse_the_answer():
+    cache = SemanticResponseCache(threshold=0.95)
+    cache.put(HURT, 4, "crisis answer", text="I want to hurt myself")
+    assert cache.get(NOT_HURT, 4, text="I don't want to hurt myself") is None
+    assert cache.get(NOT_HURT, 4, text="i want to hurt myself!") == "crisis answer"
+    assert cache.get(NOT_HURT, 4) == "crisis answer"  # no text: similarity alone
+
+
+def test_best_candidate_that_passes_the_guard_wins():
+    cache = SemanticResponseCache(threshold=0.95)
+    cache.put(HURT, 4, "crisis answer", text="I want to hurt myself")
+    cache.put(NOT_HURT, 4, "reassurance", text="I don't want to hurt myself")
+    assert cache.get(HURT, 4, text="I do not want to hurt myself") == "reassurance"
+    assert cache.get(NOT_HURT, 4, text="I want to hurt myself") == "crisis answer"
+    assert cache.get(HURT, 4, text="I want to hurt my friend") is None
+    assert cache.get(HURT, 8, text="I want to hurt myself") is None  # other k_top partition
+    assert cache.stats()["hits"] == 2
+
+
+def test_generation_and_eviction():
+    cache = SemanticResponseCache(threshold=0.95, max_entries=1)
+    cache.put(HURT, 4, "old", generation=1)
+    assert cache.stats()["stale_puts"] == 1
+    cache.put(HURT, 4, "a", text="first")
+    cache.put([0.0, 1.0, 0.0], 4, "b", text="second")
+    assert cache.get(HURT, 4, text="first") is None
+    assert cache.stats()["evictions"] == 1
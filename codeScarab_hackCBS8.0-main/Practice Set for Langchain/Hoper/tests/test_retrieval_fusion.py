@@ -0,0 +1,38 @@
+import pytest
+
+from lexical_index import BM25Index, reciprocal_rank_fusion
+
+
+def test_rrf_rewards_ids_both_rankings_agree_on():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "d"]], rrf_k=60)
+    assert [key for key, _ in fused] == ["b", "c", "a", "d"]
+    scores = dict(fused)
+    assert scores["b"] == pytest.approx(1 / 62 + 1 / 61)
+    assert scores["d"] == pytest.approx(1 / 63)
+
+
+def test_rrf_of_one_ranking_keeps_its_order():
+    assert [key for key, _ in reciprocal_rank_fusion([["x", "y", "z"]])] == ["x", "y", "z"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_bm25_upsert_delete_and_reload(tmp_path):
+    index = BM25Index()
+    index.add(["a", "b", "c"], ["panic attack breathing", "sleep hygiene tips", "breathing for sleep"],
+              [{"page": 1}, {"page": 2}, {"page": 3}])
+    hits = index.search("panic breathing", k=2)
+    assert [hit.doc.id for hit in hits] == ["a", "c"]
+    assert hits[0].coverage == pytest.approx(1.0)
+    assert 0 < hits[1].coverage < 1
+
+    index.add(["a"], ["journaling prompts"], [{"page": 9}])  # same id: replaced, not duplicated
+    index.delete(["c"])
+    assert len(index) == 2
+    assert index.search("breathing") == []
+
+    path = str(tmp_path / "bm25.json")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    hit = loaded.search("journaling", k=1)[0]
+    assert (hit.doc.id, hit.doc.metadata) == ("a", {"page": 9})
+    assert hit.score == pytest.approx(index.search("journaling", k=1)[0].score)